@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+import os
+import subprocess
+from dataclasses import dataclass
+
+
+@dataclass(slots=True, frozen=True)
+class Subvolume:
+    """One top-level subvolume and where it is mounted"""
+    name: str
+    mountpoint: str
+    # chattr +C on the empty subvolume: no CoW, no checksums, no compression
+    nodatacow: bool = False
+    # btrfs 'compression' property (e.g. 'zstd', 'lzo', 'none'); None inherits the mount option
+    compression: str | None = None
+
+
+class BtrfsLayout:
+    """
+    Subvolume layout profiles for the Btrfs root.
+
+    All subvolumes sit flat in the top level and are mounted with subvol=.
+    Btrfs mount options such as compress= apply to the whole filesystem, so
+    per-subvolume behaviour is set on the subvolume itself (file attribute
+    or property) when it is created.
+    """
+
+    BASE = (
+        Subvolume("root", "/"),
+        Subvolume("home", "/home"),
+        Subvolume("var", "/var"),
+    )
+    LOGS = (
+        # already-compressed journal files and throwaway caches gain nothing from zstd
+        Subvolume("var_log", "/var/log", compression="none"),
+        Subvolume("var_cache", "/var/cache", compression="none"),
+    )
+    DATABASES = (
+        Subvolume("var_lib_postgresql", "/var/lib/postgresql", nodatacow=True),
+        Subvolume("var_lib_mysql", "/var/lib/mysql", nodatacow=True),
+    )
+    VM_IMAGES = (
+        Subvolume("var_lib_libvirt_images", "/var/lib/libvirt/images", nodatacow=True),
+    )
+    # added when the swap planner picks a swapfile (under /var: OSTree's / is immutable)
+    SWAP = Subvolume("swap", "/var/swap", nodatacow=True)
+
+    PROFILES = {
+        "standard": BASE,
+        "server": BASE + LOGS,
+        "database": BASE + LOGS + DATABASES,
+        "virtualization": BASE + LOGS + VM_IMAGES,
+        "full": BASE + LOGS + DATABASES + VM_IMAGES,
+    }
+    LABELS = {
+        "standard": "Standard (root, home, var)",
+        "server": "Server (+ /var/log, /var/cache)",
+        "database": "Database (+ NoCOW PostgreSQL / MySQL)",
+        "virtualization": "Virtualization (+ NoCOW libvirt images)",
+        "full": "Everything",
+    }
+    DEFAULT_PROFILE = "standard"
+
+    @classmethod
+    def subvolumes(cls, profile=None, swapfile=False):
+        """Subvolumes of ``profile`` with parents before children"""
+        layout = cls.PROFILES.get(profile or cls.DEFAULT_PROFILE, cls.BASE)
+        if swapfile:
+            layout = layout + (cls.SWAP,)
+        return sorted(layout, key=lambda sv: (sv.mountpoint.rstrip("/").count("/"), sv.mountpoint))
+
+    @classmethod
+    def summary(cls, profile=None):
+        return ", ".join(sv.name for sv in cls.subvolumes(profile))
+
+    @staticmethod
+    def create(top_level, subvolume):
+        """
+        Create ``subvolume`` under the mounted top level (no-op if it exists).
+
+        +C only takes effect on empty files, so it is set right after
+        creation; files created inside inherit it.
+        """
+        path = os.path.join(top_level, subvolume.name)
+        if os.path.exists(path):
+            return False
+
+        subprocess.run(['sudo', 'btrfs', 'subvolume', 'create', path],
+                       capture_output=True, text=True, timeout=30, check=True)
+        if subvolume.nodatacow:
+            subprocess.run(['sudo', 'chattr', '+C', path],
+                           capture_output=True, text=True, timeout=30, check=True)
+        elif subvolume.compression:
+            subprocess.run(['sudo', 'btrfs', 'property', 'set', path, 'compression', subvolume.compression],
+                           capture_output=True, text=True, timeout=30, check=True)
+        return True
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+import os
+import subprocess
+
+from .disk_utils import DiskUtils
+
+
+class CacheTier:
+    """Hybrid root: an LV on the HDD with an lvmcache pool on the SSD"""
+
+    VG_NAME = "pelican"
+    ROOT_LV = "root"
+    POOL_LV = "cpool"
+    MODES = {
+        "writethrough": "Writethrough (safe, caches reads)",
+        "writeback": "Writeback (faster writes, SSD failure loses data)",
+    }
+
+    # head room on the SSD PV for the pool metadata and its spare
+    POOL_FRACTION = 0.95
+    # lvm warns above a million cache chunks
+    MAX_CHUNKS = 1_000_000
+    MIN_CHUNK_KIB = 64
+
+    @staticmethod
+    def is_rotational(disk):
+        info = DiskUtils.parse_disk_path(disk)
+        if not info:
+            return False
+        try:
+            with open(os.path.join("/sys/block", info["disk_name"], "queue", "rotational"), "r") as f:
+                return f.read().strip() == "1"
+        except OSError:
+            return False
+
+    @staticmethod
+    def device_bytes(device):
+        """Size of a disk or partition from sysfs (0 if unknown)"""
+        name = DiskUtils._kernel_name(device)
+        try:
+            with open(os.path.join(DiskUtils.SYS_BLOCK, name, "size"), "r") as f:
+                return int(f.read().strip()) * 512
+        except (OSError, ValueError):
+            return 0
+
+    @classmethod
+    def suggest(cls, disks):
+        """Return (hdd, ssd) picked from ``disks`` by the rotational flag, or None"""
+        hdds = [d for d in disks if cls.is_rotational(d)]
+        ssds = [d for d in disks if not cls.is_rotational(d)]
+        if not hdds or not ssds:
+            return None
+        return max(hdds, key=cls.device_bytes), max(ssds, key=cls.device_bytes)
+
+    @classmethod
+    def pool_size_kib(cls, ssd_partition, origin):
+        """Cache pool size: most of the SSD partition, never more than the origin"""
+        available = int(cls.device_bytes(ssd_partition) * cls.POOL_FRACTION) // 1024
+        origin_size = cls.device_bytes(origin) // 1024 or available
+        # whole MiB so lvcreate does not round past the PV
+        return min(available, origin_size) // 1024 * 1024
+
+    @classmethod
+    def chunk_size_kib(cls, pool_kib):
+        """Smallest power-of-two chunk (>= 64 KiB) that keeps the chunk count under MAX_CHUNKS"""
+        chunk = max(cls.MIN_CHUNK_KIB, -(-pool_kib // cls.MAX_CHUNKS))
+        return 1 << (chunk - 1).bit_length()
+
+    @classmethod
+    def root_device(cls):
+        return f"/dev/{cls.VG_NAME}/{cls.ROOT_LV}"
+
+    @staticmethod
+    def _run(cmd, what):
+        process = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+        if process.returncode != 0:
+            raise Exception(f"Failed to {what}: {process.stderr.strip()}")
+        return process
+
+    @classmethod
+    def create(cls, hdd_partition, ssd_partition, cache_mode="writethrough", log=print):
+        """
+        Build the volume group and the cached root LV.
+
+        Returns:
+            Path of the cached root LV
+        """
+        if cache_mode not in cls.MODES:
+            raise ValueError(f"Unknown cache mode: {cache_mode}")
+
+        vg = cls.VG_NAME
+        cls._run(['sudo', 'pvcreate', '-ff', '-y', hdd_partition, ssd_partition], "create physical volumes")
+        cls._run(['sudo', 'vgcreate', '-y', vg, hdd_partition, ssd_partition], "create volume group")
+        cls._run(
+            ['sudo', 'lvcreate', '-y', '-l', '100%PVS', '-n', cls.ROOT_LV, vg, hdd_partition],
+            "create root volume",
+        )
+
+        pool_kib = cls.pool_size_kib(ssd_partition, hdd_partition)
+        chunk_kib = cls.chunk_size_kib(pool_kib)
+        log(f"[Cache] {cache_mode} pool of {pool_kib // 1024} MiB, {chunk_kib} KiB chunks\n")
+
+        cls._run(
+            ['sudo', 'lvcreate', '-y', '--type', 'cache-pool',
+             '-L', f'{pool_kib}k', '--chunksize', f'{chunk_kib}k',
+             '-n', cls.POOL_LV, vg, ssd_partition],
+            "create cache pool",
+        )
+        cls._run(
+            ['sudo', 'lvconvert', '-y', '--type', 'cache',
+             '--cachepool', f'{vg}/{cls.POOL_LV}', '--cachemode', cache_mode,
+             f'{vg}/{cls.ROOT_LV}'],
+            "attach cache to root volume",
+        )
+        return cls.root_device()
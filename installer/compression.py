@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import subprocess
+import time
+
+try:
+    from compression import zstd as _zstd  # Python 3.14+
+except ImportError:
+    _zstd = None
+
+
+class CompressionCalibrator:
+    """
+    Pick the Btrfs compress= option from this machine's CPU and disk speed.
+
+    A sample of the live system's /usr (the same kind of payload the image
+    deploys) is compressed at several zstd levels on one core, and the
+    target filesystem's write rate is measured with incompressible data.
+    Btrfs compresses on all CPUs in parallel, so the effective write rate
+    of a level is min(cores * compress speed, disk rate * ratio); the
+    option with the best rate wins, preferring the better ratio among
+    options within TIE_MARGIN of it.
+    """
+
+    LEVELS = (1, 2, 3, 5, 7, 9)
+    SAMPLE_DIRS = ("/usr/bin", "/usr/lib", "/usr/share")
+    SAMPLE_BYTES = 32 * 1024 * 1024
+    SAMPLE_FILE_BYTES = 256 * 1024
+    WRITE_BYTES = 128 * 1024 * 1024
+    WRITE_BLOCK = 4 * 1024 * 1024
+    TIE_MARGIN = 0.05
+    DEFAULT_OPTION = "zstd:1"
+
+    def __init__(self, log=print):
+        self.log = log
+
+    @classmethod
+    def mount_option(cls, option):
+        """'compress=...' for a stored choice (None = not calibrated), or None for no compression"""
+        if option is None:
+            option = cls.DEFAULT_OPTION
+        return f"compress={option}" if option else None
+
+    @staticmethod
+    def available():
+        return _zstd is not None or shutil.which("zstd") is not None
+
+    # ----------------------------
+    # Measurements
+    # ----------------------------
+    def collect_sample(self):
+        """Read up to SAMPLE_BYTES, taking an equal share from each sample directory"""
+        share = self.SAMPLE_BYTES // len(self.SAMPLE_DIRS)
+        chunks = []
+        for directory in self.SAMPLE_DIRS:
+            taken = 0
+            for dirpath, dirnames, filenames in os.walk(directory):
+                dirnames.sort()
+                for name in sorted(filenames):
+                    path = os.path.join(dirpath, name)
+                    if os.path.islink(path):
+                        continue
+                    try:
+                        with open(path, "rb") as f:
+                            data = f.read(min(self.SAMPLE_FILE_BYTES, share - taken))
+                    except OSError:
+                        continue
+                    chunks.append(data)
+                    taken += len(data)
+                    if taken >= share:
+                        break
+                if taken >= share:
+                    break
+        return b"".join(chunks)
+
+    @staticmethod
+    def _compress(data, level):
+        if _zstd is not None:
+            return len(_zstd.compress(data, level=level))
+        process = subprocess.run(
+            ["zstd", f"-{level}", "-T1", "-c", "-q"], input=data, capture_output=True, check=True
+        )
+        return len(process.stdout)
+
+    def measure_levels(self, sample):
+        """Return {level: (ratio, single-core MB/s)}"""
+        results = {}
+        for level in self.LEVELS:
+            start = time.perf_counter()
+            compressed = self._compress(sample, level)
+            elapsed = max(time.perf_counter() - start, 1e-6)
+            results[level] = (len(sample) / max(compressed, 1), len(sample) / elapsed / 1e6)
+        return results
+
+    def measure_write_rate(self, directory):
+        """MB/s of a fsync'ed sequential write of incompressible data into ``directory``"""
+        path = os.path.join(directory, ".pelican-write-test")
+        block = os.urandom(self.WRITE_BLOCK)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            start = time.perf_counter()
+            written = 0
+            while written < self.WRITE_BYTES:
+                written += os.write(fd, block)
+            os.fsync(fd)
+            elapsed = max(time.perf_counter() - start, 1e-6)
+        finally:
+            os.close(fd)
+            os.unlink(path)
+        return written / elapsed / 1e6
+
+    # ----------------------------
+    # Decision
+    # ----------------------------
+    def choose(self, write_rate, levels, cpus=None):
+        """
+        Return (option, table): option is e.g. 'zstd:3' or None for no
+        compression, table maps each candidate to its effective MB/s.
+        """
+        cpus = cpus or os.cpu_count() or 1
+        table = {"none": (1.0, write_rate)}
+        for level, (ratio, speed) in levels.items():
+            table[f"zstd:{level}"] = (ratio, min(speed * cpus, write_rate * ratio))
+
+        best_rate = max(rate for _, rate in table.values())
+        close = [(ratio, name) for name, (ratio, rate) in table.items()
+                 if rate >= best_rate * (1 - self.TIE_MARGIN)]
+        _, option = max(close)
+        return (None if option == "none" else option), {name: round(rate, 1) for name, (_, rate) in table.items()}
+
+    def calibrate(self, directory):
+        """
+        Benchmark and decide for the filesystem mounted at ``directory``.
+
+        Returns:
+            dict with 'option' (None = no compression) and the measurements
+        """
+        if not self.available():
+            self.log(f"[Compression] zstd not available, using {self.DEFAULT_OPTION}\n")
+            return {"option": self.DEFAULT_OPTION, "reason": "zstd benchmark unavailable"}
+
+        sample = self.collect_sample()
+        if not sample:
+            return {"option": self.DEFAULT_OPTION, "reason": "no sample data"}
+
+        levels = self.measure_levels(sample)
+        write_rate = self.measure_write_rate(directory)
+        option, table = self.choose(write_rate, levels)
+
+        self.log(f"[Compression] disk {write_rate:.0f} MB/s, chose {option or 'no compression'}\n")
+        return {
+            "option": option,
+            "write_rate_mb_s": round(write_rate, 1),
+            "cpus": os.cpu_count() or 1,
+            "sample_bytes": len(sample),
+            "levels": {f"zstd:{lvl}": {"ratio": round(r, 3), "mb_s": round(s, 1)} for lvl, (r, s) in levels.items()},
+            "effective_mb_s": table,
+        }
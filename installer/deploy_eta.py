@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import os
+import platform
+import ssl
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from .io_tuning import IoTuning
+
+MANIFEST_TYPES = (
+    "application/vnd.oci.image.index.v1+json",
+    "application/vnd.oci.image.manifest.v1+json",
+    "application/vnd.docker.distribution.manifest.list.v2+json",
+    "application/vnd.docker.distribution.manifest.v2+json",
+)
+INDEX_TYPES = MANIFEST_TYPES[0], MANIFEST_TYPES[2]
+
+
+class ImageManifest:
+    """
+    Layer sizes of the deployed image, read once before the deploy.
+
+    The manifest gives the compressed size of every layer. Registries do
+    not store uncompressed sizes, so they are estimated from the layer
+    compression (DeployEta corrects the estimate from what is actually
+    written). ``oci:<dir>[:tag]`` references are read from a local OCI
+    layout, anything else from the registry's v2 API.
+    """
+
+    # typical expansion of a system image layer
+    RATIOS = {"zstd": 2.8, "gzip": 2.4, "none": 1.0}
+    TIMEOUT = 15
+    ARCHITECTURES = {"x86_64": "amd64", "aarch64": "arm64"}
+
+    def __init__(self, image_ref):
+        self.image_ref = image_ref
+        self.layers = []
+        self.config = {}
+        # sha256 of the platform manifest, as recorded by ostree in ostree.manifest-digest
+        self.digest = None
+        self._base = None
+        self._repository = None
+
+    @property
+    def compressed_bytes(self):
+        return sum(layer["size"] for layer in self.layers)
+
+    @property
+    def uncompressed_bytes(self):
+        return sum(layer["size"] * self.RATIOS[layer["compression"]] for layer in self.layers)
+
+    # ----------------------------
+    # Reference parsing
+    # ----------------------------
+    @staticmethod
+    def parse_ref(image_ref):
+        """'host[:port]/repo[:tag|@digest]' -> (host, repository, reference)"""
+        name, reference = image_ref, "latest"
+        if "@" in name:
+            name, reference = name.split("@", 1)
+        elif ":" in name.rsplit("/", 1)[-1]:
+            name, reference = name.rsplit(":", 1)
+
+        first, _, rest = name.partition("/")
+        if rest and ("." in first or ":" in first or first == "localhost"):
+            host, repository = first, rest
+            if host == "docker.io":
+                host = "registry-1.docker.io"
+        else:
+            host, repository = "registry-1.docker.io", name
+            if "/" not in repository:
+                repository = f"library/{repository}"
+        return host, repository, reference
+
+    # ----------------------------
+    # Registry access
+    # ----------------------------
+    def _open(self, url, accept, token=None):
+        request = urllib.request.Request(url, headers={"Accept": accept})
+        if token:
+            # not forwarded on redirects: blob CDNs reject a second auth scheme
+            request.add_unredirected_header("Authorization", f"Bearer {token}")
+        # the deploy skips TLS verification too, so stand-in registries work
+        context = ssl._create_unverified_context()
+        return urllib.request.urlopen(request, timeout=self.TIMEOUT, context=context)
+
+    def _token(self, challenge):
+        """Anonymous bearer token for a 'Bearer realm=...,service=...,scope=...' challenge"""
+        params = {}
+        for part in challenge[len("Bearer "):].split(","):
+            key, _, value = part.strip().partition("=")
+            params[key] = value.strip('"')
+        query = urllib.parse.urlencode({k: v for k, v in params.items() if k in ("service", "scope")})
+        with self._open(f"{params['realm']}?{query}", "application/json") as response:
+            data = json.load(response)
+        return data.get("token") or data.get("access_token")
+
+    def _get(self, base, path, accept, limit=-1):
+        """GET ``path``, reading at most ``limit`` bytes of the body"""
+        url = f"{base}{path}"
+        try:
+            with self._open(url, accept) as response:
+                return response.read(limit)
+        except urllib.error.HTTPError as e:
+            challenge = e.headers.get("WWW-Authenticate", "")
+            if e.code != 401 or not challenge.startswith("Bearer "):
+                raise
+        with self._open(url, accept, self._token(challenge)) as response:
+            return response.read(limit)
+
+    def _base_url(self, host):
+        """https://host, or http:// for a plain-HTTP local registry"""
+        for scheme in ("https", "http"):
+            base = f"{scheme}://{host}"
+            try:
+                with self._open(f"{base}/v2/", "application/json"):
+                    return base
+            except urllib.error.HTTPError:
+                return base
+            except (urllib.error.URLError, OSError):
+                continue
+        raise OSError(f"Registry {host} is not reachable")
+
+    def _pick_platform(self, index):
+        arch = self.ARCHITECTURES.get(platform.machine(), platform.machine())
+        for entry in index.get("manifests", []):
+            plat = entry.get("platform", {})
+            if plat.get("os", "linux") == "linux" and plat.get("architecture") == arch:
+                return entry["digest"]
+        return index["manifests"][0]["digest"]
+
+    def _fetch_registry(self):
+        host, repository, reference = self.parse_ref(self.image_ref)
+        base = self._base_url(host)
+        self._base, self._repository = base, repository
+        accept = ", ".join(MANIFEST_TYPES)
+
+        raw = self._get(base, f"/v2/{repository}/manifests/{reference}", accept)
+        manifest = json.loads(raw)
+        if manifest.get("mediaType") in INDEX_TYPES or "manifests" in manifest:
+            digest = self._pick_platform(manifest)
+            raw = self._get(base, f"/v2/{repository}/manifests/{digest}", accept)
+            manifest = json.loads(raw)
+        self.digest = f"sha256:{hashlib.sha256(raw).hexdigest()}"
+        config = json.loads(self._get(base, f"/v2/{repository}/blobs/{manifest['config']['digest']}", "*/*"))
+        return manifest, config
+
+    def _fetch_oci_layout(self):
+        path, _, tag = self.image_ref[len("oci:"):].partition(":")
+
+        def blob(digest):
+            algorithm, _, value = digest.partition(":")
+            with open(os.path.join(path, "blobs", algorithm, value), "r") as f:
+                return json.load(f)
+
+        with open(os.path.join(path, "index.json"), "r") as f:
+            index = json.load(f)
+        entries = index.get("manifests", [])
+        if tag:
+            entries = [e for e in entries
+                       if e.get("annotations", {}).get("org.opencontainers.image.ref.name") == tag] or entries
+        self.digest = entries[0]["digest"]
+        manifest = blob(self.digest)
+        if "manifests" in manifest:
+            self.digest = self._pick_platform(manifest)
+            manifest = blob(self.digest)
+        return manifest, blob(manifest["config"]["digest"])
+
+    @staticmethod
+    def _compression(media_type):
+        if media_type.endswith("zstd"):
+            return "zstd"
+        if media_type.endswith("gzip"):
+            return "gzip"
+        return "none"
+
+    def fetch(self):
+        """Read manifest and config; raises OSError/ValueError when unavailable"""
+        if self.image_ref.startswith("oci:"):
+            manifest, self.config = self._fetch_oci_layout()
+        else:
+            manifest, self.config = self._fetch_registry()
+        self.layers = [
+            {"digest": layer["digest"], "size": layer["size"], "compression": self._compression(layer.get("mediaType", ""))}
+            for layer in manifest.get("layers", [])
+        ]
+        return self
+
+    def sample_blob(self, limit):
+        """Read the first ``limit`` bytes of the largest layer; returns (bytes, seconds)"""
+        if self._base is None or not self.layers:
+            raise ValueError("sample_blob() needs a registry manifest, call fetch() first")
+        layer = max(self.layers, key=lambda layer: layer["size"])
+        start = time.perf_counter()
+        data = self._get(self._base, f"/v2/{self._repository}/blobs/{layer['digest']}", "*/*", limit)
+        return len(data), time.perf_counter() - start
+
+
+class DeployEta:
+    """
+    Remaining bytes and ETA of the deploy, refined from live counters.
+
+    Network bytes received (/proc/net/dev) are compared with the
+    compressed image size and bytes written to the target disks with the
+    estimated uncompressed size. Rates are smoothed with an exponential
+    moving average, and so is the expansion ratio: once a tenth of the
+    image is downloaded, written/downloaded replaces the static estimate.
+    A local OCI layout or a local ostree repo (``network=False``) has
+    nothing to download and is tracked by disk writes alone.
+    """
+
+    SMOOTHING = 0.3
+    RATIO_AFTER = 0.1
+
+    def __init__(self, manifest, devices, network=True):
+        self.network = network and not manifest.image_ref.startswith("oci:")
+        self.compressed = manifest.compressed_bytes if self.network else 0
+        self.uncompressed = manifest.uncompressed_bytes
+        self.ratio = self.uncompressed / manifest.compressed_bytes if manifest.compressed_bytes else 1.0
+        self.disks = IoTuning.physical_disks(devices)
+        self._start_rx = self._rx_bytes()
+        self._start_written = self._written_bytes()
+        self._last = (time.monotonic(), 0, 0)
+        self.net_rate = None
+        self.disk_rate = None
+
+    @staticmethod
+    def _rx_bytes():
+        total = 0
+        try:
+            with open("/proc/net/dev", "r") as f:
+                for line in f.readlines()[2:]:
+                    name, _, data = line.partition(":")
+                    if name.strip() != "lo":
+                        total += int(data.split()[0])
+        except (OSError, ValueError, IndexError):
+            pass
+        return total
+
+    def _written_bytes(self):
+        total = 0
+        for disk in self.disks:
+            try:
+                with open(f"/sys/block/{disk}/stat", "r") as f:
+                    total += int(f.read().split()[6]) * 512
+            except (OSError, ValueError, IndexError):
+                pass
+        return total
+
+    def _smooth(self, old, new):
+        return new if old is None else old + self.SMOOTHING * (new - old)
+
+    def sample(self):
+        """
+        Take one sample.
+
+        Returns:
+            dict with downloaded, written, remaining_download,
+            remaining_write and eta_seconds (None until the rates are known)
+        """
+        now = time.monotonic()
+        downloaded = self._rx_bytes() - self._start_rx
+        written = self._written_bytes() - self._start_written
+        last_time, last_downloaded, last_written = self._last
+        elapsed = now - last_time
+        if elapsed > 0:
+            self.net_rate = self._smooth(self.net_rate, (downloaded - last_downloaded) / elapsed)
+            self.disk_rate = self._smooth(self.disk_rate, (written - last_written) / elapsed)
+        self._last = (now, downloaded, written)
+
+        if self.compressed and self.RATIO_AFTER * self.compressed <= downloaded < self.compressed:
+            self.ratio = self._smooth(self.ratio, written / downloaded)
+            self.uncompressed = self.compressed * self.ratio
+        self.uncompressed = max(self.uncompressed, written)
+
+        remaining_net = max(self.compressed - downloaded, 0)
+        remaining_disk = max(self.uncompressed - written, 0)
+        times = []
+        if remaining_net:
+            times.append(remaining_net / self.net_rate if self.net_rate else None)
+        if remaining_disk:
+            times.append(remaining_disk / self.disk_rate if self.disk_rate else None)
+        eta = None if None in times else max(times, default=0)
+
+        return {
+            "downloaded": downloaded,
+            "written": written,
+            "remaining_download": remaining_net,
+            "remaining_write": round(remaining_disk),
+            "eta_seconds": eta,
+        }
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Loop-device benchmark for the disk operations of the DiskManagent page.
+
+Sparse image files are attached as loop devices and the page's real
+operations run against them: auto-configure (UEFI and legacy), create,
+format and remove a partition, Btrfs subvolumes and fstab generation.
+For each operation the wall time, the number of subprocesses started and
+the time spent in time.sleep() are compared against a stored baseline;
+a regression makes the run exit with status 1.
+
+Needs root (losetup, parted, mkfs) and a display for the GTK widgets
+(``xvfb-run`` is enough). The generated configuration is written to
+/tmp/installer_config like in a normal session.
+
+    sudo python3 -m installer.disk_benchmark [--update-baseline]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import gi
+
+gi.require_version("Gtk", "4.0")
+gi.require_version("Adw", "1")
+from gi.repository import Adw
+
+from .disk_utils import DiskUtils
+from .install_plan import InstallPlan
+from .main import PelicanInstallerApp
+from .pages.disk_managent import DiskManagent
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "data", "disk_benchmark_baseline.json")
+IMAGE_SIZE = 8 * 1024 ** 3
+# relative wall-time tolerance, plus an absolute slack for very short operations
+TOLERANCE = 0.25
+SLACK_SECONDS = 0.5
+
+
+class BenchmarkError(Exception):
+    """An operation reported an error instead of completing"""
+
+
+class BenchmarkDiskManagent(DiskManagent):
+    """The real page with a fixed boot mode; error dialogs raise instead of showing"""
+
+    boot_mode = "uefi"
+
+    def _detect_boot_mode(self):
+        return self.boot_mode
+
+    def _show_error_dialog(self, heading, message):
+        raise BenchmarkError(f"{heading}: {message}")
+
+
+class Counters:
+    """Count subprocesses and time.sleep() while active"""
+
+    def __init__(self):
+        self.subprocesses = 0
+        self.sleep_seconds = 0.0
+
+    def __enter__(self):
+        counters = self
+        self._popen, self._sleep = subprocess.Popen, time.sleep
+
+        class CountingPopen(self._popen):
+            def __init__(self, *args, **kwargs):
+                counters.subprocesses += 1
+                super().__init__(*args, **kwargs)
+
+        def counting_sleep(seconds):
+            counters.sleep_seconds += seconds
+            self._sleep(seconds)
+
+        subprocess.Popen, time.sleep = CountingPopen, counting_sleep
+        return self
+
+    def __exit__(self, *exc):
+        subprocess.Popen, time.sleep = self._popen, self._sleep
+        return False
+
+
+class LoopDisk:
+    """A sparse image attached as a partitioned loop device"""
+
+    def __init__(self, directory, name, size=IMAGE_SIZE):
+        self.image = os.path.join(directory, f"{name}.img")
+        self.device = None
+        with open(self.image, "wb") as f:
+            f.truncate(size)
+
+    def __enter__(self):
+        process = subprocess.run(
+            ["losetup", "--find", "--show", "--partscan", self.image],
+            capture_output=True, text=True, timeout=30, check=True,
+        )
+        self.device = process.stdout.strip()
+        return self.device
+
+    def __exit__(self, *exc):
+        subprocess.run(["losetup", "-d", self.device], capture_output=True, text=True, timeout=30)
+        os.unlink(self.image)
+        return False
+
+
+class DiskBenchmark:
+    def __init__(self):
+        Adw.init()
+        self.app = PelicanInstallerApp()
+        self.page = None
+        self.results = {}
+
+    def _reset(self, disk):
+        """Fresh plan (no swap, so no multi-GiB swapfile) and a page on ``disk``"""
+        self.app.plan = InstallPlan()
+        self.app.plan.swap.mode = "none"
+        self.page = BenchmarkDiskManagent(self.app)
+        self.page.selected_disk = disk
+        DiskUtils.clear_cache()
+
+    def measure(self, name, func, *args):
+        with Counters() as counters:
+            start = time.perf_counter()
+            func(*args)
+            elapsed = time.perf_counter() - start
+        self.results[name] = {
+            "seconds": round(elapsed, 3),
+            "subprocesses": counters.subprocesses,
+            "sleep_seconds": round(counters.sleep_seconds, 3),
+        }
+        print(f"{name:<20} {elapsed:8.2f} s  {counters.subprocesses:4d} subprocesses  "
+              f"{counters.sleep_seconds:5.1f} s sleeping")
+
+    def _select(self, partition_number):
+        path = DiskUtils.get_partition_path(self.page.selected_disk, partition_number)
+        self.page.selected_row = SimpleNamespace(partition_path=path)
+        return path
+
+    def run(self, workdir):
+        with LoopDisk(workdir, "uefi") as disk:
+            self._reset(disk)
+            self.page.boot_mode = "uefi"
+            self.measure("auto_configure_uefi", self.page._execute_auto_configure)
+            self.measure("fstab", self.page._generate_and_apply_fstab)
+
+        with LoopDisk(workdir, "legacy") as disk:
+            self._reset(disk)
+            self.page.boot_mode = "legacy"
+            self.measure("auto_configure_legacy", self.page._execute_auto_configure)
+
+        with LoopDisk(workdir, "manual") as disk:
+            self._reset(disk)
+            self.measure("create_partition", self.page._execute_create_partition, "1024MB", "ext4", "/data", False)
+            self._select(1)
+            self.measure("format_partition", self.page._execute_format, "ext4")
+            self.measure("remove_partition", self.page._execute_remove_partition)
+
+            self.page._execute_create_partition("100%", "btrfs", "/", False)
+            root = self._select(1)
+            self.measure("btrfs_subvolumes", self.page._create_btrfs_subvolumes, root, False)
+
+        return self.results
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Return a list of regressions of ``results`` against ``baseline``"""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        limit = base["seconds"] * (1 + tolerance) + SLACK_SECONDS
+        if current["seconds"] > limit:
+            regressions.append(f"{name}: {current['seconds']:.2f} s > {limit:.2f} s")
+        if current["subprocesses"] > base["subprocesses"]:
+            regressions.append(f"{name}: {current['subprocesses']} subprocesses > {base['subprocesses']}")
+        if current["sleep_seconds"] > base["sleep_seconds"] + 0.001:
+            regressions.append(f"{name}: {current['sleep_seconds']} s sleeping > {base['sleep_seconds']} s")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed relative wall-time increase")
+    parser.add_argument("--workdir", default=None, help="directory for the sparse images (default: a temp dir)")
+    args = parser.parse_args(argv)
+
+    if os.geteuid() != 0:
+        print("The disk benchmark needs root (loop devices, parted, mkfs)", file=sys.stderr)
+        return 2
+
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        results = DiskBenchmark().run(workdir)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    try:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+    except (OSError, ValueError):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"[REGRESSION] {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+
+import mmap
+import os
+import random
+import subprocess
+import time
+
+
+class DiskProbe:
+    """
+    Quick (about 3 s) throughput probe of a target disk before it is used.
+
+    Reads go straight to the device with O_DIRECT into page-aligned
+    buffers from an anonymous mmap, so the page cache does not inflate
+    the numbers: a sequential read in 1 MiB blocks and 4K random reads
+    across the whole disk. Once the disk is confirmed as the install target
+    and its partition table has a large enough free region, a sequential
+    O_DIRECT write is measured there as well (probe_write); nothing outside
+    unallocated space is touched, and the write is skipped while anything
+    on the disk is mounted.
+    """
+
+    SEQ_BLOCK = 1024 * 1024
+    RANDOM_BLOCK = 4096
+    SEQ_SECONDS = 1.5
+    RANDOM_SECONDS = 1.0
+    WRITE_SECONDS = 0.5
+    WRITE_MAX_BYTES = 256 * 1024 * 1024
+    MIN_FREE_BYTES = 64 * 1024 * 1024
+    ALIGN = 1024 * 1024
+
+    SLOW_READ_MB_S = 50
+    SLOW_WRITE_MB_S = 20
+    # bytes a typical deployment writes (image plus OSTree metadata)
+    INSTALL_BYTES = 6 * 1024 ** 3
+
+    @staticmethod
+    def _buffer(size):
+        """Anonymous mmap: page-aligned, which satisfies O_DIRECT alignment"""
+        return mmap.mmap(-1, size)
+
+    @classmethod
+    def sequential_read(cls, fd, size):
+        buf = cls._buffer(cls.SEQ_BLOCK)
+        done = 0
+        start = time.perf_counter()
+        deadline = start + cls.SEQ_SECONDS
+        try:
+            while time.perf_counter() < deadline and done + cls.SEQ_BLOCK <= size:
+                read = os.preadv(fd, [buf], done)
+                if read <= 0:
+                    break
+                done += read
+        finally:
+            buf.close()
+        return done / max(time.perf_counter() - start, 1e-6) / 1e6
+
+    @classmethod
+    def random_read(cls, fd, size):
+        """Return (IOPS, MB/s) of 4K reads at random aligned offsets"""
+        buf = cls._buffer(cls.RANDOM_BLOCK)
+        blocks = size // cls.RANDOM_BLOCK
+        count = 0
+        start = time.perf_counter()
+        deadline = start + cls.RANDOM_SECONDS
+        try:
+            while blocks and time.perf_counter() < deadline:
+                os.preadv(fd, [buf], random.randrange(blocks) * cls.RANDOM_BLOCK)
+                count += 1
+        finally:
+            buf.close()
+        elapsed = max(time.perf_counter() - start, 1e-6)
+        return count / elapsed, count * cls.RANDOM_BLOCK / elapsed / 1e6
+
+    @classmethod
+    def free_region(cls, disk):
+        """Largest unallocated (start, end) byte range of ``disk``, or None"""
+        process = subprocess.run(
+            ['sudo', 'parted', '-s', disk, 'unit', 'B', 'print', 'free'],
+            capture_output=True, text=True, timeout=10,
+        )
+        if process.returncode != 0:
+            # no partition table: the disk may still hold data, do not write
+            return None
+
+        best = None
+        for line in process.stdout.split('\n'):
+            if 'Free Space' not in line:
+                continue
+            parts = line.split()
+            try:
+                start, end = int(parts[0].rstrip('B')), int(parts[1].rstrip('B'))
+            except (ValueError, IndexError):
+                continue
+            start = -(-start // cls.ALIGN) * cls.ALIGN
+            end = end // cls.ALIGN * cls.ALIGN
+            if end - start >= cls.MIN_FREE_BYTES and (best is None or end - start > best[1] - best[0]):
+                best = (start, end)
+        return best
+
+    @staticmethod
+    def in_use(disk):
+        """True when a partition (or a device stacked on one) is mounted or used as swap"""
+        process = subprocess.run(
+            ['lsblk', '-nro', 'MOUNTPOINT', disk],
+            capture_output=True, text=True, timeout=10,
+        )
+        if process.returncode != 0:
+            return True
+        return any(line.strip() for line in process.stdout.split('\n'))
+
+    @classmethod
+    def sequential_write(cls, disk, region):
+        start_offset, end_offset = region
+        limit = min(end_offset - start_offset, cls.WRITE_MAX_BYTES)
+        buf = cls._buffer(cls.SEQ_BLOCK)
+        buf.write(os.urandom(cls.SEQ_BLOCK))
+        fd = os.open(disk, os.O_WRONLY | os.O_DIRECT)
+        done = 0
+        try:
+            start = time.perf_counter()
+            deadline = start + cls.WRITE_SECONDS
+            while time.perf_counter() < deadline and done + cls.SEQ_BLOCK <= limit:
+                done += os.pwritev(fd, [buf], start_offset + done)
+            os.fsync(fd)
+            elapsed = max(time.perf_counter() - start, 1e-6)
+        finally:
+            os.close(fd)
+            buf.close()
+        return done / elapsed / 1e6
+
+    @classmethod
+    def estimate_seconds(cls, result, install_bytes=None):
+        """Install time from the write rate (the read rate when no write probe ran)"""
+        rate = result.get("write_mb_s") or result.get("read_mb_s")
+        if not rate:
+            return None
+        return (install_bytes or cls.INSTALL_BYTES) / (rate * 1e6)
+
+    @staticmethod
+    def format_duration(seconds):
+        if seconds is None:
+            return "unknown"
+        if seconds < 90:
+            return f"~{seconds:.0f} s"
+        if seconds < 90 * 60:
+            return f"~{seconds / 60:.0f} min"
+        return f"~{seconds / 3600:.1f} h"
+
+    @classmethod
+    def _evaluate(cls, result):
+        """Fill in eta_seconds and warnings from the measured rates"""
+        result["eta_seconds"] = cls.estimate_seconds(result)
+        warnings = []
+        if result["read_mb_s"] < cls.SLOW_READ_MB_S:
+            warnings.append(f"sequential read is only {result['read_mb_s']:.0f} MB/s")
+        if result["write_mb_s"] is not None and result["write_mb_s"] < cls.SLOW_WRITE_MB_S:
+            warnings.append(f"sequential write is only {result['write_mb_s']:.0f} MB/s")
+        result["warnings"] = warnings
+        return result
+
+    @classmethod
+    def probe(cls, disk):
+        """
+        Read-only probe of ``disk`` (safe to run as soon as a disk is selected).
+
+        Returns:
+            dict with read_mb_s, random_iops, random_mb_s, write_mb_s (None
+            until probe_write() runs), eta_seconds and warnings
+        """
+        fd = os.open(disk, os.O_RDONLY | os.O_DIRECT)
+        try:
+            size = os.lseek(fd, 0, os.SEEK_END)
+            read_mb_s = cls.sequential_read(fd, size)
+            iops, random_mb_s = cls.random_read(fd, size)
+        finally:
+            os.close(fd)
+
+        return cls._evaluate({
+            "read_mb_s": round(read_mb_s, 1),
+            "random_iops": round(iops),
+            "random_mb_s": round(random_mb_s, 2),
+            "write_mb_s": None,
+        })
+
+    @classmethod
+    def probe_write(cls, disk, result):
+        """
+        Add the write rate to ``result`` of probe().
+
+        Only for a disk the user has confirmed as the install target: the
+        test writes into unallocated space, and is skipped while anything
+        on the disk is in use or there is no free region.
+        """
+        region = None if cls.in_use(disk) else cls.free_region(disk)
+        if region:
+            result["write_mb_s"] = round(cls.sequential_write(disk, region), 1)
+        return cls._evaluate(result)
+
+    @classmethod
+    def summary(cls, result):
+        """Short text for the disk selector"""
+        text = f"{result['read_mb_s']:.0f} MB/s read"
+        if result["write_mb_s"] is not None:
+            text += f", {result['write_mb_s']:.0f} MB/s write"
+        return f"{text}, install {cls.format_duration(result['eta_seconds'])}"
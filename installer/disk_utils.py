@@ -2,15 +2,110 @@
 
 import re
 import os
+import functools
 
 class DiskUtils:
     """Utility class for handling disk and partition naming across different disk types"""
 
+    SYS_BLOCK = "/sys/class/block"
+
+    # Used only when the device is not (yet) visible in sysfs.
+    # Disks whose names end in a digit (nvme0n1, mmcblk0, loop0, md0, ...)
+    # get a 'p' separator before the partition number, everything else
+    # (sda1, vdb2, xvda3) has the number appended directly.
+    _FALLBACK_RE = re.compile(r"""
+        ^(?:
+            (?P<pbase>.*\d)p(?P<pnum>\d+)
+          | (?P<base>(?!mmcblk|loop|nbd|md|zram|nvme|dm-|sr)[a-z]+)(?P<num>\d+)
+          | (?P<disk>.+)
+        )$
+    """, re.VERBOSE)
+
+    # disk name prefix -> disk_type
+    _DISK_TYPES = (
+        ("nvme", "nvme"),
+        ("mmcblk", "mmc"),
+        ("loop", "loop"),
+        ("vd", "virtio"),
+        ("xvd", "xen"),
+        ("sd", "sata"),
+        ("hd", "ide"),
+        ("md", "md"),
+        ("dm-", "dm"),
+        ("nbd", "nbd"),
+        ("zram", "zram"),
+    )
+
+    @staticmethod
+    def _disk_type(disk_name):
+        for prefix, disk_type in DiskUtils._DISK_TYPES:
+            if disk_name.startswith(prefix):
+                return disk_type
+        return "unknown"
+
+    @staticmethod
+    def _read_sysfs(name):
+        """
+        Return (parent_name, partition_num) from sysfs, or None if the
+        device is not present.
+        """
+        sys_path = os.path.join(DiskUtils.SYS_BLOCK, name)
+        if not os.path.exists(sys_path):
+            return None
+
+        try:
+            with open(os.path.join(sys_path, "partition"), "r") as f:
+                partition_num = int(f.read().strip())
+        except (OSError, ValueError):
+            return name, None
+
+        # /sys/class/block/<part> -> .../block/<disk>/<part>
+        parent = os.path.basename(os.path.dirname(os.path.realpath(sys_path)))
+        return parent, partition_num
+
+    @staticmethod
+    def _parse_fallback(name):
+        m = DiskUtils._FALLBACK_RE.match(name)
+        if m.group("pbase"):
+            return m.group("pbase"), int(m.group("pnum"))
+        if m.group("base"):
+            return m.group("base"), int(m.group("num"))
+        return m.group("disk"), None
+
+    @staticmethod
+    def _kernel_name(device_path):
+        """Resolve /dev/mapper/* and /dev/disk/by-* links to the kernel name"""
+        if os.path.islink(device_path):
+            return os.path.basename(os.path.realpath(device_path))
+        return device_path[len('/dev/'):]
+
+    @staticmethod
+    def _build_result(device_path, name, parent, partition_num):
+        return {
+            'device': device_path,
+            'base_disk': f'/dev/{parent}',
+            'partition_num': partition_num,
+            'disk_type': DiskUtils._disk_type(parent),
+            'disk_name': parent,
+        }
+
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def _parse_cached(device_path):
+        name = DiskUtils._kernel_name(device_path)
+        resolved = DiskUtils._read_sysfs(name) or DiskUtils._parse_fallback(name)
+        return tuple(DiskUtils._build_result(device_path, name, *resolved).items())
+
     @staticmethod
     def parse_disk_path(device_path):
         """
         Parse a disk/partition path and return disk info.
 
+        The parent disk and partition number come from
+        /sys/class/block/<name>/partition and the parent link, so any
+        naming scheme (dm, md, nbd, zram, ...) resolves correctly. A single
+        precompiled pattern is used for devices that are not in sysfs yet.
+
         Args:
             device_path: Full path like /dev/sda1, /dev/nvme0n1p2, /dev/mmcblk0p1
 
@@ -24,94 +119,41 @@ class DiskUtils:
         """
         if not device_path or not device_path.startswith('/dev/'):
             return None
+        return dict(DiskUtils._parse_cached(device_path))
 
-        # Remove /dev/ prefix for analysis
-        device_name = device_path.replace('/dev/', '')
+    @staticmethod
+    def resolve_many(device_paths):
+        """
+        Resolve many devices at once.
 
-        result = {
-            'device': device_path,
-            'base_disk': None,
-            'partition_num': None,
-            'disk_type': None,
-            'disk_name': None
-        }
+        Lists /sys/class/block a single time instead of probing it per
+        device.
+
+        Returns:
+            dict mapping each device path to its parse_disk_path() result
+            (None for paths outside /dev)
+        """
+        try:
+            present = set(os.listdir(DiskUtils.SYS_BLOCK))
+        except OSError:
+            present = set()
+
+        results = {}
+        for device_path in device_paths:
+            if not device_path or not device_path.startswith('/dev/'):
+                results[device_path] = None
+                continue
+            name = DiskUtils._kernel_name(device_path)
+            resolved = DiskUtils._read_sysfs(name) if name in present else None
+            results[device_path] = DiskUtils._build_result(
+                device_path, name, *(resolved or DiskUtils._parse_fallback(name))
+            )
+        return results
 
-        # NVMe drives: /dev/nvme[0-9]+n[0-9]+(p[0-9]+)?
-        nvme_match = re.match(r'^(nvme\d+n\d+)(p(\d+))?$', device_name)
-        if nvme_match:
-            result['disk_type'] = 'nvme'
-            result['disk_name'] = nvme_match.group(1)
-            result['base_disk'] = f'/dev/{nvme_match.group(1)}'
-            if nvme_match.group(3):  # Has partition number
-                result['partition_num'] = int(nvme_match.group(3))
-            return result
-
-        # MMC/SD cards: /dev/mmcblk[0-9]+(p[0-9]+)?
-        mmc_match = re.match(r'^(mmcblk\d+)(p(\d+))?$', device_name)
-        if mmc_match:
-            result['disk_type'] = 'mmc'
-            result['disk_name'] = mmc_match.group(1)
-            result['base_disk'] = f'/dev/{mmc_match.group(1)}'
-            if mmc_match.group(3):  # Has partition number
-                result['partition_num'] = int(mmc_match.group(3))
-            return result
-
-        # Loop devices: /dev/loop[0-9]+(p[0-9]+)?
-        loop_match = re.match(r'^(loop\d+)(p(\d+))?$', device_name)
-        if loop_match:
-            result['disk_type'] = 'loop'
-            result['disk_name'] = loop_match.group(1)
-            result['base_disk'] = f'/dev/{loop_match.group(1)}'
-            if loop_match.group(3):  # Has partition number
-                result['partition_num'] = int(loop_match.group(3))
-            return result
-
-        # VirtIO devices: /dev/vd[a-z]+[0-9]*
-        virtio_match = re.match(r'^(vd[a-z]+)(\d+)?$', device_name)
-        if virtio_match:
-            result['disk_type'] = 'virtio'
-            result['disk_name'] = virtio_match.group(1)
-            result['base_disk'] = f'/dev/{virtio_match.group(1)}'
-            if virtio_match.group(2):  # Has partition number
-                result['partition_num'] = int(virtio_match.group(2))
-            return result
-
-        # SATA/IDE/SCSI devices: /dev/sd[a-z]+[0-9]*
-        sata_match = re.match(r'^(sd[a-z]+)(\d+)?$', device_name)
-        if sata_match:
-            result['disk_type'] = 'sata'
-            result['disk_name'] = sata_match.group(1)
-            result['base_disk'] = f'/dev/{sata_match.group(1)}'
-            if sata_match.group(2):  # Has partition number
-                result['partition_num'] = int(sata_match.group(2))
-            return result
-
-        # IDE legacy devices: /dev/hd[a-z]+[0-9]*
-        ide_match = re.match(r'^(hd[a-z]+)(\d+)?$', device_name)
-        if ide_match:
-            result['disk_type'] = 'ide'
-            result['disk_name'] = ide_match.group(1)
-            result['base_disk'] = f'/dev/{ide_match.group(1)}'
-            if ide_match.group(2):  # Has partition number
-                result['partition_num'] = int(ide_match.group(2))
-            return result
-
-        # Unknown device type - try generic parsing
-        # Assume anything ending in digits is a partition
-        generic_match = re.match(r'^([a-z]+\d*[a-z]*)(\d+)$', device_name)
-        if generic_match:
-            result['disk_type'] = 'unknown'
-            result['disk_name'] = generic_match.group(1)
-            result['base_disk'] = f'/dev/{generic_match.group(1)}'
-            result['partition_num'] = int(generic_match.group(2))
-            return result
-
-        # No partition number - this is a whole disk
-        result['disk_type'] = 'unknown'
-        result['disk_name'] = device_name
-        result['base_disk'] = device_path
-
-        return result
+    @staticmethod
+    def clear_cache():
+        """Forget cached lookups (call after the partition table changes)"""
+        DiskUtils._parse_cached.cache_clear()
 
     @staticmethod
     def get_partition_path(base_disk, partition_num):
@@ -132,22 +174,27 @@ class DiskUtils:
         if not disk_info:
             return None
 
-        disk_type = disk_info['disk_type']
         disk_name = disk_info['disk_name']
 
-        # NVMe, MMC, and loop devices use 'p' prefix for partitions
-        if disk_type in ['nvme', 'mmc', 'loop']:
-            return f'/dev/{disk_name}p{partition_num}'
-
-        # SATA, IDE, VirtIO use direct numbering
-        elif disk_type in ['sata', 'ide', 'virtio']:
-            return f'/dev/{disk_name}{partition_num}'
-
-        # Unknown - guess based on whether base ends with digit
-        elif re.search(r'\d$', disk_name):
+        # Ask sysfs first - the partition may already exist
+        disk_sys = os.path.join(DiskUtils.SYS_BLOCK, disk_name)
+        try:
+            for entry in os.listdir(disk_sys):
+                if not entry.startswith(disk_name):
+                    continue
+                try:
+                    with open(os.path.join(disk_sys, entry, "partition"), "r") as f:
+                        if int(f.read().strip()) == int(partition_num):
+                            return f'/dev/{entry}'
+                except (OSError, ValueError):
+                    continue
+        except OSError:
+            pass
+
+        # Kernel naming rule: 'p' separator when the disk name ends with a digit
+        if disk_name[-1:].isdigit():
             return f'/dev/{disk_name}p{partition_num}'
-        else:
-            return f'/dev/{disk_name}{partition_num}'
+        return f'/dev/{disk_name}{partition_num}'
 
     @staticmethod
     def is_whole_disk(device_path):
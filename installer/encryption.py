@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import subprocess
+
+from .disk_utils import DiskUtils
+from .heavy_command import HeavyCommand
+
+
+class LuksManager:
+    """
+    LUKS2 setup with parameters calibrated to the machine.
+
+    ``cryptsetup benchmark`` runs once per session to pick the fastest
+    cipher the CPU accelerates, argon2id memory is sized from available RAM,
+    and NVMe targets get the workqueue bypass flags stored in the header.
+    """
+
+    # (cipher spec as printed by benchmark, --cipher, --key-size)
+    CANDIDATES = (
+        ("aes-xts", "512b", "aes-xts-plain64", 512),
+        ("serpent-xts", "512b", "serpent-xts-plain64", 512),
+        ("twofish-xts", "512b", "twofish-xts-plain64", 512),
+        ("xchacha12,aes-adiantum", "256b", "xchacha12,aes-adiantum-plain64", 256),
+        ("xchacha20,aes-adiantum", "256b", "xchacha20,aes-adiantum-plain64", 256),
+    )
+    DEFAULT_CIPHER = ("aes-xts-plain64", 512)
+
+    # argon2id limits (KiB); cryptsetup itself caps memory at 4 GiB
+    PBKDF_MEMORY_MIN = 64 * 1024
+    PBKDF_MEMORY_MAX = 1024 * 1024
+    PBKDF_ITER_TIME_MS = 2000
+
+    NVME_PERF_FLAGS = ("no_read_workqueue", "no_write_workqueue")
+
+    _BENCH_RE = re.compile(r"^\s*(\S+)\s+(\d+b)\s+([\d.]+)\s+MiB/s\s+([\d.]+)\s+MiB/s")
+
+    def __init__(self, log=print):
+        self.log = log
+        self._cipher = None
+
+    # ----------------------------
+    # Calibration
+    # ----------------------------
+    def select_cipher(self):
+        """Return (cipher, key_size) of the fastest supported cipher (benchmarked once)"""
+        if self._cipher is not None:
+            return self._cipher
+
+        try:
+            process = subprocess.run(
+                ["cryptsetup", "benchmark"], capture_output=True, text=True, timeout=120
+            )
+            output = process.stdout
+        except Exception as e:
+            self.log(f"[LUKS] cryptsetup benchmark failed: {e}\n")
+            output = ""
+
+        speeds = {}
+        for line in output.splitlines():
+            m = self._BENCH_RE.match(line)
+            if m:
+                # the slower direction bounds real-world throughput
+                speeds[(m.group(1), m.group(2))] = min(float(m.group(3)), float(m.group(4)))
+
+        best = None
+        for name, key_bits, cipher, key_size in self.CANDIDATES:
+            speed = speeds.get((name, key_bits))
+            if speed and (best is None or speed > best[0]):
+                best = (speed, cipher, key_size)
+
+        if best:
+            self.log(f"[LUKS] Selected {best[1]} ({best[2]}-bit key) at {best[0]:.0f} MiB/s\n")
+            self._cipher = (best[1], best[2])
+        else:
+            self._cipher = self.DEFAULT_CIPHER
+        return self._cipher
+
+    @staticmethod
+    def _meminfo():
+        info = {}
+        try:
+            with open("/proc/meminfo", "r") as f:
+                for line in f:
+                    key, _, value = line.partition(":")
+                    info[key] = int(value.split()[0])
+        except (OSError, ValueError, IndexError):
+            pass
+        return info
+
+    def pbkdf_params(self):
+        """
+        argon2id parameters sized to this machine.
+
+        Memory is kept well below what is available now and what the
+        initramfs will have at unlock time; the time cost is then found by
+        cryptsetup's own calibration against ``--iter-time``.
+        """
+        meminfo = self._meminfo()
+        available = meminfo.get("MemAvailable", self.PBKDF_MEMORY_MAX * 2)
+        total = meminfo.get("MemTotal", available)
+        memory = min(self.PBKDF_MEMORY_MAX, available // 2, total // 4)
+        memory = max(self.PBKDF_MEMORY_MIN, memory)
+
+        return {
+            "memory": memory,
+            "parallel": max(1, min(4, os.cpu_count() or 1)),
+            "iter_time": self.PBKDF_ITER_TIME_MS,
+        }
+
+    @staticmethod
+    def is_nvme(device):
+        info = DiskUtils.parse_disk_path(device)
+        return bool(info) and info["disk_type"] == "nvme"
+
+    # ----------------------------
+    # Operations
+    # ----------------------------
+    def format(self, device, passphrase):
+        """luksFormat ``device`` as LUKS2 with calibrated cipher and argon2id"""
+        cipher, key_size = self.select_cipher()
+        pbkdf = self.pbkdf_params()
+
+        cmd = [
+            "sudo", "cryptsetup", "luksFormat",
+            "--batch-mode",
+            "--type", "luks2",
+            "--cipher", cipher,
+            "--key-size", str(key_size),
+            "--pbkdf", "argon2id",
+            "--pbkdf-memory", str(pbkdf["memory"]),
+            "--pbkdf-parallel", str(pbkdf["parallel"]),
+            "--iter-time", str(pbkdf["iter_time"]),
+            "--key-file", "-",
+            device,
+        ]
+        self.log(f"[LUKS] Formatting {device}: {cipher}, argon2id {pbkdf['memory']} KiB x{pbkdf['parallel']}\n")
+        process = HeavyCommand.run(cmd, input=passphrase, capture_output=True, text=True, timeout=300)
+        if process.returncode != 0:
+            raise Exception(f"luksFormat failed on {device}: {process.stderr.strip()}")
+
+    def open(self, device, name, passphrase):
+        """
+        Open the container as /dev/mapper/<name>.
+
+        On NVMe the workqueue bypass flags are set with --persistent so the
+        installed system uses them too.
+        """
+        cmd = ["sudo", "cryptsetup", "open", "--type", "luks2", "--key-file", "-"]
+        if self.is_nvme(device):
+            cmd += [f"--perf-{flag}" for flag in self.NVME_PERF_FLAGS] + ["--persistent"]
+        cmd += [device, name]
+
+        process = subprocess.run(cmd, input=passphrase, capture_output=True, text=True, timeout=120)
+        if process.returncode != 0:
+            raise Exception(f"Failed to open {device}: {process.stderr.strip()}")
+        return f"/dev/mapper/{name}"
+
+    @staticmethod
+    def close(name):
+        subprocess.run(["sudo", "cryptsetup", "close", name], capture_output=True, text=True, timeout=60)
+
+    @staticmethod
+    def luks_uuid(device):
+        try:
+            process = subprocess.run(
+                ["sudo", "cryptsetup", "luksUUID", device], capture_output=True, text=True, timeout=30
+            )
+            if process.returncode == 0:
+                return process.stdout.strip() or None
+        except Exception:
+            pass
+        return None
+
+    def setup(self, device, name, passphrase):
+        """Format and open ``device``; returns (mapper path, LUKS UUID)"""
+        self.format(device, passphrase)
+        mapper = self.open(device, name, passphrase)
+        return mapper, self.luks_uuid(device)
+
+    @classmethod
+    def crypttab_line(cls, name, luks_uuid, device):
+        options = ["luks", "discard"]
+        if cls.is_nvme(device):
+            options += [flag.replace("_", "-") for flag in cls.NVME_PERF_FLAGS]
+        return f"{name:<20} UUID={luks_uuid:<40} none {','.join(options)}"
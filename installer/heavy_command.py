@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+import functools
+import os
+import shutil
+import subprocess
+
+
+class HeavyCommand:
+    """
+    Launcher for the CPU/IO-heavy steps (image deploy, mkfs, bootupctl).
+
+    With systemd and cgroup v2 each command runs in a transient scope with
+    a low CPU and IO weight and a MemoryHigh limit, so the GTK process keeps
+    getting CPU time while layers are decompressed and the command is
+    throttled by reclaim before the live session runs out of memory.
+    Without systemd the command is started through nice/ionice instead.
+
+    The installer lowers its own OOM score (protect_installer), which
+    every child would inherit through sudo and systemd-run; the wrapped
+    command is therefore started through ``choom`` (or a shell writing
+    oom_score_adj) with a positive score so it, not the installer, is what
+    the OOM killer picks.
+    """
+
+    CPU_WEIGHT = 20
+    IO_WEIGHT = 20
+    MEMORY_HIGH = "75%"
+    NICE = 10
+    IONICE_LEVEL = 7
+    # the installer itself should be the last candidate for the OOM killer
+    INSTALLER_OOM_SCORE_ADJ = -500
+    COMMAND_OOM_SCORE_ADJ = 500
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def backend():
+        """'systemd-run', 'nice' or None (run the command unchanged)"""
+        if (shutil.which("systemd-run") and os.path.isdir("/run/systemd/system")
+                and os.path.exists("/sys/fs/cgroup/cgroup.controllers")):
+            return "systemd-run"
+        if shutil.which("nice"):
+            return "nice"
+        return None
+
+    @classmethod
+    def argv(cls, cmd):
+        """``cmd`` wrapped for the available backend (a leading sudo stays in front)"""
+        cmd = list(cmd)
+        prefix = []
+        if cmd and cmd[0] == "sudo":
+            prefix, cmd = ["sudo"], cmd[1:]
+
+        backend = cls.backend()
+        if backend == "systemd-run" and (prefix or os.geteuid() == 0):
+            wrapper = [
+                "systemd-run", "--scope", "--quiet", "--collect",
+                "-p", f"CPUWeight={cls.CPU_WEIGHT}",
+                "-p", f"IOWeight={cls.IO_WEIGHT}",
+                "-p", f"MemoryHigh={cls.MEMORY_HIGH}",
+                "--",
+            ]
+        elif backend and shutil.which("nice"):
+            wrapper = ["nice", "-n", str(cls.NICE)]
+            if shutil.which("ionice"):
+                wrapper += ["ionice", "-c", "2", "-n", str(cls.IONICE_LEVEL)]
+        else:
+            wrapper = []
+        if shutil.which("choom"):
+            wrapper += ["choom", "-n", str(cls.COMMAND_OOM_SCORE_ADJ), "--"]
+        else:
+            # raising the score needs no privileges; preexec_fn is unsafe with threads
+            wrapper += ["sh", "-c", f'echo {cls.COMMAND_OOM_SCORE_ADJ} > /proc/self/oom_score_adj; exec "$@"', "sh"]
+        return prefix + wrapper + cmd
+
+    @classmethod
+    def run(cls, cmd, **kwargs):
+        """subprocess.run() through the launcher"""
+        return subprocess.run(cls.argv(cmd), **kwargs)
+
+    @classmethod
+    def popen(cls, cmd, **kwargs):
+        """subprocess.Popen() through the launcher"""
+        return subprocess.Popen(cls.argv(cmd), **kwargs)
+
+    @classmethod
+    def protect_installer(cls, log=print):
+        """Lower this process's OOM score so a runaway child is killed first"""
+        try:
+            with open("/proc/self/oom_score_adj", "w") as f:
+                f.write(str(cls.INSTALLER_OOM_SCORE_ADJ))
+            return True
+        except OSError as e:
+            log(f"[Pelican Installer] Could not lower the installer's OOM score: {e}")
+            return False
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+
+import json
+import os
+from dataclasses import dataclass, field, asdict, fields
+
+from .disk_utils import DiskUtils
+
+
+class InstallPlanError(Exception):
+    """Raised when the install plan is invalid or cannot be read"""
+
+
+@dataclass(slots=True)
+class PartitionPlan:
+    """One device the installer formats and/or mounts"""
+    device: str
+    mountpoint: str = ""
+    fstype: str = ""
+    bootable: bool = False
+    # LUKS2: the filesystem lives on /dev/mapper/<luks_name>
+    encrypted: bool = False
+    luks_name: str = ""
+    luks_uuid: str = ""
+    # Multi-disk root: RAID level and the member devices it spans
+    raid_level: str = ""
+    members: list[str] = field(default_factory=list)
+    # Hybrid root: lvmcache pool on this SSD partition
+    cache_device: str = ""
+    cache_mode: str = ""
+    # ext4 journal / XFS log on a separate (faster) partition
+    journal_device: str = ""
+
+    @property
+    def fs_device(self):
+        """Device that carries the filesystem (the mapper for encrypted partitions)"""
+        if self.encrypted and self.luks_name:
+            return f"/dev/mapper/{self.luks_name}"
+        return self.device
+
+    def journal_mount_option(self, path=None):
+        """Mount option pointing at the external journal/log, or '' when internal"""
+        if not self.journal_device:
+            return ""
+        path = path or self.journal_device
+        if self.fstype == "xfs":
+            return f"logdev={path}"
+        if self.fstype == "ext4":
+            return f"journal_path={path}"
+        return ""
+
+
+@dataclass(slots=True)
+class UserPlan:
+    """The account created on the target (never holds the plaintext password)"""
+    username: str
+    full_name: str = ""
+    password_hash: str | None = None
+
+
+@dataclass(slots=True)
+class SwapPlan:
+    """Swap chosen by the swap planner ('auto' | 'hibernate' | 'none')"""
+    mode: str = "auto"
+    kind: str = ""          # 'none', 'zram', 'swapfile' or 'partition'
+    size_mib: int = 0
+    algorithm: str = ""     # zram compression algorithm
+
+
+@dataclass(slots=True)
+class InstallPlan:
+    """
+    Every choice made in the installer, shared by all pages and install stages.
+
+    Lives in memory for the whole session; ``save`` is only called at
+    checkpoints (leaving the disk page, starting the installation) and
+    writes atomically.
+    """
+
+    VERSION = 1
+    CHECKPOINT_PATH = "/tmp/installer_config/install_plan.json"
+
+    language: str | None = None
+    extra_locales: list[str] = field(default_factory=list)
+    timezone: str | None = None
+    keyboard_layout: str | None = None
+    installation_mode: str | None = None   # 'auto' lub 'manual'
+    disk: str | None = None                # np. '/dev/sda'
+    partitions: dict[str, PartitionPlan] = field(default_factory=dict)
+    user: UserPlan | None = None
+    bootloader_devices: list[str] = field(default_factory=list)
+    subvolume_profile: str = "standard"
+    # Btrfs compress= value chosen by calibration; None = not calibrated, "" = no compression
+    btrfs_compression: str | None = None
+    swap: SwapPlan = field(default_factory=SwapPlan)
+
+    # ----------------------------
+    # Partitions
+    # ----------------------------
+    def set_partition(self, partition):
+        self.partitions[partition.device] = partition
+        return partition
+
+    def remove_partition(self, device):
+        return self.partitions.pop(device, None)
+
+    def partition_for(self, mountpoint):
+        """Return the partition mounted at ``mountpoint`` or None"""
+        for part in self.partitions.values():
+            if part.mountpoint == mountpoint:
+                return part
+        return None
+
+    @property
+    def root_partition(self):
+        return self.partition_for("/")
+
+    @property
+    def boot_partition(self):
+        """Partition holding the bootloader: /boot/efi, then /boot"""
+        return self.partition_for("/boot/efi") or self.partition_for("/boot")
+
+    @property
+    def boot_disks(self):
+        """Disks the bootloader is installed to"""
+        if self.bootloader_devices:
+            return list(self.bootloader_devices)
+        boot = self.boot_partition
+        if boot is None:
+            return []
+        info = DiskUtils.parse_disk_path(boot.device)
+        return [info["base_disk"]] if info else []
+
+    @property
+    def swap_partition(self):
+        for part in self.partitions.values():
+            if part.fstype == "swap":
+                return part
+        return None
+
+    @property
+    def block_devices(self):
+        """Every device the plan writes to: partitions, RAID members, cache and journal devices"""
+        devices = []
+        for part in self.partitions.values():
+            for device in [part.device, *part.members, part.cache_device, part.journal_device]:
+                if device and device not in devices:
+                    devices.append(device)
+        return devices
+
+    @property
+    def encrypted_partitions(self):
+        return [p for p in self.partitions.values() if p.encrypted]
+
+    def partition_problems(self):
+        """Return a list of missing partition requirements (empty when valid)"""
+        problems = []
+        if self.root_partition is None:
+            problems.append("Root (/) mountpoint")
+        if not any(p.bootable for p in self.partitions.values()):
+            problems.append("Bootable partition")
+
+        if self.swap.kind == "partition" and self.swap_partition is None:
+            problems.append("Swap partition (needed for hibernation)")
+
+        seen = set()
+        for part in self.partitions.values():
+            if not part.mountpoint or part.fstype == "swap":
+                continue
+            if not part.mountpoint.startswith("/"):
+                problems.append(f"Mountpoint of {part.device} must be absolute: {part.mountpoint}")
+            if part.mountpoint in seen:
+                problems.append(f"Mountpoint {part.mountpoint} is used more than once")
+            seen.add(part.mountpoint)
+            if part.encrypted and not part.luks_name:
+                problems.append(f"Encrypted partition {part.device} has no mapper name")
+            if part.journal_device and part.fstype not in ("ext4", "xfs"):
+                problems.append(f"External journal on {part.device} needs ext4 or XFS")
+            if part.journal_device == part.device:
+                problems.append(f"Journal device of {part.device} must be a separate partition")
+            if part.raid_level and len(part.members) < 2:
+                problems.append(f"{part.raid_level} on {part.mountpoint} needs at least two member devices")
+        return problems
+
+    # ----------------------------
+    # Validation
+    # ----------------------------
+    def validate(self):
+        """Raise InstallPlanError listing everything that blocks installation"""
+        problems = self.partition_problems()
+        if not self.language:
+            problems.append("Language")
+        if not self.timezone:
+            problems.append("Timezone")
+        if not self.keyboard_layout:
+            problems.append("Keyboard layout")
+        if self.user is None or not self.user.username:
+            problems.append("User account")
+        elif not self.user.password_hash:
+            problems.append("User password")
+
+        if problems:
+            raise InstallPlanError("Incomplete installation plan:\n• " + "\n• ".join(problems))
+
+    # ----------------------------
+    # Persistence
+    # ----------------------------
+    def to_dict(self):
+        return {
+            "version": self.VERSION,
+            "language": self.language,
+            "extra_locales": list(self.extra_locales),
+            "timezone": self.timezone,
+            "keyboard_layout": self.keyboard_layout,
+            "installation_mode": self.installation_mode,
+            "disk": self.disk,
+            "partitions": [asdict(p) for p in self.partitions.values()],
+            "user": asdict(self.user) if self.user else None,
+            "bootloader_devices": list(self.bootloader_devices),
+            "subvolume_profile": self.subvolume_profile,
+            "btrfs_compression": self.btrfs_compression,
+            "swap": asdict(self.swap),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if not isinstance(data, dict) or data.get("version") != cls.VERSION:
+            raise InstallPlanError("Unsupported install plan format")
+
+        def build(klass, values):
+            names = {f.name for f in fields(klass)}
+            unknown = set(values) - names
+            if unknown:
+                raise InstallPlanError(f"Unknown {klass.__name__} fields: {', '.join(sorted(unknown))}")
+            try:
+                return klass(**values)
+            except TypeError as e:
+                raise InstallPlanError(f"Invalid {klass.__name__}: {e}") from e
+
+        plan = cls(
+            language=data.get("language"),
+            extra_locales=list(data.get("extra_locales") or []),
+            timezone=data.get("timezone"),
+            keyboard_layout=data.get("keyboard_layout"),
+            installation_mode=data.get("installation_mode"),
+            disk=data.get("disk"),
+            bootloader_devices=list(data.get("bootloader_devices") or []),
+            subvolume_profile=data.get("subvolume_profile") or "standard",
+            btrfs_compression=data.get("btrfs_compression"),
+        )
+        for values in data.get("partitions") or []:
+            plan.set_partition(build(PartitionPlan, values))
+        if data.get("user"):
+            plan.user = build(UserPlan, data["user"])
+        if data.get("swap"):
+            plan.swap = build(SwapPlan, data["swap"])
+        return plan
+
+    def save(self, path=None):
+        """Atomically write the plan (write temp file + rename)"""
+        path = path or self.CHECKPOINT_PATH
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=None):
+        """
+        Load a checkpoint.
+
+        Returns:
+            InstallPlan, or None if no checkpoint exists
+
+        Raises:
+            InstallPlanError if the checkpoint exists but is invalid
+        """
+        path = path or cls.CHECKPOINT_PATH
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            raise InstallPlanError(f"Cannot read install plan {path}: {e}") from e
+        return cls.from_dict(data)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import time
+
+
+class InstallReport:
+    """
+    Measurements and decisions taken during the session.
+
+    Sections are recorded as the installer goes (calibrations, stage
+    timings) and checkpointed next to the install plan; the final report
+    is copied into the installed system's /var/log.
+    """
+
+    PATH = "/tmp/installer_config/install_report.json"
+    TARGET_NAME = os.path.join("log", "pelican-installer", "install-report.json")
+
+    def __init__(self, sections=None):
+        self.sections = sections or {}
+
+    @classmethod
+    def load(cls, path=None):
+        """Load the checkpointed report; an unreadable one starts empty"""
+        try:
+            with open(path or cls.PATH, "r") as f:
+                data = json.load(f)
+            return cls(data if isinstance(data, dict) else None)
+        except (OSError, ValueError):
+            return cls()
+
+    def record(self, section, **values):
+        """Merge ``values`` into ``section`` and checkpoint"""
+        entry = self.sections.setdefault(section, {})
+        entry.update(values)
+        entry["recorded_at"] = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+        try:
+            self.save()
+        except OSError as e:
+            print(f"[InstallReport] Failed to save report: {e}")
+
+    def save(self, path=None):
+        """Atomically write the report (write temp file + rename)"""
+        path = path or self.PATH
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.sections, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def write_to(self, var_root):
+        """Copy the report into <var_root>/log/pelican-installer/"""
+        path = os.path.join(var_root, self.TARGET_NAME)
+        self.save(path)
+        return path
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+
+import os
+import time
+
+from .compression import CompressionCalibrator
+from .disk_utils import DiskUtils
+
+
+class IoTuning:
+    """
+    Temporary block-layer and writeback tuning for the big deploy write.
+
+    Used as a context manager: on enter the target disks get a scheduler
+    suited to a single bulk writer and a larger read-ahead, and the vm
+    dirty thresholds are lowered so writeback starts early and never
+    builds a multi-gigabyte backlog in the live session's RAM. Every value
+    is restored in ``__exit__``, also when the deploy fails.
+    """
+
+    VM = "/proc/sys/vm"
+    DIRTY_KEYS = ("dirty_bytes", "dirty_background_bytes", "dirty_ratio", "dirty_background_ratio",
+                  "dirty_expire_centisecs", "dirty_writeback_centisecs")
+    DIRTY_VALUES = {
+        "dirty_background_bytes": 64 * 1024 * 1024,
+        "dirty_bytes": 256 * 1024 * 1024,
+        "dirty_expire_centisecs": 1500,
+        "dirty_writeback_centisecs": 100,
+    }
+    READ_AHEAD_KB = {"rotational": 4096, "solid": 1024}
+
+    def __init__(self, devices, probe_dir=None, log=print):
+        """
+        Args:
+            devices: Planned devices (partitions, mappers, md arrays, LVs);
+                tuning is applied to the physical disks under them
+            probe_dir: Mounted target directory for the before/after write probe
+        """
+        self.disks = self.physical_disks(devices)
+        self.probe_dir = probe_dir
+        self.log = log
+        self._saved = {}
+        self._written_start = {}
+        self._start = None
+        self.results = {}
+
+    # ----------------------------
+    # Discovery
+    # ----------------------------
+    @staticmethod
+    def _slaves(name):
+        try:
+            return os.listdir(os.path.join(DiskUtils.SYS_BLOCK, name, "slaves"))
+        except OSError:
+            return []
+
+    @classmethod
+    def physical_disks(cls, devices):
+        """Whole disks under ``devices``, following dm/md slaves"""
+        disks = set()
+        pending = [DiskUtils._kernel_name(d) for d in devices if d and d.startswith("/dev/")]
+        seen = set()
+        while pending:
+            name = pending.pop()
+            if name in seen:
+                continue
+            seen.add(name)
+            slaves = cls._slaves(name)
+            if slaves:
+                pending.extend(slaves)
+                continue
+            info = DiskUtils.parse_disk_path(f"/dev/{name}")
+            if info and os.path.isdir(os.path.join("/sys/block", info["disk_name"], "queue")):
+                disks.add(info["disk_name"])
+        return sorted(disks)
+
+    # ----------------------------
+    # sysfs / procfs helpers
+    # ----------------------------
+    @staticmethod
+    def _read(path):
+        with open(path, "r") as f:
+            return f.read().strip()
+
+    def _set(self, path, value, original=None):
+        """Write ``value`` to ``path``, remembering the original (or ``original``) once"""
+        try:
+            if path not in self._saved:
+                self._saved[path] = self._read(path) if original is None else original
+            with open(path, "w") as f:
+                f.write(str(value))
+            return True
+        except OSError as e:
+            self.log(f"[I/O] Cannot set {path}: {e}\n")
+            return False
+
+    @staticmethod
+    def _current_scheduler(text):
+        for word in text.split():
+            if word.startswith("["):
+                return word.strip("[]")
+        return None
+
+    def _pick_scheduler(self, disk, available):
+        rotational = self._read(f"/sys/block/{disk}/queue/rotational") == "1"
+        if rotational:
+            preferred = ("mq-deadline", "bfq")
+        else:
+            # NVMe and SSDs reorder internally; skip the scheduler entirely
+            preferred = ("none", "mq-deadline")
+        return next((s for s in preferred if s in available), None), rotational
+
+    def _written_bytes(self, disk):
+        try:
+            return int(self._read(f"/sys/block/{disk}/stat").split()[6]) * 512
+        except (OSError, ValueError, IndexError):
+            return 0
+
+    def _probe(self):
+        if not self.probe_dir:
+            return None
+        try:
+            return round(CompressionCalibrator().measure_write_rate(self.probe_dir), 1)
+        except OSError as e:
+            self.log(f"[I/O] Write probe failed: {e}\n")
+            return None
+
+    # ----------------------------
+    # Context manager
+    # ----------------------------
+    def __enter__(self):
+        self.results["probe_before_mb_s"] = self._probe()
+
+        for disk in self.disks:
+            queue = f"/sys/block/{disk}/queue"
+            try:
+                text = self._read(f"{queue}/scheduler")
+            except OSError:
+                continue
+            available = text.replace("[", "").replace("]", "").split()
+            scheduler, rotational = self._pick_scheduler(disk, available)
+            current = self._current_scheduler(text)
+            if scheduler and scheduler != current:
+                # the file lists every scheduler ("[mq-deadline] kyber none"); only the bare name can be written back
+                self._set(f"{queue}/scheduler", scheduler, original=current)
+            read_ahead = self.READ_AHEAD_KB["rotational" if rotational else "solid"]
+            try:
+                if int(self._read(f"{queue}/read_ahead_kb")) < read_ahead:
+                    self._set(f"{queue}/read_ahead_kb", read_ahead)
+            except (OSError, ValueError):
+                pass
+            self.log(f"[I/O] {disk}: scheduler {scheduler or 'unchanged'}, read_ahead_kb {read_ahead}\n")
+
+        # the ratio/bytes pairs zero each other, so save all of them first
+        for key in self.DIRTY_KEYS:
+            path = os.path.join(self.VM, key)
+            try:
+                self._saved.setdefault(path, self._read(path))
+            except OSError:
+                pass
+        for key, value in self.DIRTY_VALUES.items():
+            self._set(os.path.join(self.VM, key), value)
+
+        self.results["probe_after_mb_s"] = self._probe()
+        self._written_start = {disk: self._written_bytes(disk) for disk in self.disks}
+        self._start = time.perf_counter()
+        return self
+
+    def _restore(self):
+        vm_bytes = {os.path.join(self.VM, k) for k in ("dirty_bytes", "dirty_background_bytes")}
+        vm_ratio = {os.path.join(self.VM, k) for k in ("dirty_ratio", "dirty_background_ratio")}
+
+        for path, value in self._saved.items():
+            # a zero *_bytes means the *_ratio was in effect: restore that instead
+            if path in vm_bytes and value == "0":
+                continue
+            if path in vm_ratio and self._saved.get(path.replace("_ratio", "_bytes"), "0") != "0":
+                continue
+            try:
+                with open(path, "w") as f:
+                    f.write(value)
+            except OSError as e:
+                self.log(f"[I/O] Cannot restore {path}: {e}\n")
+        self._saved = {}
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._start if self._start else 0
+        written = sum(self._written_bytes(d) - self._written_start.get(d, 0) for d in self.disks)
+        self._restore()
+
+        self.results["deploy_seconds"] = round(elapsed, 1)
+        self.results["deploy_bytes"] = written
+        self.results["deploy_mb_s"] = round(written / elapsed / 1e6, 1) if elapsed else None
+        self.log(
+            f"[I/O] Write probe before tuning: {self.results['probe_before_mb_s']} MB/s, "
+            f"after: {self.results['probe_after_mb_s']} MB/s; deploy wrote "
+            f"{written / (1024 * 1024):.0f} MiB at {self.results['deploy_mb_s']} MB/s\n"
+        )
+        self.log("[I/O] Restored original I/O settings\n")
+        return False
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import os
+import subprocess
+
+from .heavy_command import HeavyCommand
+
+
+class LiveOstreeSource:
+    """
+    The ostree deployment the live system itself booted from.
+
+    When its commit was imported from the same container image as the
+    one being installed (its ostree.manifest-digest equals the image's
+    manifest digest), the objects are copied with ``pull-local`` from
+    the live repo instead of downloading the image again. ostree
+    hardlinks objects when both repos are on one filesystem and copies
+    them (reflinking where the filesystem can) otherwise.
+    """
+
+    SYSROOT = "/sysroot"
+    BOOTED_FLAG = "/run/ostree-booted"
+    CONTAINER_REFS = "ostree/container/"
+
+    def __init__(self, repo, stateroot, commit, digest, refs):
+        self.repo = repo
+        self.stateroot = stateroot
+        self.commit = commit
+        self.digest = digest
+        self.refs = refs
+
+    @staticmethod
+    def _ostree(*args):
+        process = subprocess.run(["ostree", *args], capture_output=True, text=True, timeout=60)
+        return process.stdout.strip() if process.returncode == 0 else None
+
+    @classmethod
+    def _booted_deployment(cls):
+        """(stateroot, commit) from the ostree= karg of the running system"""
+        with open("/proc/cmdline", "r") as f:
+            args = f.read().split()
+        target = next((a[len("ostree="):] for a in args if a.startswith("ostree=")), None)
+        if not target:
+            return None
+        # .../ostree/deploy/<stateroot>/deploy/<commit>.<serial>
+        deploy_dir = os.path.realpath(os.path.join(cls.SYSROOT, target.lstrip("/")))
+        parts = deploy_dir.split(os.sep)
+        if len(parts) < 4 or parts[-2] != "deploy":
+            return None
+        return parts[-3], os.path.basename(deploy_dir).split(".")[0]
+
+    @classmethod
+    def detect(cls):
+        """The booted deployment's source, or None when not booted from ostree"""
+        if not os.path.exists(cls.BOOTED_FLAG):
+            return None
+        try:
+            booted = cls._booted_deployment()
+        except OSError:
+            return None
+        if booted is None:
+            return None
+
+        stateroot, commit = booted
+        repo = os.path.join(cls.SYSROOT, "ostree", "repo")
+        digest = cls._ostree("show", f"--repo={repo}", "--print-metadata-key=ostree.manifest-digest", commit)
+        if not digest:
+            return None
+        refs = (cls._ostree("refs", f"--repo={repo}") or "").split()
+        return cls(repo, stateroot, commit, digest.strip("'"),
+                   [ref for ref in refs if ref.startswith(cls.CONTAINER_REFS)])
+
+    def matches(self, manifest):
+        return manifest is not None and manifest.digest == self.digest
+
+    def pull_local(self, sysroot, stateroot, log=print):
+        """
+        Copy the commit and the container image/layer refs into the
+        sysroot's repo and make sure ``stateroot`` exists for the deploy.
+        """
+        target_repo = os.path.join(sysroot, "ostree", "repo")
+        cmd = ["ostree", f"--repo={target_repo}", "pull-local", self.repo, self.commit, *self.refs]
+        log(f"Running: {' '.join(cmd[:5])} {self.commit} (+{len(self.refs)} refs)\n")
+        process = HeavyCommand.run(cmd, capture_output=True, text=True)
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, cmd, process.stdout, process.stderr)
+
+        stateroot_dir = os.path.join(sysroot, "ostree", "deploy", stateroot)
+        if os.path.isdir(stateroot_dir):
+            # the mount tree already created <stateroot>/var for the /var mounts,
+            # where os-init refuses to run; the deploy only needs deploy/ next to it
+            os.makedirs(os.path.join(stateroot_dir, "deploy"), exist_ok=True)
+            return
+        subprocess.run(["ostree", "admin", "os-init", f"--sysroot={sysroot}", stateroot],
+                       capture_output=True, text=True, timeout=60, check=True)
+
+    def deploy_cmd(self, sysroot, stateroot, image_ref, kargs, origin_path):
+        """
+        ``ostree admin deploy`` of the pulled commit.
+
+        The origin written to ``origin_path`` points at the registry image,
+        so later upgrades track it exactly like a deployment made by
+        ``ostree container image deploy``.
+        """
+        os.makedirs(os.path.dirname(origin_path), exist_ok=True)
+        with open(origin_path, "w") as f:
+            f.write(f"[origin]\ncontainer-image-reference=ostree-unverified-registry:{image_ref}\n")
+        cmd = ["ostree", "admin", "deploy", f"--sysroot={sysroot}", f"--os={stateroot}", f"--origin-file={origin_path}"]
+        cmd += [f"--karg-append={karg}" for karg in kargs]
+        return cmd + [self.commit]
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+import functools
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from .heavy_command import HeavyCommand
+
+
+class LocaleUtils:
+    """Discover locales supported by the image and compile selected ones into a target"""
+
+    SUPPORTED_PATH = "/usr/share/i18n/SUPPORTED"
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def get_supported_locales(supported_path=None):
+        """
+        Return the UTF-8 locales the image can generate.
+
+        Reads glibc's SUPPORTED list and falls back to ``locale -a`` when the
+        list is not shipped. The result is cached for the process lifetime.
+
+        Returns:
+            tuple of locale names, e.g. ('en_US.UTF-8', 'sr_RS.UTF-8@latin')
+        """
+        path = supported_path or LocaleUtils.SUPPORTED_PATH
+        locales = set()
+
+        try:
+            with open(path, "r") as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) != 2 or parts[1] != "UTF-8":
+                        continue
+                    locales.add(LocaleUtils.normalize(parts[0]))
+        except OSError:
+            try:
+                p = subprocess.run(["locale", "-a"], capture_output=True, text=True, timeout=10, check=True)
+                for name in p.stdout.split():
+                    if ".utf8" in name.lower() or ".utf-8" in name.lower():
+                        locales.add(LocaleUtils.normalize(name))
+            except Exception:
+                pass
+
+        if not locales:
+            locales.add("en_US.UTF-8")
+        return tuple(sorted(locales))
+
+    @staticmethod
+    def normalize(name):
+        """Normalize ``sr_RS@latin`` / ``en_US.utf8`` to ``sr_RS.UTF-8@latin`` / ``en_US.UTF-8``"""
+        base, _, modifier = name.partition("@")
+        base = base.split(".")[0]
+        result = f"{base}.UTF-8"
+        return f"{result}@{modifier}" if modifier else result
+
+    @staticmethod
+    def split_locale(name):
+        """
+        Split a locale name into localedef input and charmap.
+
+        Args:
+            name: Locale like 'en_US.UTF-8' or 'sr_RS.UTF-8@latin'
+
+        Returns:
+            (input, charmap) tuple, e.g. ('sr_RS@latin', 'UTF-8')
+        """
+        base, _, modifier = name.partition("@")
+        territory, _, charmap = base.partition(".")
+        source = f"{territory}@{modifier}" if modifier else territory
+        return source, charmap or "UTF-8"
+
+    @staticmethod
+    def compile_locales(target_root, locales, jobs=None, log=print):
+        """
+        Compile only the given locales into ``target_root`` in parallel.
+
+        Each locale is written in directory form (``--no-archive``) below
+        ``<target_root>/usr/lib/locale`` so nothing else from the image's
+        locale set is generated.
+
+        Returns:
+            list of (locale, error) tuples for locales that failed
+        """
+        wanted = []
+        for name in locales:
+            if name and name not in wanted:
+                wanted.append(name)
+        if not wanted:
+            return []
+
+        os.makedirs(os.path.join(target_root, "usr/lib/locale"), exist_ok=True)
+
+        def build(name):
+            source, charmap = LocaleUtils.split_locale(name)
+            cmd = [
+                "localedef", "--no-archive",
+                "--prefix", target_root,
+                "-i", source, "-f", charmap,
+                name,
+            ]
+            process = HeavyCommand.run(cmd, capture_output=True, text=True, timeout=300)
+            # localedef exits 1 on warnings but still writes the locale
+            if process.returncode > 1:
+                return name, process.stderr.strip() or f"exit code {process.returncode}"
+            log(f"Generated locale {name}\n")
+            return name, None
+
+        workers = jobs or min(len(wanted), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(build, wanted))
+
+        return [(name, err) for name, err in results if err]
@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import os
 import sys
 import signal
 import gi
@@ -14,26 +15,73 @@ from installer.pages.keyborard_select import KeyboardLayoutPage
 from installer.pages.disk_managent import DiskManagent
 from installer.pages.user_creation import UserAccountPage
 from installer.pages.installation_page import InstallationPage
+from installer.install_plan import InstallPlan, InstallPlanError
+from installer.install_report import InstallReport
+from installer.heavy_command import HeavyCommand
+from installer.ui_watchdog import MainLoopWatchdog
+from installer.registry_mirrors import RegistryMirrors
 
 Adw.init()
 
 
 
 class PelicanInstallerApp(Adw.Application):
+    # Wznowienie z punktu kontrolnego tylko na wyraźne żądanie (PELICAN_RESUME=1)
+    RESUME_ENV = "PELICAN_RESUME"
+
     def __init__(self):
         super().__init__(
             application_id="org.pelican.installer",
             flags=Gio.ApplicationFlags.FLAGS_NONE
         )
         self.connect("activate", self.on_activate)
-        # INSTALATION DATA
-        self.selected_language = None
-        self.installation_mode = None   # 'auto' lub 'manual'
-        self.selected_disk = None       # np. '/dev/sda'
-        self.selected_layout = None
-        self.selected_timezone = None
+        # INSTALATION DATA - wspólny plan dla wszystkich stron i etapów
+        self.plan = self._load_plan()
+        # Pomiary i decyzje instalatora (kalibracje, czasy etapów)
+        self.report = InstallReport.load()
+        # Pomiar lustrzanych rejestrów w tle, wynik potrzebny dopiero przy wdrożeniu
+        self.mirrors = RegistryMirrors.load()
+        if self.mirrors is not None and self.mirrors.mirrors:
+            self.mirrors.start()
+        # Opcjonalny pomiar opóźnień pętli GTK (PELICAN_INSTRUMENT=1)
+        self.watchdog = None
+        if MainLoopWatchdog.enabled():
+            self.watchdog = MainLoopWatchdog()
+            self.watchdog.instrument(DiskManagent, "_on_refresh", "_on_disk_selected", "populate_partitions_for_disk")
+            self.watchdog.instrument(TimezoneSelectPage, "populate_timezones")
+            self.watchdog.instrument(KeyboardLayoutPage, "populate_layouts")
+            self.watchdog.instrument(UserAccountPage, "_validate_inputs")
+            self.connect("shutdown", self.on_shutdown)
+
+    def _load_plan(self):
+        """
+        A fresh plan; the last checkpoint is resumed only with PELICAN_RESUME=1.
+
+        A leftover checkpoint from an earlier session would otherwise be
+        installed while the pages still show their defaults.
+        """
+        if os.environ.get(self.RESUME_ENV, "") in ("", "0"):
+            return InstallPlan()
+        try:
+            plan = InstallPlan.load()
+        except InstallPlanError as e:
+            print(f"[Pelican Installer] Ignoring saved install plan: {e}")
+            plan = None
+        if plan is not None:
+            print(f"[Pelican Installer] Resumed install plan from {InstallPlan.CHECKPOINT_PATH}")
+        return plan or InstallPlan()
+
+    def save_plan(self):
+        """Checkpoint the install plan to disk"""
+        try:
+            self.plan.save()
+        except OSError as e:
+            print(f"[Pelican Installer] Failed to save install plan: {e}")
 
     def on_activate(self, app):
+        if self.watchdog is not None:
+            self.watchdog.start()
+
         # główne okno
         self.window = Adw.ApplicationWindow(application=app)
         self.window.set_title("Pelican Installer 🪶")
@@ -98,6 +146,13 @@ class PelicanInstallerApp(Adw.Application):
         """Przełączanie stron"""
         self.stack.set_visible_child_name(page_name)
 
+    def on_shutdown(self, app):
+        """Zapis raportu z pomiarów pętli GTK"""
+        self.watchdog.stop()
+        summary = self.watchdog.summary()
+        self.report.record("ui_watchdog", **summary)
+        print(f"[Pelican Installer] UI watchdog: {len(summary['stalls'])} stalls, report in {InstallReport.PATH}")
+
     def on_close_request(self, *args):
         """Zamknięcie aplikacji (np. przy zamykaniu okna)"""
         print("[Pelican Installer] Closing gracefully...")
@@ -106,6 +161,7 @@ class PelicanInstallerApp(Adw.Application):
 
     # Kiedy użytkownik kliknie "Begin installation"
     def on_begin_installation(self):
+        self.save_plan()
         self.go_to("install")
         self.installation_page.start_installation()
 
@@ -114,6 +170,9 @@ class PelicanInstallerApp(Adw.Application):
 def main():
     app = PelicanInstallerApp()
 
+    # Przy braku pamięci OOM killer ma wybrać ciężki proces potomny, nie instalator
+    HeavyCommand.protect_installer()
+
     # Obsługa sygnałów — zamknięcie aplikacji w GTK4
     import signal
     signal.signal(signal.SIGINT, lambda s, f: app.quit())    # Ctrl+C
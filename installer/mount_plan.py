@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+import ctypes
+import ctypes.util
+import os
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from .disk_utils import DiskUtils
+
+_libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+
+
+class MountError(Exception):
+    """Raised when a mount in the tree fails (everything mounted so far is undone)"""
+
+
+@dataclass(slots=True)
+class MountEntry:
+    """One mount: ``source`` on ``target`` (a path in the live system)"""
+    source: str
+    target: str
+    fstype: str = "auto"
+    options: list[str] = field(default_factory=list)
+    children: list["MountEntry"] = field(default_factory=list)
+
+    def command(self):
+        cmd = ["mount", "-t", self.fstype or "auto"]
+        if self.options:
+            cmd += ["-o", ",".join(self.options)]
+        return cmd + [self.source, self.target]
+
+
+class MountTree:
+    """
+    Mounts ordered by their target paths.
+
+    Every entry hangs under the entry with the longest target that is a
+    path prefix of its own, so parents are always mounted before children
+    (``/boot`` before ``/boot/efi``) whatever order the plan lists them
+    in. Each depth level is mounted concurrently; unmounting walks the
+    levels backwards, leaves first.
+    """
+
+    MAX_WORKERS = 4
+
+    def __init__(self, entries, log=print):
+        self.log = log
+        self.root = None
+        self.levels = []
+        self.mounted = []
+        self._build(entries)
+
+    @staticmethod
+    def _is_under(path, parent):
+        return path != parent and (parent == "/" or path.startswith(parent.rstrip("/") + "/"))
+
+    def _build(self, entries):
+        entries = sorted(entries, key=lambda e: e.target.rstrip("/").count("/"))
+        targets = [os.path.normpath(e.target) for e in entries]
+        if len(set(targets)) != len(targets):
+            raise MountError("The same target is mounted more than once")
+
+        placed = []
+        for entry in entries:
+            entry.target = os.path.normpath(entry.target)
+            parents = [p for p in placed if self._is_under(entry.target, p.target)]
+            if parents:
+                max(parents, key=lambda p: len(p.target)).children.append(entry)
+            elif self.root is None:
+                self.root = entry
+            else:
+                raise MountError(f"{entry.target} is not below the target root {self.root.target}")
+            placed.append(entry)
+
+        level = [self.root] if self.root else []
+        while level:
+            self.levels.append(level)
+            level = [child for entry in level for child in entry.children]
+
+    def _mount_one(self, entry):
+        os.makedirs(entry.target, exist_ok=True)
+        process = subprocess.run(entry.command(), capture_output=True, text=True, timeout=120)
+        if process.returncode != 0:
+            raise MountError(f"Failed to mount {entry.source} on {entry.target}: {process.stderr.strip()}")
+        self.log(f"Mounted {entry.source} -> {entry.target}\n")
+        return entry
+
+    def mount_all(self):
+        """Mount level by level; on any failure unmount what was mounted and raise"""
+        with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as pool:
+            for level in self.levels:
+                futures = [pool.submit(self._mount_one, entry) for entry in level]
+                errors = []
+                for future in futures:
+                    try:
+                        self.mounted.append(future.result())
+                    except Exception as e:
+                        errors.append(str(e))
+                if errors:
+                    self.unmount_all()
+                    raise MountError("; ".join(errors))
+
+    @staticmethod
+    def _written_bytes(device):
+        """Bytes written to ``device`` so far (sectors written in /sys/class/block/<dev>/stat)"""
+        name = DiskUtils._kernel_name(device)
+        try:
+            with open(os.path.join(DiskUtils.SYS_BLOCK, name, "stat"), "r") as f:
+                return int(f.read().split()[6]) * 512
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def _sync_one(self, entry):
+        """syncfs() the filesystem mounted at ``entry``; returns its timing and bytes"""
+        before = self._written_bytes(entry.source)
+        start = time.perf_counter()
+        fd = os.open(entry.target, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            if _libc.syncfs(fd) != 0:
+                err = ctypes.get_errno()
+                raise OSError(err, os.strerror(err))
+        finally:
+            os.close(fd)
+        elapsed = time.perf_counter() - start
+        after = self._written_bytes(entry.source)
+        written = after - before if before is not None and after is not None else None
+        return {"device": entry.source, "target": entry.target, "seconds": round(elapsed, 3), "bytes": written}
+
+    def sync_all(self):
+        """
+        One syncfs() per mounted filesystem, all in parallel.
+
+        Subvolume mounts of one Btrfs share a superblock, so only the first
+        mount of each source device is synced.
+        """
+        seen = set()
+        entries = []
+        for entry in self.mounted:
+            if entry.source not in seen:
+                seen.add(entry.source)
+                entries.append(entry)
+
+        with ThreadPoolExecutor(max_workers=max(1, len(entries))) as pool:
+            return list(pool.map(self._sync_one, entries))
+
+    @staticmethod
+    def _unmount_one(entry):
+        process = subprocess.run(["umount", entry.target], capture_output=True, text=True, timeout=120)
+        if process.returncode != 0:
+            return f"{entry.target}: {process.stderr.strip()}"
+        return None
+
+    def unmount_all(self):
+        """Unmount everything mounted by this tree, leaves first; returns the errors"""
+        mounted = set(id(e) for e in self.mounted)
+        errors = []
+        with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as pool:
+            for level in reversed(self.levels):
+                level = [e for e in level if id(e) in mounted]
+                for error in pool.map(self._unmount_one, level):
+                    if error:
+                        errors.append(error)
+                        self.log(f"[ERROR] Failed to unmount {error}\n")
+        self.mounted = []
+        return errors
@@ -4,33 +4,55 @@ import subprocess
 import json
 import os
 import tempfile
+import threading
 import time
 
 gi.require_version("Gtk", "4.0")
 gi.require_version("Adw", "1")
 from gi.repository import Gtk, Adw, Gio, GLib
 from ..disk_utils import DiskUtils
+from ..install_plan import PartitionPlan
+from ..encryption import LuksManager
+from ..raid import RaidLayout
+from ..cache_tier import CacheTier
+from ..btrfs_layout import BtrfsLayout
+from ..compression import CompressionCalibrator
+from ..swap import SwapPlanner
+from ..heavy_command import HeavyCommand
+from ..disk_probe import DiskProbe
 
 
 class DiskManagent(Adw.Bin):
     FS_CHOICES = ["ext4", "btrfs", "xfs", "f2fs", "vfat", "ntfs", "exfat", "swap"]
     SIZE_UNITS = ["MB", "GB", "TB"]
+    # filesystems that can keep their journal/log on another partition
+    JOURNAL_FS = ("ext4", "xfs")
 
     def __init__(self, app):
         super().__init__()
         self.app = app
         self.partition_rows = []
         self.selected_row = None
-        self.partition_config = {}
-        # Btrfs subvolumes configuration
-        self.btrfs_subvolumes = {
-            'root': '/',
-            'home': '/home',
-            'var': '/var'
-        }
-        self.init_partition_config()
+        self.selected_disk = app.plan.disk
+        self.luks = LuksManager()
+        # Wyniki testu przepustowości dysków: ścieżka -> wynik DiskProbe
+        self.disk_probes = {}
+        self._probing = set()
+        # Kalibracja kompresji działa w tle na zamontowanym nowym Btrfs
+        self._calibrating = False
         self.set_child(self._build_ui())
 
+    @property
+    def btrfs_subvolumes(self):
+        """Btrfs subvolumes of the selected layout profile: name -> mountpoint"""
+        return {sv.name: sv.mountpoint for sv in self._subvolumes()}
+
+    def _subvolumes(self):
+        """Subvolumes to create and mount: the layout profile plus the swap subvolume if needed"""
+        return BtrfsLayout.subvolumes(
+            self.app.plan.subvolume_profile, swapfile=self.app.plan.swap.kind == "swapfile"
+        )
+
     def _build_ui(self):
         outer = Gtk.Box(
             orientation=Gtk.Orientation.VERTICAL,
@@ -77,10 +99,48 @@ class DiskManagent(Adw.Bin):
         self.btn_auto.connect("clicked", self._on_auto_configure)
         action_box.append(self.btn_auto)
 
+        self.btn_multi = Gtk.Button(label="Multi-disk Root")
+        self.btn_multi.connect("clicked", self._on_multi_disk_configure)
+        action_box.append(self.btn_multi)
+
+        self.btn_hybrid = Gtk.Button(label="SSD Cache")
+        self.btn_hybrid.connect("clicked", self._on_hybrid_configure)
+        action_box.append(self.btn_hybrid)
+
         self.btn_refresh = Gtk.Button(label="Refresh")
         self.btn_refresh.connect("clicked", self._on_refresh)
         action_box.append(self.btn_refresh)
 
+        # Btrfs subvolume layout profile
+        layout_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+        outer.append(layout_box)
+        layout_label = Gtk.Label(label="Btrfs layout:")
+        layout_box.append(layout_label)
+        self.layout_combo = Gtk.ComboBoxText.new()
+        for profile, label in BtrfsLayout.LABELS.items():
+            self.layout_combo.append(profile, label)
+        self.layout_combo.set_active_id(self.app.plan.subvolume_profile)
+        self.layout_combo.set_hexpand(True)
+        self.layout_combo.connect("changed", self._on_layout_changed)
+        layout_box.append(self.layout_combo)
+
+        # Swap planner
+        swap_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+        outer.append(swap_box)
+        swap_box.append(Gtk.Label(label="Swap:"))
+        self.swap_combo = Gtk.ComboBoxText.new()
+        for mode, label in SwapPlanner.MODES.items():
+            self.swap_combo.append(mode, label)
+        self.swap_combo.set_active_id(self.app.plan.swap.mode)
+        self.swap_combo.connect("changed", self._on_swap_mode_changed)
+        swap_box.append(self.swap_combo)
+        self.swap_label = Gtk.Label()
+        self.swap_label.add_css_class("dim-label")
+        self.swap_label.set_hexpand(True)
+        self.swap_label.set_halign(Gtk.Align.START)
+        swap_box.append(self.swap_label)
+        self._refresh_swap_plan()
+
         # Partition management buttons
         btn_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
         outer.append(btn_box)
@@ -124,27 +184,153 @@ class DiskManagent(Adw.Bin):
         self._populate_disks()
         return outer
 
+    def _list_disks(self):
+        """Return [(path, size, model)] of all disks reported by lsblk"""
+        p = subprocess.run(
+            ["lsblk", "-J", "-o", "NAME,SIZE,TYPE,MODEL"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        data = json.loads(p.stdout)
+        return [
+            (f"/dev/{b.get('name')}", b.get("size"), b.get("model") or "Unknown")
+            for b in data.get("blockdevices", [])
+            if b.get("type") == "disk"
+        ]
+
+    def _list_free_partitions(self):
+        """
+        Return [(path, size)] of partitions that are safe to use as a journal device.
+
+        Partitions used by the install plan, mounted ones and ones that
+        already carry a filesystem or signature (LUKS, LVM, RAID, swap) are
+        left out, so picking one can never wipe existing data.
+        """
+        p = subprocess.run(
+            ["lsblk", "-J", "-o", "NAME,SIZE,TYPE,FSTYPE,MOUNTPOINT"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        data = json.loads(p.stdout)
+
+        used = set()
+        for planned in self.app.plan.partitions.values():
+            if planned.mountpoint or planned.raid_level:
+                used.add(planned.device)
+            used.update(planned.members)
+            if planned.journal_device:
+                used.add(planned.journal_device)
+            if planned.cache_device:
+                used.add(planned.cache_device)
+
+        free = []
+        for disk in data.get("blockdevices", []):
+            for child in disk.get("children") or []:
+                path = f"/dev/{child.get('name')}"
+                if child.get("type") != "part" or path in used:
+                    continue
+                if child.get("fstype") or child.get("mountpoint") or child.get("children"):
+                    continue
+                free.append((path, child.get("size")))
+        return free
+
     def _populate_disks(self):
         """Populate disk combo with available disks"""
         try:
-            p = subprocess.run(
-                ["lsblk", "-J", "-o", "NAME,SIZE,TYPE,MODEL"],
-                capture_output=True,
-                text=True,
-                check=True,
-            )
-            data = json.loads(p.stdout)
+            disks = self._list_disks()
         except Exception as e:
             self._show_error_dialog("Error", f"Error running lsblk: {e}")
             return
 
         self.disk_combo.remove_all()
-        for b in data.get("blockdevices", []):
-            if b.get("type") == "disk":
-                name = b.get("name")
-                size = b.get("size")
-                model = b.get("model") or "Unknown"
-                self.disk_combo.append_text(f"/dev/{name} — {size} — {model}")
+        for path, size, model in disks:
+            self.disk_combo.append_text(self._disk_label(path, size, model))
+
+    def _disk_label(self, path, size, model):
+        label = f"{path} — {size} — {model}"
+        probe = self.disk_probes.get(path)
+        if probe is not None:
+            label += f" — {DiskProbe.summary(probe)}"
+        return label
+
+    def _start_disk_probe(self, disk_path):
+        """Measure the disk in the background; the result is shown in disk_combo"""
+        if disk_path in self.disk_probes or disk_path in self._probing:
+            return
+        self._probing.add(disk_path)
+
+        def worker():
+            try:
+                result = DiskProbe.probe(disk_path)
+            except OSError as e:
+                print(f"Warning: Disk probe of {disk_path} failed: {e}")
+                result = None
+            GLib.idle_add(self._on_disk_probe_done, disk_path, result)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _probe_running(self):
+        """True (after telling the user) while a throughput test still uses a disk"""
+        if self._calibrating:
+            self._show_info_dialog(
+                "Disk Test Running",
+                "The Btrfs compression benchmark is still running. Try again in a few seconds.",
+            )
+            return True
+        if not self._probing:
+            return False
+        self._show_info_dialog(
+            "Disk Test Running",
+            f"The throughput test of {', '.join(sorted(self._probing))} is still running. "
+            "Try again in a few seconds.",
+        )
+        return True
+
+    def _probe_write_speed(self, disk):
+        """Write test on ``disk`` right after the user agreed to repartition it"""
+        probe = self.disk_probes.get(disk)
+        if probe is None or probe["write_mb_s"] is not None:
+            return
+        try:
+            DiskProbe.probe_write(disk, probe)
+        except OSError as e:
+            print(f"Warning: Write probe of {disk} failed: {e}")
+            return
+        self._on_disk_probe_done(disk, probe)
+
+    def _on_disk_probe_done(self, disk_path, result):
+        self._probing.discard(disk_path)
+        if result is None:
+            return False
+        self.disk_probes[disk_path] = result
+        self.app.report.record("disk_probe", **{disk_path: result})
+
+        # Podmiana etykiety bez ponownego wywołania _on_disk_selected
+        model = self.disk_combo.get_model()
+        for index, row in enumerate(model):
+            text = row[0]
+            if text.split(" ")[0] != disk_path:
+                continue
+            _, size, device_model = (text.split(" — ") + ["", ""])[:3]
+            active = self.disk_combo.get_active()
+            self.disk_combo.handler_block_by_func(self._on_disk_selected)
+            try:
+                self.disk_combo.remove(index)
+                self.disk_combo.insert_text(index, self._disk_label(disk_path, size, device_model))
+                self.disk_combo.set_active(active)
+            finally:
+                self.disk_combo.handler_unblock_by_func(self._on_disk_selected)
+            break
+
+        if result["warnings"] and disk_path == self.selected_disk:
+            self._show_info_dialog(
+                "Slow Disk",
+                f"{disk_path} looks slow: {'; '.join(result['warnings'])}. "
+                f"The installation may take {DiskProbe.format_duration(result['eta_seconds'])}.",
+            )
+        return False
 
     def _on_disk_selected(self, combo):
         """Handle disk selection"""
@@ -153,12 +339,80 @@ class DiskManagent(Adw.Bin):
             return
         disk_path = text.split(" ")[0]
         self.disk_info_label.set_text(f"Selected disk: {disk_path}")
-        setattr(self.app, "selected_disk", disk_path)
+        self.app.plan.disk = disk_path
         self.selected_disk = disk_path
         self.populate_partitions_for_disk(disk_path)
+        self._start_disk_probe(disk_path)
+
+    def _on_layout_changed(self, combo):
+        """Switch the subvolume profile; add missing subvolumes to an existing Btrfs root"""
+        profile = combo.get_active_id()
+        if not profile or profile == self.app.plan.subvolume_profile:
+            return
+        self.app.plan.subvolume_profile = profile
+
+        root = self.app.plan.root_partition
+        if root is not None and root.fstype == 'btrfs' and self._get_filesystem_type(root.fs_device) == 'btrfs':
+            self._create_btrfs_subvolumes(root.fs_device, calibrate=False)
+        self._generate_and_apply_fstab()
+
+    def _refresh_swap_plan(self, root_fstype=None):
+        """Re-run the swap planner for the current RAM, root filesystem and mode"""
+        swap = self.app.plan.swap
+        root = self.app.plan.root_partition
+        if root_fstype is None:
+            root_fstype = root.fstype if root else None
+
+        disk_class = SwapPlanner.disk_class(root.device if root else self.app.plan.disk)
+        decision = SwapPlanner.decide(
+            swap.mode, SwapPlanner.memory_mib(), root_fstype, disk_class, self.app.plan.swap_partition
+        )
+        swap.kind = decision["kind"]
+        swap.size_mib = decision["size_mib"]
+        swap.algorithm = decision["algorithm"]
+
+        if swap.kind == "zram":
+            text = f"zram, up to {swap.size_mib} MiB ({swap.algorithm})"
+            if disk_class != "ssd":
+                text += f", no swap on the {'HDD' if disk_class == 'hdd' else 'flash'} root disk"
+        elif swap.kind == "swapfile":
+            text = f"{swap.size_mib} MiB NoCOW swapfile at {SwapPlanner.SWAPFILE_PATH}"
+        elif swap.kind == "partition":
+            existing = self.app.plan.swap_partition
+            text = (f"swap partition {existing.device}" if existing
+                    else f"swap partition of {swap.size_mib} MiB (created by Auto Configure)")
+        else:
+            text = "no swap"
+        if hasattr(self, 'swap_label'):
+            self.swap_label.set_text(text)
+
+    def _on_swap_mode_changed(self, combo):
+        mode = combo.get_active_id()
+        if not mode or mode == self.app.plan.swap.mode:
+            return
+        self.app.plan.swap.mode = mode
+        self._refresh_swap_plan()
+
+        # a swapfile needs its subvolume on an already formatted root
+        root = self.app.plan.root_partition
+        if (self.app.plan.swap.kind == "swapfile" and root is not None
+                and self._get_filesystem_type(root.fs_device) == 'btrfs'):
+            self._create_btrfs_subvolumes(root.fs_device, calibrate=False)
+        self._generate_and_apply_fstab()
+        self._update_proceed_sensitive()
+
+    def _add_swap_partition(self, device, passphrase=None):
+        """Plan (and encrypt, with the root passphrase) a swap partition, then mkswap it"""
+        swap_plan = PartitionPlan(device, '', 'swap')
+        if passphrase:
+            for key, value in self._setup_encryption(device, 'swap', passphrase).items():
+                setattr(swap_plan, key, value)
+        subprocess.run(['sudo', 'mkswap', swap_plan.fs_device], capture_output=True, text=True, timeout=60, check=True)
+        return self.app.plan.set_partition(swap_plan)
 
     def _on_refresh(self, button):
         """Refresh disk and partition list"""
+        DiskUtils.clear_cache()
         self._populate_disks()
         if hasattr(self, 'selected_disk') and self.selected_disk:
             self.populate_partitions_for_disk(self.selected_disk)
@@ -175,6 +429,8 @@ class DiskManagent(Adw.Bin):
 
     def _on_auto_configure(self, button):
         """Auto-configure disk with boot and root partitions"""
+        if self._probe_running():
+            return
         if not hasattr(self, 'selected_disk') or not self.selected_disk:
             self._show_error_dialog("No Selection", "Please select a disk first.")
             return
@@ -187,14 +443,14 @@ class DiskManagent(Adw.Bin):
                       f"• Create 512 MiB FAT32 EFI System Partition at /boot/efi\n"
                       f"• Create 1 GiB ext4 boot partition at /boot\n"
                       f"• Create Btrfs root partition at / with remaining space\n"
-                      f"  (with subvolumes: root, home, var)\n\n"
+                      f"  (with subvolumes: {BtrfsLayout.summary(self.app.plan.subvolume_profile)})\n\n"
                       f"WARNING: All data on {self.selected_disk} will be lost!")
         else:
             message = (f"This will automatically configure {self.selected_disk} for Legacy boot:\n\n"
                       f"• Create MBR partition table\n"
                       f"• Create 1 GiB ext4 boot partition at /boot (bootable)\n"
                       f"• Create Btrfs root partition at / with remaining space\n"
-                      f"  (with subvolumes: root, home, var)\n\n"
+                      f"  (with subvolumes: {BtrfsLayout.summary(self.app.plan.subvolume_profile)})\n\n"
                       f"WARNING: All data on {self.selected_disk} will be lost!")
 
         dialog = Adw.MessageDialog(
@@ -202,18 +458,69 @@ class DiskManagent(Adw.Bin):
             body=message,
             transient_for=self.get_root()
         )
+        encryption_box, get_passphrase = self._build_encryption_box("Encrypt root with LUKS2")
+        dialog.set_extra_child(encryption_box)
         dialog.add_response("cancel", "Cancel")
         dialog.add_response("proceed", "Proceed")
         dialog.set_response_appearance("proceed", Adw.ResponseAppearance.DESTRUCTIVE)
-        dialog.connect("response", self._on_auto_configure_response)
+        dialog.connect("response", self._on_auto_configure_response, get_passphrase)
         dialog.present()
 
-    def _on_auto_configure_response(self, dialog, response_id):
+    def _build_encryption_box(self, label):
+        """
+        Build an 'encrypt' checkbox with passphrase fields.
+
+        Returns:
+            (widget, getter) - getter returns the passphrase, None when
+            encryption is off, or raises ValueError on invalid input
+        """
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        check = Gtk.CheckButton(label=label)
+        entry = Gtk.PasswordEntry(placeholder_text="Encryption passphrase")
+        confirm = Gtk.PasswordEntry(placeholder_text="Confirm passphrase")
+        entry.set_show_peek_icon(True)
+        for widget in (entry, confirm):
+            widget.set_sensitive(False)
+        check.connect("toggled", lambda c: [w.set_sensitive(c.get_active()) for w in (entry, confirm)])
+        box.append(check)
+        box.append(entry)
+        box.append(confirm)
+
+        def get_passphrase():
+            if not check.get_active():
+                return None
+            passphrase = entry.get_text()
+            if len(passphrase) < 8:
+                raise ValueError("Encryption passphrase must be at least 8 characters.")
+            if passphrase != confirm.get_text():
+                raise ValueError("Encryption passphrases do not match.")
+            return passphrase
+
+        return box, get_passphrase
+
+    @staticmethod
+    def _luks_name_for(mountpoint):
+        """Mapper name for an encrypted partition, e.g. / -> pelican_root"""
+        name = mountpoint.strip("/").replace("/", "_") or "root"
+        return f"pelican_{name}"
+
+    def _setup_encryption(self, device, mountpoint, passphrase, name=None):
+        """Create and open a LUKS2 container; returns the planned PartitionPlan fields"""
+        name = name or self._luks_name_for(mountpoint)
+        _, luks_uuid = self.luks.setup(device, name, passphrase)
+        return {"encrypted": True, "luks_name": name, "luks_uuid": luks_uuid or ""}
+
+    def _on_auto_configure_response(self, dialog, response_id, get_passphrase):
         """Handle auto-configure response"""
         if response_id == "proceed":
-            self._execute_auto_configure()
+            try:
+                passphrase = get_passphrase()
+            except ValueError as e:
+                self._show_error_dialog("Encryption", str(e))
+                return
+            self._execute_auto_configure(passphrase)
 
-    def _execute_auto_configure(self):
+    def _execute_auto_configure(self, passphrase=None):
         """Execute automatic disk configuration"""
         try:
             boot_mode = self._detect_boot_mode()
@@ -224,6 +531,11 @@ class DiskManagent(Adw.Bin):
 
             disk = self.selected_disk
 
+            # Hibernation needs a swap partition at the end of the disk
+            hibernate = self.app.plan.swap.mode == "hibernate"
+            swap_mib = SwapPlanner.hibernation_size_mib(SwapPlanner.memory_mib()) if hibernate else 0
+            root_end = f"-{swap_mib}MiB" if hibernate else '100%'
+
             # Create partition table
             if boot_mode == "uefi":
                 cmd = ['sudo', 'parted', '-s', disk, 'mklabel', 'gpt']
@@ -233,6 +545,7 @@ class DiskManagent(Adw.Bin):
             process = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
             if process.returncode != 0:
                 raise Exception(f"Failed to create partition table: {process.stderr}")
+            self._probe_write_speed(disk)
 
             time.sleep(1)
 
@@ -250,7 +563,7 @@ class DiskManagent(Adw.Bin):
                     raise Exception(f"Failed to create boot partition: {process.stderr}")
 
                 # Create root partition (remaining space)
-                cmd = ['sudo', 'parted', '-s', disk, 'mkpart', 'primary', 'btrfs', '1537MiB', '100%']
+                cmd = ['sudo', 'parted', '-s', disk, '--', 'mkpart', 'primary', 'btrfs', '1537MiB', root_end]
                 process = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
                 if process.returncode != 0:
                     raise Exception(f"Failed to create root partition: {process.stderr}")
@@ -268,35 +581,29 @@ class DiskManagent(Adw.Bin):
 
                 # Format EFI as FAT32
                 cmd = ['sudo', 'mkfs.fat', '-F', '32', efi_partition]
-                subprocess.run(cmd, capture_output=True, text=True, timeout=60, check=True)
+                HeavyCommand.run(cmd, capture_output=True, text=True, timeout=60, check=True)
 
                 # Format /boot as ext4
                 cmd = ['sudo', 'mkfs.ext4', '-F', boot_partition]
-                subprocess.run(cmd, capture_output=True, text=True, timeout=120, check=True)
+                HeavyCommand.run(cmd, capture_output=True, text=True, timeout=120, check=True)
+
+                # Encrypt root (LUKS2) if requested
+                root_plan = PartitionPlan(root_partition, '/', 'btrfs')
+                if passphrase:
+                    for key, value in self._setup_encryption(root_partition, '/', passphrase).items():
+                        setattr(root_plan, key, value)
 
                 # Format root as Btrfs
-                cmd = ['sudo', 'mkfs.btrfs', '-f', root_partition]
-                subprocess.run(cmd, capture_output=True, text=True, timeout=120, check=True)
+                cmd = ['sudo', 'mkfs.btrfs', '-f', root_plan.fs_device]
+                HeavyCommand.run(cmd, capture_output=True, text=True, timeout=120, check=True)
 
                 # Create Btrfs subvolumes
-                self._create_btrfs_subvolumes(root_partition)
+                self._create_btrfs_subvolumes(root_plan.fs_device)
 
                 # Update configuration
-                self.partition_config[efi_partition] = {
-                    'mountpoint': '/boot/efi',
-                    'bootable': True,
-                    'fstype': 'vfat'
-                }
-                self.partition_config[boot_partition] = {
-                    'mountpoint': '/boot',
-                    'bootable': False,
-                    'fstype': 'ext4'
-                }
-                self.partition_config[root_partition] = {
-                    'mountpoint': '/',
-                    'bootable': False,
-                    'fstype': 'btrfs'
-                }
+                self.app.plan.set_partition(PartitionPlan(efi_partition, '/boot/efi', 'vfat', bootable=True))
+                self.app.plan.set_partition(PartitionPlan(boot_partition, '/boot', 'ext4'))
+                self.app.plan.set_partition(root_plan)
 
             else:  # Legacy mode
                 # Create /boot partition (1GB)
@@ -306,7 +613,7 @@ class DiskManagent(Adw.Bin):
                     raise Exception(f"Failed to create boot partition: {process.stderr}")
 
                 # Create root partition (remaining space)
-                cmd = ['sudo', 'parted', '-s', disk, 'mkpart', 'primary', 'btrfs', '1025MiB', '100%']
+                cmd = ['sudo', 'parted', '-s', disk, '--', 'mkpart', 'primary', 'btrfs', '1025MiB', root_end]
                 process = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
                 if process.returncode != 0:
                     raise Exception(f"Failed to create root partition: {process.stderr}")
@@ -323,32 +630,38 @@ class DiskManagent(Adw.Bin):
 
                 # Format /boot as ext4
                 cmd = ['sudo', 'mkfs.ext4', '-F', boot_partition]
-                subprocess.run(cmd, capture_output=True, text=True, timeout=120, check=True)
+                HeavyCommand.run(cmd, capture_output=True, text=True, timeout=120, check=True)
+
+                # Encrypt root (LUKS2) if requested
+                root_plan = PartitionPlan(root_partition, '/', 'btrfs')
+                if passphrase:
+                    for key, value in self._setup_encryption(root_partition, '/', passphrase).items():
+                        setattr(root_plan, key, value)
 
                 # Format root as Btrfs
-                cmd = ['sudo', 'mkfs.btrfs', '-f', root_partition]
-                subprocess.run(cmd, capture_output=True, text=True, timeout=120, check=True)
+                cmd = ['sudo', 'mkfs.btrfs', '-f', root_plan.fs_device]
+                HeavyCommand.run(cmd, capture_output=True, text=True, timeout=120, check=True)
 
                 # Create Btrfs subvolumes
-                self._create_btrfs_subvolumes(root_partition)
+                self._create_btrfs_subvolumes(root_plan.fs_device)
 
                 # Update configuration
-                self.partition_config[boot_partition] = {
-                    'mountpoint': '/boot',
-                    'bootable': True,
-                    'fstype': 'ext4'
-                }
-                self.partition_config[root_partition] = {
-                    'mountpoint': '/',
-                    'bootable': False,
-                    'fstype': 'btrfs'
-                }
+                self.app.plan.set_partition(PartitionPlan(boot_partition, '/boot', 'ext4', bootable=True))
+                self.app.plan.set_partition(root_plan)
+
+            if hibernate:
+                self._parted(disk, '--', 'mkpart', 'primary', 'linux-swap', root_end, '100%', what="swap partition")
+                subprocess.run(['sudo', 'partprobe', disk], capture_output=True, text=True, timeout=10)
+                time.sleep(1)
+                swap_number = 4 if boot_mode == "uefi" else 3
+                self._add_swap_partition(DiskUtils.get_partition_path(disk, swap_number), passphrase)
 
             # Force kernel to re-read partition table
             cmd = ['sudo', 'partprobe', disk]
             subprocess.run(cmd, capture_output=True, text=True, timeout=10)
 
-            self._save_partition_config()
+            self.app.plan.bootloader_devices = []
+            self.app.plan.installation_mode = "auto"
             self._generate_and_apply_fstab()
 
             progress_dialog.destroy()
@@ -360,8 +673,368 @@ class DiskManagent(Adw.Bin):
                 progress_dialog.destroy()
             self._show_error_dialog("Error", f"Failed to auto-configure: {str(e)}")
 
+    def _on_multi_disk_configure(self, button):
+        """Stripe or mirror the root filesystem across several disks"""
+        if self._probe_running():
+            return
+        try:
+            disks = self._list_disks()
+        except Exception as e:
+            self._show_error_dialog("Error", f"Error running lsblk: {e}")
+            return
+
+        if len(disks) < 2:
+            self._show_error_dialog("Multi-disk Root", "At least two disks are required.")
+            return
+
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+
+        checks = []
+        for path, size, model in disks:
+            check = Gtk.CheckButton(label=f"{path} — {size} — {model}")
+            check.set_active(path == self.selected_disk)
+            checks.append((path, check))
+            box.append(check)
+
+        profile_combo = Gtk.ComboBoxText.new()
+        for profile, label in RaidLayout.LABELS.items():
+            profile_combo.append(profile, label)
+        profile_combo.set_active_id("btrfs-raid1")
+        box.append(profile_combo)
+
+        encryption_box, get_passphrase = self._build_encryption_box("Encrypt root with LUKS2")
+        box.append(encryption_box)
+
+        boot_mode = self._detect_boot_mode()
+        boot_parts = "512 MiB EFI System Partition and 1 GiB /boot" if boot_mode == "uefi" else "1 GiB /boot"
+        dialog = Adw.MessageDialog(
+            heading="Multi-disk Root",
+            body=(f"Select the disks and RAID profile for the root filesystem.\n\n"
+                  f"• Every selected disk gets the {boot_parts}, mirrored across all of them\n"
+                  f"• Every selected disk gets one root member partition\n"
+                  f"  (Btrfs subvolumes: {BtrfsLayout.summary(self.app.plan.subvolume_profile)})\n\n"
+                  f"WARNING: All data on the selected disks will be lost!"),
+            transient_for=self.get_root()
+        )
+        dialog.set_extra_child(box)
+        dialog.add_response("cancel", "Cancel")
+        dialog.add_response("proceed", "Proceed")
+        dialog.set_response_appearance("proceed", Adw.ResponseAppearance.DESTRUCTIVE)
+
+        def on_response(dlg, response_id):
+            if response_id != "proceed":
+                return
+            selected = [path for path, check in checks if check.get_active()]
+            profile = profile_combo.get_active_id()
+            try:
+                RaidLayout.check(profile, selected)
+                passphrase = get_passphrase()
+            except ValueError as e:
+                self._show_error_dialog("Multi-disk Root", str(e))
+                return
+            self._execute_multi_disk_configure(selected, profile, passphrase)
+
+        dialog.connect("response", on_response)
+        dialog.present()
+
+    def _parted(self, disk, *args, what="partition"):
+        cmd = ['sudo', 'parted', '-s', disk] + list(args)
+        process = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        if process.returncode != 0:
+            raise Exception(f"Failed to create {what} on {disk}: {process.stderr}")
+
+    def _execute_multi_disk_configure(self, disks, profile, passphrase=None):
+        """
+        Lay out a RAID root across ``disks``.
+
+        Every disk gets the same ESP and /boot partitions, mirrored as md
+        RAID1 (metadata 1.0) and each disk is a bootloader device, so the
+        system still boots when any one of them fails. Every disk also
+        contributes one root member partition to either a multi-device
+        Btrfs or an md array formatted as Btrfs.
+        """
+        try:
+            boot_mode = self._detect_boot_mode()
+            backend = RaidLayout.backend(profile)
+            progress_dialog = self._show_progress_dialog(
+                "Configuring Disks",
+                f"Setting up {RaidLayout.LABELS[profile]} on {len(disks)} disks..."
+            )
+
+            primary = disks[0]
+            label = 'gpt' if boot_mode == "uefi" else 'msdos'
+
+            # Partition tables
+            member_numbers = {}
+            for disk in disks:
+                self._parted(disk, 'mklabel', label, what="partition table")
+                self._probe_write_speed(disk)
+                if boot_mode == "uefi":
+                    self._parted(disk, 'mkpart', 'primary', 'fat32', '1MiB', '513MiB', what="EFI partition")
+                    self._parted(disk, 'mkpart', 'primary', 'ext4', '513MiB', '1537MiB', what="boot partition")
+                    self._parted(disk, 'set', '1', 'esp', 'on', what="ESP flag")
+                    start, number = '1537MiB', 3
+                else:
+                    self._parted(disk, 'mkpart', 'primary', 'ext4', '1MiB', '1025MiB', what="boot partition")
+                    self._parted(disk, 'set', '1', 'boot', 'on', what="boot flag")
+                    start, number = '1025MiB', 2
+                self._parted(disk, 'mkpart', 'primary', start, '100%', what="root member partition")
+                if backend == "md":
+                    self._parted(disk, 'set', str(number), 'raid', 'on', what="RAID flag")
+                member_numbers[disk] = number
+
+            for disk in disks:
+                subprocess.run(['sudo', 'partprobe', disk], capture_output=True, text=True, timeout=10)
+            time.sleep(2)
+            DiskUtils.clear_cache()
+
+            members = [DiskUtils.get_partition_path(disk, member_numbers[disk]) for disk in disks]
+
+            # The new layout replaces whatever was planned before
+            self.app.plan.partitions.clear()
+
+            # Boot partitions mirrored across every disk
+            def boot_mirror(array, number):
+                partitions = [DiskUtils.get_partition_path(disk, number) for disk in disks]
+                return RaidLayout.create_boot_mirror(array, partitions), partitions
+
+            if boot_mode == "uefi":
+                efi_array, efi_members = boot_mirror(RaidLayout.ESP_ARRAY, 1)
+                boot_array, boot_members = boot_mirror(RaidLayout.BOOT_ARRAY, 2)
+                HeavyCommand.run(['sudo', 'mkfs.fat', '-F', '32', efi_array],
+                                 capture_output=True, text=True, timeout=60, check=True)
+                HeavyCommand.run(['sudo', 'mkfs.ext4', '-F', boot_array],
+                                 capture_output=True, text=True, timeout=120, check=True)
+                self.app.plan.set_partition(PartitionPlan(efi_array, '/boot/efi', 'vfat', bootable=True,
+                                                          raid_level='raid1', members=efi_members))
+                self.app.plan.set_partition(PartitionPlan(boot_array, '/boot', 'ext4',
+                                                          raid_level='raid1', members=boot_members))
+            else:
+                boot_array, boot_members = boot_mirror(RaidLayout.BOOT_ARRAY, 1)
+                HeavyCommand.run(['sudo', 'mkfs.ext4', '-F', boot_array],
+                                 capture_output=True, text=True, timeout=120, check=True)
+                self.app.plan.set_partition(PartitionPlan(boot_array, '/boot', 'ext4', bootable=True,
+                                                          raid_level='raid1', members=boot_members))
+
+            level = RaidLayout.level(profile)
+            if backend == "btrfs":
+                # One LUKS container per member; Btrfs RAID sits on the mappers
+                plans = [PartitionPlan(device, fstype='btrfs') for device in members]
+                if passphrase:
+                    base_name = self._luks_name_for('/')
+                    for index, plan in enumerate(plans):
+                        name = base_name if index == 0 else f"{base_name}{index}"
+                        for key, value in self._setup_encryption(plan.device, '/', passphrase, name).items():
+                            setattr(plan, key, value)
+
+                root_plan = plans[0]
+                root_plan.mountpoint = '/'
+                root_plan.raid_level = level
+                root_plan.members = [plan.device for plan in plans]
+
+                cmd = RaidLayout.mkfs_btrfs_cmd(profile, [plan.fs_device for plan in plans])
+                HeavyCommand.run(cmd, capture_output=True, text=True, timeout=300, check=True)
+                for plan in plans:
+                    self.app.plan.set_partition(plan)
+            else:
+                # md array first, LUKS (if any) on top of it
+                array = RaidLayout.create_md_array(profile, members)
+                root_plan = PartitionPlan(array, '/', 'btrfs', raid_level=level, members=members)
+                if passphrase:
+                    for key, value in self._setup_encryption(array, '/', passphrase).items():
+                        setattr(root_plan, key, value)
+
+                cmd = ['sudo', 'mkfs.btrfs', '-f', root_plan.fs_device]
+                HeavyCommand.run(cmd, capture_output=True, text=True, timeout=300, check=True)
+                self.app.plan.set_partition(root_plan)
+
+            self._create_btrfs_subvolumes(root_plan.fs_device)
+
+            self.app.plan.disk = primary
+            self.selected_disk = primary
+            self.app.plan.bootloader_devices = list(disks)
+            self.app.plan.installation_mode = "auto"
+            self._generate_and_apply_fstab()
+
+            progress_dialog.destroy()
+            self._show_info_dialog(
+                "Success", f"Root configured as {RaidLayout.LABELS[profile]} across {', '.join(disks)}"
+            )
+            self._on_refresh(None)
+
+        except Exception as e:
+            if 'progress_dialog' in locals():
+                progress_dialog.destroy()
+            self._show_error_dialog("Error", f"Failed to configure multi-disk root: {str(e)}")
+
+    def _on_hybrid_configure(self, button):
+        """Root on an HDD behind an SSD cache, with ESP and /boot on the SSD"""
+        if self._probe_running():
+            return
+        try:
+            disks = self._list_disks()
+        except Exception as e:
+            self._show_error_dialog("Error", f"Error running lsblk: {e}")
+            return
+
+        if len(disks) < 2:
+            self._show_error_dialog("SSD Cache", "An HDD and an SSD are required.")
+            return
+
+        suggested = CacheTier.suggest([path for path, _, _ in disks])
+
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        hdd_combo = Gtk.ComboBoxText.new()
+        ssd_combo = Gtk.ComboBoxText.new()
+        for path, size, model in disks:
+            kind = "HDD" if CacheTier.is_rotational(path) else "SSD"
+            hdd_combo.append(path, f"{path} — {size} — {model} ({kind})")
+            ssd_combo.append(path, f"{path} — {size} — {model} ({kind})")
+        if suggested:
+            hdd_combo.set_active_id(suggested[0])
+            ssd_combo.set_active_id(suggested[1])
+
+        mode_combo = Gtk.ComboBoxText.new()
+        for mode, label in CacheTier.MODES.items():
+            mode_combo.append(mode, label)
+        mode_combo.set_active_id("writethrough")
+
+        for text, widget in (("Root disk (HDD):", hdd_combo), ("Cache disk (SSD):", ssd_combo),
+                             ("Cache mode:", mode_combo)):
+            label = Gtk.Label(label=text)
+            label.set_halign(Gtk.Align.START)
+            box.append(label)
+            box.append(widget)
+
+        encryption_box, get_passphrase = self._build_encryption_box("Encrypt root with LUKS2")
+        box.append(encryption_box)
+
+        boot_parts = ("512 MiB EFI System Partition and 1 GiB /boot"
+                      if self._detect_boot_mode() == "uefi" else "1 GiB /boot")
+        dialog = Adw.MessageDialog(
+            heading="SSD Cache",
+            body=(f"Root goes on the HDD, cached by the rest of the SSD (lvmcache).\n\n"
+                  f"• The SSD gets the {boot_parts} and the cache pool\n"
+                  f"• The HDD gets one LVM partition for root\n"
+                  f"  (Btrfs subvolumes: {BtrfsLayout.summary(self.app.plan.subvolume_profile)})\n\n"
+                  f"WARNING: All data on both disks will be lost!"),
+            transient_for=self.get_root()
+        )
+        dialog.set_extra_child(box)
+        dialog.add_response("cancel", "Cancel")
+        dialog.add_response("proceed", "Proceed")
+        dialog.set_response_appearance("proceed", Adw.ResponseAppearance.DESTRUCTIVE)
+
+        def on_response(dlg, response_id):
+            if response_id != "proceed":
+                return
+            hdd = hdd_combo.get_active_id()
+            ssd = ssd_combo.get_active_id()
+            if not hdd or not ssd or hdd == ssd:
+                self._show_error_dialog("SSD Cache", "Select two different disks.")
+                return
+            try:
+                passphrase = get_passphrase()
+            except ValueError as e:
+                self._show_error_dialog("Encryption", str(e))
+                return
+            self._execute_hybrid_configure(hdd, ssd, mode_combo.get_active_id(), passphrase)
+
+        dialog.connect("response", on_response)
+        dialog.present()
+
+    def _execute_hybrid_configure(self, hdd, ssd, cache_mode, passphrase=None):
+        """Lay out ESP, /boot and the cache pool on ``ssd`` and a cached root LV on ``hdd``"""
+        try:
+            boot_mode = self._detect_boot_mode()
+            progress_dialog = self._show_progress_dialog(
+                "Configuring Disks",
+                f"Setting up {ssd} as {cache_mode} cache for {hdd}..."
+            )
+
+            label = 'gpt' if boot_mode == "uefi" else 'msdos'
+
+            # SSD: boot partitions, then the cache partition
+            self._parted(ssd, 'mklabel', label, what="partition table")
+            self._probe_write_speed(ssd)
+            if boot_mode == "uefi":
+                self._parted(ssd, 'mkpart', 'primary', 'fat32', '1MiB', '513MiB', what="EFI partition")
+                self._parted(ssd, 'mkpart', 'primary', 'ext4', '513MiB', '1537MiB', what="boot partition")
+                self._parted(ssd, 'set', '1', 'esp', 'on', what="ESP flag")
+                self._parted(ssd, 'mkpart', 'primary', '1537MiB', '100%', what="cache partition")
+                cache_number = 3
+            else:
+                self._parted(ssd, 'mkpart', 'primary', 'ext4', '1MiB', '1025MiB', what="boot partition")
+                self._parted(ssd, 'set', '1', 'boot', 'on', what="boot flag")
+                self._parted(ssd, 'mkpart', 'primary', '1025MiB', '100%', what="cache partition")
+                cache_number = 2
+            self._parted(ssd, 'set', str(cache_number), 'lvm', 'on', what="LVM flag")
+
+            # HDD: a single LVM partition
+            self._parted(hdd, 'mklabel', label, what="partition table")
+            self._probe_write_speed(hdd)
+            self._parted(hdd, 'mkpart', 'primary', '1MiB', '100%', what="root partition")
+            self._parted(hdd, 'set', '1', 'lvm', 'on', what="LVM flag")
+
+            for disk in (ssd, hdd):
+                subprocess.run(['sudo', 'partprobe', disk], capture_output=True, text=True, timeout=10)
+            time.sleep(2)
+            DiskUtils.clear_cache()
+
+            cache_partition = DiskUtils.get_partition_path(ssd, cache_number)
+            hdd_partition = DiskUtils.get_partition_path(hdd, 1)
+
+            # The new layout replaces whatever was planned before
+            self.app.plan.partitions.clear()
+
+            if boot_mode == "uefi":
+                efi_partition = DiskUtils.get_partition_path(ssd, 1)
+                boot_partition = DiskUtils.get_partition_path(ssd, 2)
+                HeavyCommand.run(['sudo', 'mkfs.fat', '-F', '32', efi_partition],
+                                 capture_output=True, text=True, timeout=60, check=True)
+                HeavyCommand.run(['sudo', 'mkfs.ext4', '-F', boot_partition],
+                                 capture_output=True, text=True, timeout=120, check=True)
+                self.app.plan.set_partition(PartitionPlan(efi_partition, '/boot/efi', 'vfat', bootable=True))
+                self.app.plan.set_partition(PartitionPlan(boot_partition, '/boot', 'ext4'))
+            else:
+                boot_partition = DiskUtils.get_partition_path(ssd, 1)
+                HeavyCommand.run(['sudo', 'mkfs.ext4', '-F', boot_partition],
+                                 capture_output=True, text=True, timeout=120, check=True)
+                self.app.plan.set_partition(PartitionPlan(boot_partition, '/boot', 'ext4', bootable=True))
+
+            # Cached LV, LUKS (if any) on top so the SSD only ever sees ciphertext
+            root_device = CacheTier.create(hdd_partition, cache_partition, cache_mode)
+            root_plan = PartitionPlan(
+                root_device, '/', 'btrfs', cache_device=cache_partition, cache_mode=cache_mode
+            )
+            if passphrase:
+                for key, value in self._setup_encryption(root_device, '/', passphrase).items():
+                    setattr(root_plan, key, value)
+
+            cmd = ['sudo', 'mkfs.btrfs', '-f', root_plan.fs_device]
+            HeavyCommand.run(cmd, capture_output=True, text=True, timeout=300, check=True)
+            self._create_btrfs_subvolumes(root_plan.fs_device)
+            self.app.plan.set_partition(root_plan)
+
+            self.app.plan.disk = ssd
+            self.selected_disk = ssd
+            self.app.plan.bootloader_devices = [ssd]
+            self.app.plan.installation_mode = "auto"
+            self._generate_and_apply_fstab()
+
+            progress_dialog.destroy()
+            self._show_info_dialog("Success", f"Root on {hdd} cached by {ssd} ({cache_mode})")
+            self._on_refresh(None)
+
+        except Exception as e:
+            if 'progress_dialog' in locals():
+                progress_dialog.destroy()
+            self._show_error_dialog("Error", f"Failed to configure SSD cache: {str(e)}")
+
     def _on_new_partition_table(self, button):
         """Create new partition table"""
+        if self._probe_running():
+            return
         if not hasattr(self, 'selected_disk') or not self.selected_disk:
             self._show_error_dialog("No Selection", "Please select a disk first.")
             return
@@ -388,6 +1061,7 @@ class DiskManagent(Adw.Bin):
 
                 if process.returncode != 0:
                     raise Exception(f"Failed to create partition table: {process.stderr}")
+                self._probe_write_speed(self.selected_disk)
 
                 self._show_info_dialog("Success", f"{table_type.upper()} partition table created on {self.selected_disk}")
                 self._on_refresh(None)
@@ -449,10 +1123,11 @@ class DiskManagent(Adw.Bin):
 
         device_path = f"/dev/{pname}"
 
-        # Get configured mountpoint from our config
-        if device_path in self.partition_config:
-            pmount = self.partition_config[device_path].get('mountpoint', pmount)
-            is_bootable = self.partition_config[device_path].get('bootable', False)
+        # Get configured mountpoint from the install plan
+        planned = self.app.plan.partitions.get(device_path)
+        if planned is not None:
+            pmount = planned.mountpoint or pmount
+            is_bootable = planned.bootable
         else:
             is_bootable = False
 
@@ -509,6 +1184,8 @@ class DiskManagent(Adw.Bin):
 
     def _on_add_partition(self, button):
         """Add new partition"""
+        if self._probe_running():
+            return
         if not hasattr(self, 'selected_disk') or not self.selected_disk:
             self._show_error_dialog("No Selection", "Please select a disk first.")
             return
@@ -516,6 +1193,8 @@ class DiskManagent(Adw.Bin):
 
     def _on_edit_partition(self, button):
         """Edit selected partition"""
+        if self._probe_running():
+            return
         if not self.selected_row:
             self._show_error_dialog("No Selection", "Please select a partition first.")
             return
@@ -523,6 +1202,8 @@ class DiskManagent(Adw.Bin):
 
     def _on_remove_partition(self, button):
         """Remove selected partition"""
+        if self._probe_running():
+            return
         if not self.selected_row:
             self._show_error_dialog("No Selection", "Please select a partition first.")
             return
@@ -558,6 +1239,11 @@ class DiskManagent(Adw.Bin):
             partition_num = str(disk_info['partition_num'])
             base_disk = disk_info['base_disk']
 
+            # Close the LUKS mapper first, the kernel keeps the partition busy otherwise
+            planned = self.app.plan.partitions.get(self.selected_row.partition_path)
+            if planned is not None and planned.encrypted:
+                LuksManager.close(planned.luks_name)
+
             cmd = ['sudo', 'parted', '-s', base_disk, 'rm', partition_num]
             process = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
 
@@ -569,9 +1255,7 @@ class DiskManagent(Adw.Bin):
             subprocess.run(cmd, capture_output=True, text=True, timeout=10)
 
             # Remove from configuration
-            if self.selected_row.partition_path in self.partition_config:
-                del self.partition_config[self.selected_row.partition_path]
-                self._save_partition_config()
+            if self.app.plan.remove_partition(self.selected_row.partition_path) is not None:
                 self._generate_and_apply_fstab()
 
             progress_dialog.destroy()
@@ -587,6 +1271,8 @@ class DiskManagent(Adw.Bin):
 
     def _on_format_partition(self, button):
         """Format selected partition"""
+        if self._probe_running():
+            return
         if not self.selected_row:
             self._show_error_dialog("No Selection", "Please select a partition first.")
             return
@@ -617,9 +1303,14 @@ class DiskManagent(Adw.Bin):
                 f"Formatting {self.selected_row.partition_path} with {filesystem}..."
             )
 
-            device = self.selected_row.partition_path
+            planned = self.app.plan.partitions.get(self.selected_row.partition_path)
+            # encrypted partitions are formatted through their mapper
+            device = planned.fs_device if planned else self.selected_row.partition_path
+            journal_device = planned.journal_device if planned and filesystem in self.JOURNAL_FS else ""
 
-            if filesystem == 'ext4':
+            if journal_device:
+                cmd = None
+            elif filesystem == 'ext4':
                 cmd = ['sudo', 'mkfs.ext4', '-F', device]
             elif filesystem == 'btrfs':
                 cmd = ['sudo', 'mkfs.btrfs', '-f', device]
@@ -638,14 +1329,19 @@ class DiskManagent(Adw.Bin):
             else:
                 raise Exception(f"Unsupported filesystem: {filesystem}")
 
-            process = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+            if cmd is None:
+                self._format_with_journal(device, filesystem, journal_device)
+            else:
+                process = HeavyCommand.run(cmd, capture_output=True, text=True, timeout=120)
 
-            if process.returncode != 0:
-                raise Exception(f"Formatting failed: {process.stderr}")
+                if process.returncode != 0:
+                    raise Exception(f"Formatting failed: {process.stderr}")
 
             # Create Btrfs subvolumes if formatting root as btrfs
-            if filesystem == 'btrfs' and device in self.partition_config:
-                if self.partition_config[device].get('mountpoint') == '/':
+            if planned is not None:
+                planned.fstype = filesystem
+                planned.journal_device = journal_device
+                if filesystem == 'btrfs' and planned.mountpoint == '/':
                     self._create_btrfs_subvolumes(device)
 
             progress_dialog.destroy()
@@ -657,19 +1353,34 @@ class DiskManagent(Adw.Bin):
                 progress_dialog.destroy()
             self._show_error_dialog("Error", f"Failed to format partition: {str(e)}")
 
-    def _create_btrfs_subvolumes(self, device):
-        """Create Btrfs subvolumes: root, home, var"""
+    def _create_btrfs_subvolumes(self, device, calibrate=True):
+        """
+        Create the Btrfs subvolumes of the selected layout profile.
+
+        With ``calibrate`` the compression level is then benchmarked in the
+        background. A planned swapfile is created in its NoCOW subvolume.
+        """
+        self._refresh_swap_plan(root_fstype='btrfs')
         try:
             with tempfile.TemporaryDirectory() as tmpdir:
-                # Mount
-                cmd = ['sudo', 'mount', device, tmpdir]
+                # Mount the top level, not the default subvolume
+                cmd = ['sudo', 'mount', '-o', 'subvolid=5', device, tmpdir]
                 subprocess.run(cmd, capture_output=True, text=True, timeout=30, check=True)
 
                 try:
-                    # Create subvolumes: root, home, var
-                    for subvol in ['root', 'home', 'var']:
-                        cmd = ['sudo', 'btrfs', 'subvolume', 'create', f"{tmpdir}/{subvol}"]
-                        subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+                    for subvolume in self._subvolumes():
+                        try:
+                            BtrfsLayout.create(tmpdir, subvolume)
+                        except subprocess.CalledProcessError as e:
+                            print(f"Warning: Failed to create subvolume {subvolume.name}: {e.stderr}")
+
+                    swap = self.app.plan.swap
+                    if swap.kind == "swapfile":
+                        swapfile = os.path.join(tmpdir, BtrfsLayout.SWAP.name, os.path.basename(SwapPlanner.SWAPFILE_PATH))
+                        try:
+                            SwapPlanner.create_swapfile(swapfile, swap.size_mib)
+                        except subprocess.CalledProcessError as e:
+                            print(f"Warning: Failed to create swapfile: {e.stderr}")
 
                     # Set default subvolume to root
                     cmd = ['sudo', 'btrfs', 'subvolume', 'list', tmpdir]
@@ -688,6 +1399,45 @@ class DiskManagent(Adw.Bin):
 
         except Exception as e:
             print(f"Warning: Failed to create Btrfs subvolumes: {e}")
+            return
+
+        if calibrate:
+            self._start_compression_calibration(device)
+
+    def _start_compression_calibration(self, device):
+        """Benchmark zstd levels against ``device`` in a worker thread; Proceed waits for it"""
+        self._calibrating = True
+        self._update_proceed_sensitive()
+
+        def worker():
+            try:
+                with tempfile.TemporaryDirectory() as tmpdir:
+                    cmd = ['sudo', 'mount', '-o', 'subvolid=5', device, tmpdir]
+                    subprocess.run(cmd, capture_output=True, text=True, timeout=30, check=True)
+                    try:
+                        result = CompressionCalibrator().calibrate(tmpdir)
+                    finally:
+                        subprocess.run(['sudo', 'umount', tmpdir], capture_output=True, text=True, timeout=30)
+            except Exception as e:
+                print(f"Warning: Compression calibration failed: {e}")
+                result = {"option": CompressionCalibrator.DEFAULT_OPTION, "reason": f"calibration failed: {e}"}
+            GLib.idle_add(self._on_compression_calibrated, result)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _on_compression_calibrated(self, result):
+        self._calibrating = False
+        self.app.plan.btrfs_compression = result["option"] or ""
+        self.app.report.record("btrfs_compression", **result)
+        # fstab powstał przed końcem kalibracji, z poprzednią opcją compress=
+        self._generate_and_apply_fstab()
+        self._update_proceed_sensitive()
+        return False
+
+    def _compress_option(self):
+        """',compress=...' for Btrfs fstab lines, or '' when calibration chose none"""
+        option = CompressionCalibrator.mount_option(self.app.plan.btrfs_compression)
+        return f",{option}" if option else ""
 
     def _generate_and_apply_fstab(self):
         """Generate fstab file with Btrfs subvolumes"""
@@ -700,26 +1450,27 @@ class DiskManagent(Adw.Bin):
                 ""
             ]
 
-            if not self.partition_config:
+            partitions = self.app.plan.partitions
+            if not partitions:
                 fstab_content.append("# No partition configuration found")
             else:
                 btrfs_root_device = None
                 btrfs_root_uuid = None
 
                 # Find Btrfs root device
-                for device, config in self.partition_config.items():
-                    if config.get('mountpoint') == '/' and config.get('fstype') == 'btrfs':
+                for device, config in partitions.items():
+                    if config.mountpoint == '/' and config.fstype == 'btrfs':
                         btrfs_root_device = device
-                        btrfs_root_uuid = self._get_device_uuid(device)
+                        btrfs_root_uuid = self._get_device_uuid(config.fs_device)
                         break
 
                 # Generate entries for non-Btrfs partitions first
-                for device, config in self.partition_config.items():
-                    mountpoint = config.get('mountpoint')
+                for device, config in partitions.items():
+                    mountpoint = config.mountpoint
                     if not mountpoint:
                         continue
 
-                    filesystem = config.get('fstype', self._get_filesystem_type(device))
+                    filesystem = config.fstype or self._get_filesystem_type(config.fs_device)
                     if not filesystem:
                         filesystem = 'auto'
 
@@ -727,7 +1478,7 @@ class DiskManagent(Adw.Bin):
                     if device == btrfs_root_device:
                         continue
 
-                    uuid = self._get_device_uuid(device)
+                    uuid = self._get_device_uuid(config.fs_device)
                     device_id = f"UUID={uuid}" if uuid else device
 
                     # Set options based on filesystem and mountpoint
@@ -757,11 +1508,11 @@ class DiskManagent(Adw.Bin):
 
                     for subvol, mount in self.btrfs_subvolumes.items():
                         if mount == '/':
-                            options = f"subvol={subvol},compress=zstd:1,ro"
+                            options = f"subvol={subvol}{self._compress_option()},ro"
                             dump = "0"
                             pass_num = "0"
                         else:
-                            options = f"subvol={subvol},compress=zstd:1"
+                            options = f"subvol={subvol}{self._compress_option()}"
                             dump = "0"
                             pass_num = "0"
 
@@ -859,12 +1610,42 @@ class DiskManagent(Adw.Bin):
             fs_combo.set_active(0)  # Default ext4
         content.append(fs_combo)
 
+        # External journal / log device (new ext4 / XFS partitions only)
+        journal_combo = None
+        if is_new:
+            journal_label = Gtk.Label(label="Journal / Log Device:", xalign=0)
+            content.append(journal_label)
+
+            journal_combo = Gtk.ComboBoxText()
+            journal_combo.append("", "Internal")
+            try:
+                for path, size in self._list_free_partitions():
+                    journal_combo.append(path, f"{path} — {size}")
+            except Exception as e:
+                print(f"Warning: cannot list partitions for journal: {e}")
+            journal_combo.set_active_id("")
+            content.append(journal_combo)
+
+            def on_fs_changed(combo):
+                supported = combo.get_active_text() in self.JOURNAL_FS
+                journal_combo.set_sensitive(supported)
+                if not supported:
+                    journal_combo.set_active_id("")
+
+            fs_combo.connect("changed", on_fs_changed)
+            on_fs_changed(fs_combo)
+
         # Boot flag checkbox
         boot_check = Gtk.CheckButton(label="Mark as bootable")
         if row:
             boot_check.set_active(row.is_bootable)
         content.append(boot_check)
 
+        # Encryption (new partitions only - e.g. / or /home)
+        if is_new:
+            encryption_box, get_passphrase = self._build_encryption_box("Encrypt with LUKS2")
+            content.append(encryption_box)
+
         def on_response(dlg, resp):
             if resp == Gtk.ResponseType.OK:
                 mount = entry_mount.get_text().strip()
@@ -872,22 +1653,27 @@ class DiskManagent(Adw.Bin):
                 is_bootable = boot_check.get_active()
 
                 if is_new:
+                    try:
+                        passphrase = get_passphrase()
+                    except ValueError as e:
+                        self._show_error_dialog("Encryption", str(e))
+                        return
+
                     # Create new partition
                     size = entry_size.get_text().strip()
                     unit = unit_combo.get_active_text()
                     size_str = f"{size}{unit}" if size else "100%"
-                    self._execute_create_partition(size_str, fs, mount, is_bootable)
+                    journal_device = journal_combo.get_active_id() or None
+                    self._execute_create_partition(size_str, fs, mount, is_bootable, passphrase, journal_device)
                 else:
                     # Edit existing partition
                     device = row.partition_path
 
-                    # Update configuration
-                    if device not in self.partition_config:
-                        self.partition_config[device] = {}
-
-                    self.partition_config[device]['mountpoint'] = mount
-                    self.partition_config[device]['bootable'] = is_bootable
-                    self.partition_config[device]['fstype'] = fs
+                    # Update configuration (keep encryption details)
+                    planned = self.app.plan.partitions.get(device) or self.app.plan.set_partition(PartitionPlan(device))
+                    planned.mountpoint = mount
+                    planned.fstype = fs
+                    planned.bootable = is_bootable
 
                     # Update display
                     row.mount_point = mount
@@ -898,7 +1684,6 @@ class DiskManagent(Adw.Bin):
                         "emblem-system-symbolic" if is_bootable else "drive-removable-media-symbolic"
                     )
 
-                    self._save_partition_config()
                     self._generate_and_apply_fstab()
                     self._update_proceed_sensitive()
 
@@ -909,7 +1694,8 @@ class DiskManagent(Adw.Bin):
         dialog.connect("response", on_response)
         dialog.present()
 
-    def _execute_create_partition(self, size, filesystem, mountpoint, is_bootable):
+    def _execute_create_partition(self, size, filesystem, mountpoint, is_bootable, passphrase=None,
+                                  journal_device=None):
         """Execute partition creation"""
         try:
             progress_dialog = self._show_progress_dialog(
@@ -918,6 +1704,8 @@ class DiskManagent(Adw.Bin):
             )
 
             disk = self.selected_disk
+            # Nowa partycja i tak zajmie wolne miejsce, w którym pisze test
+            self._probe_write_speed(disk)
 
             # Check if disk has partition table
             cmd = ['sudo', 'parted', disk, 'print']
@@ -1017,10 +1805,18 @@ class DiskManagent(Adw.Bin):
                 raise Exception("Could not determine partition number")
 
             new_partition = DiskUtils.get_partition_path(disk, partition_num)
+            new_plan = PartitionPlan(
+                new_partition, mountpoint, filesystem, bootable=is_bootable, journal_device=journal_device or ""
+            )
+
+            # Encrypt (LUKS2) if requested
+            if passphrase:
+                for key, value in self._setup_encryption(new_partition, mountpoint, passphrase).items():
+                    setattr(new_plan, key, value)
 
             # Format if filesystem specified
             if filesystem and filesystem != 'unformatted':
-                self._format_partition_sync(new_partition, filesystem)
+                self._format_partition_sync(new_plan.fs_device, filesystem, journal_device)
 
             # Set boot flag if requested
             if is_bootable:
@@ -1028,13 +1824,7 @@ class DiskManagent(Adw.Bin):
                 subprocess.run(cmd, capture_output=True, text=True, timeout=30)
 
             # Update configuration
-            self.partition_config[new_partition] = {
-                'mountpoint': mountpoint,
-                'bootable': is_bootable,
-                'fstype': filesystem
-            }
-
-            self._save_partition_config()
+            self.app.plan.set_partition(new_plan)
             self._generate_and_apply_fstab()
 
             progress_dialog.destroy()
@@ -1046,8 +1836,12 @@ class DiskManagent(Adw.Bin):
                 progress_dialog.destroy()
             self._show_error_dialog("Error", f"Failed to create partition: {str(e)}")
 
-    def _format_partition_sync(self, device, filesystem):
-        """Format partition synchronously"""
+    def _format_partition_sync(self, device, filesystem, journal_device=None):
+        """Format partition synchronously, optionally with an external journal/log"""
+        if journal_device:
+            self._format_with_journal(device, filesystem, journal_device)
+            return
+
         if filesystem == 'ext4':
             cmd = ['sudo', 'mkfs.ext4', '-F', device]
         elif filesystem == 'btrfs':
@@ -1067,7 +1861,28 @@ class DiskManagent(Adw.Bin):
         else:
             return
 
-        subprocess.run(cmd, capture_output=True, text=True, timeout=120, check=True)
+        HeavyCommand.run(cmd, capture_output=True, text=True, timeout=120, check=True)
+
+    def _format_with_journal(self, device, filesystem, journal_device):
+        """
+        ext4: format ``journal_device`` as a journal (-O journal_dev) and
+        attach it with -J device=; XFS: put the log there with -l logdev=.
+        """
+        if filesystem == 'ext4':
+            # block sizes of the journal and the filesystem must match
+            cmds = [
+                ['sudo', 'mkfs.ext4', '-F', '-b', '4096', '-O', 'journal_dev', journal_device],
+                ['sudo', 'mkfs.ext4', '-F', '-b', '4096', '-J', f'device={journal_device}', device],
+            ]
+        elif filesystem == 'xfs':
+            cmds = [['sudo', 'mkfs.xfs', '-f', '-l', f'logdev={journal_device}', device]]
+        else:
+            raise Exception(f"External journal is not supported for {filesystem}")
+
+        for cmd in cmds:
+            process = HeavyCommand.run(cmd, capture_output=True, text=True, timeout=120)
+            if process.returncode != 0:
+                raise Exception(f"Formatting failed: {process.stderr}")
 
     def _convert_size_to_mb(self, size_str):
         """Convert size string to MB"""
@@ -1085,51 +1900,10 @@ class DiskManagent(Adw.Bin):
         except (ValueError, IndexError):
             return None
 
-    def init_partition_config(self):
-        """Initialize partition configuration"""
-        self._load_partition_config()
-
-    def _load_partition_config(self):
-        """Load partition configuration from file"""
-        try:
-            config_path = "/tmp/installer_config/.disk_utility_config.json"
-
-            if os.path.exists(config_path):
-                with open(config_path, 'r') as f:
-                    self.partition_config = json.load(f)
-            else:
-                self.partition_config = {}
-        except Exception:
-            self.partition_config = {}
-
-    def _load_partition_config_with_return(self):
-        try:
-            config_path = "/tmp/installer_config/.disk_utility_config.json"
-
-            if os.path.exists(config_path):
-                with open(config_path, 'r') as f:
-                    return json.load(f)
-            else:
-                return None
-        except Exception:
-            return None
-
-    def _save_partition_config(self):
-        """Save partition configuration to file"""
-        try:
-            config_dir = "/tmp/installer_config"
-            os.makedirs(config_dir, exist_ok=True)
-
-            config_path = os.path.join(config_dir, ".disk_utility_config.json")
-
-            with open(config_path, 'w') as f:
-                json.dump(self.partition_config, f, indent=2)
-        except Exception as e:
-            print(f"Error saving config: {e}")
-
     def _generate_and_apply_fstab(self):
         """Generate fstab file"""
         try:
+            self._refresh_swap_plan()
             fstab_content = [
                 "# /etc/fstab: static file system information.",
                 "#",
@@ -1137,37 +1911,48 @@ class DiskManagent(Adw.Bin):
                 ""
             ]
 
-            if not self.partition_config:
+            partitions = self.app.plan.partitions
+            if not partitions:
                 fstab_content.append("# No partition configuration found")
             else:
                 btrfs_root_device = None
                 btrfs_root_uuid = None
 
                 # Find Btrfs root
-                for device, config in self.partition_config.items():
-                    if config.get('mountpoint') == '/':
-                        filesystem = config.get('fstype', self._get_filesystem_type(device))
+                for device, config in partitions.items():
+                    if config.mountpoint == '/':
+                        filesystem = config.fstype or self._get_filesystem_type(config.fs_device)
                         if filesystem == 'btrfs':
                             btrfs_root_device = device
-                            btrfs_root_uuid = self._get_device_uuid(device)
+                            btrfs_root_uuid = self._get_device_uuid(config.fs_device)
                             break
 
                 # Generate entries
-                for device, config in self.partition_config.items():
-                    if 'mountpoint' not in config:
+                for device, config in partitions.items():
+                    if not config.mountpoint and config.fstype != 'swap':
                         continue
 
-                    mountpoint = config['mountpoint']
-                    bootable = config.get('bootable', False)
-                    filesystem = config.get('fstype', self._get_filesystem_type(device) or 'auto')
+                    bootable = config.bootable
+                    filesystem = config.fstype or self._get_filesystem_type(config.fs_device) or 'auto'
+                    mountpoint = "none" if filesystem == "swap" else config.mountpoint
 
-                    uuid = self._get_device_uuid(device)
+                    uuid = self._get_device_uuid(config.fs_device)
+
+                    if config.raid_level:
+                        fstab_content.append(f"# {config.raid_level} across: {' '.join(config.members)}")
+                    if config.cache_mode:
+                        fstab_content.append(f"# lvmcache ({config.cache_mode}) on {config.cache_device}")
 
                     # Handle Btrfs subvolumes
                     if device == btrfs_root_device and filesystem == 'btrfs':
-                        for subvol, mount in self.btrfs_subvolumes.items():
+                        for subvolume in self._subvolumes():
+                            subvol, mount = subvolume.name, subvolume.mountpoint
+                            if subvolume.nodatacow:
+                                fstab_content.append(f"# {mount}: NoCOW (chattr +C), not compressed")
+                            elif subvolume.compression:
+                                fstab_content.append(f"# {mount}: compression property {subvolume.compression}")
                             device_id = f"UUID={uuid}" if uuid else device
-                            options = f"subvol={subvol},defaults,compress=zstd,noatime"
+                            options = f"subvol={subvol},defaults{self._compress_option()},noatime"
                             dump = "0"
                             pass_num = "1" if mount == "/" else "2"
 
@@ -1191,10 +1976,21 @@ class DiskManagent(Adw.Bin):
                             dump = "0"
                             pass_num = "2"
 
+                        journal_option = config.journal_mount_option(self._stable_path(config.journal_device))
+                        if journal_option:
+                            options = f"{options},{journal_option}"
+
                         device_id = f"UUID={uuid}" if uuid else device
                         fstab_line = f"{device_id:<25} {mountpoint:<15} {filesystem:<7} {options:<15} {dump:<6} {pass_num}"
                         fstab_content.append(fstab_line)
 
+                swap = self.app.plan.swap
+                if swap.kind == "swapfile" and btrfs_root_device:
+                    swapfile = SwapPlanner.SWAPFILE_PATH
+                    fstab_content.append(f"{swapfile:<25} {'none':<15} {'swap':<7} {'defaults':<15} {'0':<6} 0")
+                elif swap.kind == "zram":
+                    fstab_content.append(f"# swap: zram ({swap.algorithm}), see /etc/systemd/zram-generator.conf")
+
             # Save fstab
             etc_dir = "/tmp/installer_config/etc"
             os.makedirs(etc_dir, exist_ok=True)
@@ -1205,11 +2001,72 @@ class DiskManagent(Adw.Bin):
 
             print(f"Generated fstab saved to: {fstab_path}")
 
+            self._generate_crypttab(etc_dir)
+            self._generate_mdadm_conf(etc_dir)
+            self._generate_zram_config(etc_dir)
+
         except Exception as e:
             print(f"Error generating fstab: {e}")
             import traceback
             traceback.print_exc()
 
+    def _generate_crypttab(self, etc_dir):
+        """Write crypttab for LUKS2 partitions next to the generated fstab"""
+        crypttab_path = os.path.join(etc_dir, "crypttab")
+        encrypted = self.app.plan.encrypted_partitions
+
+        if not encrypted:
+            if os.path.exists(crypttab_path):
+                os.unlink(crypttab_path)
+            return
+
+        lines = [
+            "# /etc/crypttab: encrypted block devices",
+            "# <name>             <device>                                      <password> <options>",
+        ]
+        for part in encrypted:
+            luks_uuid = part.luks_uuid or LuksManager.luks_uuid(part.device)
+            if not luks_uuid:
+                print(f"Warning: no LUKS UUID for {part.device}, skipping crypttab entry")
+                continue
+            lines.append(LuksManager.crypttab_line(part.luks_name, luks_uuid, part.device))
+
+        with open(crypttab_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        print(f"Generated crypttab saved to: {crypttab_path}")
+
+    def _generate_zram_config(self, etc_dir):
+        """Write zram-generator.conf when the swap planner chose zram"""
+        zram_conf_path = os.path.join(etc_dir, "systemd", "zram-generator.conf")
+        swap = self.app.plan.swap
+
+        if swap.kind != "zram":
+            if os.path.exists(zram_conf_path):
+                os.unlink(zram_conf_path)
+            return
+
+        os.makedirs(os.path.dirname(zram_conf_path), exist_ok=True)
+        with open(zram_conf_path, 'w') as f:
+            f.write(SwapPlanner.zram_config(swap.size_mib, swap.algorithm))
+        print(f"Generated zram-generator.conf saved to: {zram_conf_path}")
+
+    def _generate_mdadm_conf(self, etc_dir):
+        """Write mdadm.conf so the initramfs and the installed system assemble the md arrays"""
+        mdadm_conf_path = os.path.join(etc_dir, "mdadm.conf")
+        uses_md = any(
+            p.raid_level and p.device.startswith("/dev/md") for p in self.app.plan.partitions.values()
+        )
+
+        content = RaidLayout.mdadm_conf() if uses_md else None
+        if not content:
+            if os.path.exists(mdadm_conf_path):
+                os.unlink(mdadm_conf_path)
+            return
+
+        with open(mdadm_conf_path, 'w') as f:
+            f.write(content)
+        print(f"Generated mdadm.conf saved to: {mdadm_conf_path}")
+
     def _get_filesystem_type(self, device):
         """Get filesystem type of a device"""
         try:
@@ -1221,6 +2078,20 @@ class DiskManagent(Adw.Bin):
             pass
         return None
 
+    def _stable_path(self, device):
+        """/dev/disk/by-partuuid path for ``device`` (journal/log devices have no filesystem UUID)"""
+        if not device:
+            return device
+        try:
+            cmd = ['sudo', 'blkid', '-o', 'value', '-s', 'PARTUUID', device]
+            process = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+            partuuid = process.stdout.strip()
+            if process.returncode == 0 and partuuid:
+                return f"/dev/disk/by-partuuid/{partuuid}"
+        except Exception:
+            pass
+        return device
+
     def _get_device_uuid(self, device):
         """Get UUID of a device"""
         try:
@@ -1259,16 +2130,7 @@ class DiskManagent(Adw.Bin):
 
     def _update_proceed_sensitive(self):
         """Update proceed button sensitivity"""
-        has_root = False
-        has_boot = False
-
-        for device, config in self.partition_config.items():
-            if config.get('mountpoint') == '/':
-                has_root = True
-            if config.get('bootable', False):
-                has_boot = True
-
-        self.btn_proceed.set_sensitive(has_root and has_boot)
+        self.btn_proceed.set_sensitive(not self._calibrating and not self.app.plan.partition_problems())
 
     def _show_error_dialog(self, heading, message):
         """Show error dialog"""
@@ -1320,27 +2182,17 @@ class DiskManagent(Adw.Bin):
 
     def _on_proceed(self, button):
         """Handle proceed button with validation"""
-        has_root = False
-        has_boot = False
-
-        for device, config in self.partition_config.items():
-            if config.get('mountpoint') == '/':
-                has_root = True
-            if config.get('bootable', False):
-                has_boot = True
-
-        if not has_root or not has_boot:
-            missing = []
-            if not has_root:
-                missing.append("• Root (/) mountpoint")
-            if not has_boot:
-                missing.append("• Bootable partition")
-
+        problems = self.app.plan.partition_problems()
+        if problems:
+            missing = [f"• {p}" for p in problems]
             self._show_error_dialog(
                 "Missing Configuration",
                 f"The following are required:\n\n{chr(10).join(missing)}"
             )
             return
 
+        # Checkpoint
+        self.app.save_plan()
+
         if hasattr(self.app, "go_to"):
             self.app.go_to("user")
@@ -3,7 +3,6 @@ import gi
 import os
 import json
 import time
-import re
 import threading
 import subprocess
 
@@ -11,20 +10,39 @@ gi.require_version("Gtk", "4.0")
 gi.require_version("Adw", "1")
 from gi.repository import Gtk, Adw, GLib
 from ..pages.disk_managent import DiskManagent
+from ..locales import LocaleUtils
+from ..system_config import SystemConfigWriter
+from ..raid import RaidLayout
+from ..btrfs_layout import BtrfsLayout
+from ..compression import CompressionCalibrator
+from ..mount_plan import MountEntry, MountError, MountTree
+from ..io_tuning import IoTuning
+from ..deploy_eta import DeployEta, ImageManifest
+from ..live_source import LiveOstreeSource
+from ..registry_mirrors import RegistryMirrors
+from ..heavy_command import HeavyCommand
+from ..encryption import LuksManager
 
 class InstallationPage(Adw.Bin):
+    LOCAL_ORIGIN = "/tmp/installer_config/pelican.origin"
+    MIRROR_PROBE_TIMEOUT = 30
+
     def __init__(self, app):
         super().__init__()
         self.app = app
         self.set_child(self._build_ui())
         self.install_thread = None
+        self.mount_tree = None
+        self.deploy_eta = None
         # Lista zadań instalacyjnych
         self.tasks = [
             ("Mounting partitions...", self._mount_partitons),
             ("Initializing OSTree Filesystem...", self._init_ostree_fs),
             ("Deploying OSTree system...", self._deploy_ostree_system),
+            ("Generating locales...", self._generate_locales),
             ("Installing Bootloader...", self._install_bootloader),
-            ("Configuring system...", self._configure_system)
+            ("Configuring system...", self._configure_system),
+            ("Flushing and unmounting...", self._teardown),
         ]
 
         # Uruchom instalację automatycznie po załadowaniu UI
@@ -59,6 +77,12 @@ class InstallationPage(Adw.Bin):
         self.progress.set_vexpand(False)
         main_box.append(self.progress)
 
+        # Szacowany czas wdrożenia obrazu
+        self.eta_label = Gtk.Label()
+        self.eta_label.add_css_class("dim-label")
+        self.eta_label.set_halign(Gtk.Align.CENTER)
+        main_box.append(self.eta_label)
+
         # Button for showing details
         self.toggle_btn = Gtk.Button(label="Show details")
         self.toggle_btn.set_halign(Gtk.Align.CENTER)
@@ -126,6 +150,12 @@ class InstallationPage(Adw.Bin):
                 GLib.idle_add(self._append_log, f"[ERROR] {desc}: {e}\n")
                 continue
 
+        # Teardown failed before unmounting - do not leave the target mounted
+        if self.mount_tree is not None:
+            GLib.idle_add(self._append_log, "Unmounting target filesystems...\n")
+            self.mount_tree.unmount_all()
+            self.mount_tree = None
+
         GLib.idle_add(self._installation_complete)
 
     def _update_status(self, text, step, total):
@@ -146,48 +176,62 @@ class InstallationPage(Adw.Bin):
 
     # Mounting Partitons
 
-    def _mount_partitons(self):
-        config = self.app.managent_part_page._load_partition_config_with_return()
+    def _target_path(self, mountpoint):
+        """
+        Where ``mountpoint`` of the installed system lives under the target.
+
+        /var (and /home -> /var/home) belong to the OSTree stateroot, so
+        they are mounted there; /boot and / stay on the physical root.
+        """
         target_root = "/mnt/pelican_root"
-        os.makedirs(target_root, exist_ok=True)
-        self._append_log("Starting partition mounting...\n")
+        stateroot_var = os.path.join(target_root, "ostree", "deploy", "pelican", "var")
+
+        if mountpoint == "/":
+            return target_root
+        for prefix, base in (("/var", stateroot_var), ("/home", os.path.join(stateroot_var, "home"))):
+            if mountpoint == prefix or mountpoint.startswith(prefix + "/"):
+                return os.path.join(base, mountpoint[len(prefix):].lstrip("/"))
+        return os.path.join(target_root, mountpoint.lstrip("/"))
+
+    def _build_mount_tree(self):
+        """Mount entries for every planned filesystem, Btrfs subvolumes included"""
+        plan = self.app.plan
+        compress = CompressionCalibrator.mount_option(plan.btrfs_compression)
+        subvolumes = BtrfsLayout.subvolumes(plan.subvolume_profile, swapfile=plan.swap.kind == "swapfile")
+
+        entries = []
+        for info in plan.partitions.values():
+            if not info.mountpoint or info.fstype == "swap":
+                continue
 
-        total_parts = len(config)
-        done = 0
-
-        # Najpierw root
-        for device, info in config.items():
-            if info.get("mountpoint") == "/":
-                try:
-                    subprocess.run(["mount", "-t", info.get("fstype", "auto"), device, target_root], check=True)
-                    self._append_log(f"Mounted root ({device}) to {target_root}\n")
-                except subprocess.CalledProcessError as e:
-                    self._append_log(f"[ERROR] Failed to mount root: {e}\n")
-                    return False
-                done += 1
-                GLib.idle_add(self.progress.set_fraction, done / total_parts)
-                break
-
-        # Potem reszta
-        for device, info in config.items():
-            mp = info.get("mountpoint")
-            if mp in [None, "", "/"]:
+            if info.mountpoint == "/" and info.fstype == "btrfs":
+                for subvolume in subvolumes:
+                    options = [f"subvol={subvolume.name}"] + ([compress] if compress else [])
+                    entries.append(MountEntry(info.fs_device, self._target_path(subvolume.mountpoint), "btrfs", options))
                 continue
 
-            full_mount_path = os.path.join(target_root, mp.lstrip("/"))
-            os.makedirs(full_mount_path, exist_ok=True)
-            fstype = info.get("fstype", "auto")
+            journal_option = info.journal_mount_option()
+            entries.append(MountEntry(
+                info.fs_device, self._target_path(info.mountpoint), info.fstype or "auto",
+                [journal_option] if journal_option else [],
+            ))
 
-            try:
-                subprocess.run(["mount", "-t", fstype, device, full_mount_path], check=True)
-                self._append_log(f"Mounted {device} -> {full_mount_path}\n")
-            except subprocess.CalledProcessError as e:
-                self._append_log(f"[ERROR] Failed to mount {device}: {e}\n")
+        return MountTree(entries, log=lambda msg: GLib.idle_add(self._append_log, msg))
+
+    def _mount_partitons(self):
+        self._append_log("Starting partition mounting...\n")
 
-            done += 1
-            GLib.idle_add(self.progress.set_fraction, done / total_parts)
+        try:
+            self.mount_tree = self._build_mount_tree()
+            if self.mount_tree.root is None or self.mount_tree.root.target != "/mnt/pelican_root":
+                raise MountError("No root (/) filesystem in the plan")
+            self.mount_tree.mount_all()
+        except MountError as e:
+            self.mount_tree = None
+            self._append_log(f"[ERROR] {e}\n")
+            raise
 
-        self._append_log("All partitions mounted successfully.\n")
+        self._append_log(f"All {len(self.mount_tree.mounted)} filesystems mounted successfully.\n")
         return True
 
     # Initliazing OSTree Filesystem
@@ -227,39 +271,83 @@ class InstallationPage(Adw.Bin):
             if not os.path.exists(registry_conf):
                 raise FileNotFoundError(f"Registry config not found: {registry_conf}")
 
-            with open(registry_conf, "r") as f:
-                image_ref = f.readline().strip()
-
-            if not image_ref:
+            mirrors = RegistryMirrors.load(registry_conf)
+            if mirrors is None:
                 raise ValueError("Image reference in registry.conf is empty")
+            image_ref = mirrors.image_ref
 
             self._append_log(f"Loaded image reference: {image_ref}\n")
-
-            # Budujemy komendę pacman-ostree
-            cmd = [
-                "ostree",
-                "container", "image", "deploy",
-                "--sysroot", target_root,
-                "--stateroot", stateroot,
-                "--image", image_ref,
-                "--transport", "registry",
-                "--insecure-skip-tls-verification"
-            ]
-
-            self._append_log(f"Running: {' '.join(cmd)}\n")
-
-            # Uruchamiamy proces z przekierowaniem logów
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True
-            )
-
-            for line in process.stdout:
-                GLib.idle_add(self._append_log, line)
-
-            process.wait()
+            self._configure_mirrors(self.app.mirrors if self.app.mirrors is not None else mirrors)
+            manifest = self._fetch_manifest(image_ref)
+
+            kargs = []
+            # Odblokowanie zaszyfrowanych partycji w initramfs
+            for part in self.app.plan.encrypted_partitions:
+                if part.luks_uuid:
+                    kargs.append(f"rd.luks.name={part.luks_uuid}={part.luks_name}")
+
+            # Złożenie macierzy md i LV z rootem w initramfs
+            for part in self.app.plan.partitions.values():
+                if part.raid_level and part.device.startswith("/dev/md"):
+                    md_uuid = RaidLayout.md_uuid(part.device)
+                    if md_uuid:
+                        kargs.append(f"rd.md.uuid={md_uuid}")
+                if part.cache_mode:
+                    kargs.append(f"rd.lvm.lv={part.device[len('/dev/'):]}")
+
+            # Wznawianie z hibernacji z partycji swap
+            swap_part = self.app.plan.swap_partition
+            if self.app.plan.swap.mode == "hibernate" and swap_part is not None:
+                kargs.append(f"resume={self._resume_device(swap_part)}")
+
+            # Live system z tego samego obrazu: obiekty z lokalnego repo zamiast z sieci
+            local = LiveOstreeSource.detect()
+            if local is not None and local.matches(manifest):
+                self._append_log(f"Live system matches image {manifest.digest}, deploying from {local.repo}\n")
+                cmd = local.deploy_cmd(target_root, stateroot, image_ref, kargs, self.LOCAL_ORIGIN)
+            else:
+                local = None
+                # Budujemy komendę pacman-ostree
+                cmd = [
+                    "ostree",
+                    "container", "image", "deploy",
+                    "--sysroot", target_root,
+                    "--stateroot", stateroot,
+                    "--image", image_ref,
+                    "--transport", "registry",
+                    "--insecure-skip-tls-verification"
+                ]
+                for karg in kargs:
+                    cmd += ["--karg", karg]
+
+            self.app.report.record("deploy_source", source="live" if local else "registry",
+                                   digest=manifest.digest if manifest else None)
+
+            # Tymczasowe strojenie I/O dysków docelowych na czas wdrożenia
+            tuning = IoTuning(self.app.plan.block_devices, probe_dir=target_root, log=self._append_log)
+            try:
+                with tuning:
+                    # Liczniki ETA dopiero po próbach zapisu IoTuning, żeby ich nie liczyć
+                    self._start_deploy_eta(manifest, network=local is None)
+                    if local is not None:
+                        local.pull_local(target_root, stateroot, log=self._append_log)
+
+                    self._append_log(f"Running: {' '.join(cmd)}\n")
+                    # Uruchamiamy proces z przekierowaniem logów
+                    process = HeavyCommand.popen(
+                        cmd,
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.STDOUT,
+                        text=True
+                    )
+
+                    for line in process.stdout:
+                        GLib.idle_add(self._append_log, line)
+
+                    process.wait()
+            finally:
+                self.app.report.record("io_tuning", disks=tuning.disks, **tuning.results)
+                self._stop_deploy_eta()
 
             if process.returncode != 0:
                 self._append_log("[ERROR] pacman-ostree deployment failed!\n")
@@ -279,59 +367,199 @@ class InstallationPage(Adw.Bin):
 
         return True
 
+    def _configure_mirrors(self, mirrors):
+        """Order the mirrors by the startup probe and hand them to the image fetcher"""
+        # Drop-in z poprzedniego uruchomienia nie może kierować pobierania na stare mirrory
+        try:
+            if mirrors.remove():
+                self._append_log(f"[Mirrors] Removed stale mirror config {mirrors.REGISTRIES_CONF}\n")
+        except OSError as e:
+            self._append_log(f"[Mirrors] Cannot remove stale mirror config: {e}\n")
+        if not mirrors.mirrors:
+            return
+        ranked = mirrors.ranked(timeout=self.MIRROR_PROBE_TIMEOUT)
+        for result in mirrors.results:
+            if "error" in result:
+                self._append_log(f"[Mirrors] {result['location']}: unreachable ({result['error']})\n")
+            else:
+                self._append_log(
+                    f"[Mirrors] {result['location']}: {result['latency_ms']} ms, {result['mb_s']} MB/s\n"
+                )
+        self.app.report.record("registry_mirrors", ranked=ranked, probes=mirrors.results,
+                               finished=mirrors.finished)
+
+        if not mirrors.finished:
+            self._append_log(
+                f"[Mirrors] Probe did not finish within {self.MIRROR_PROBE_TIMEOUT} s, "
+                "using the registry from registry.conf\n"
+            )
+            return
+        if not ranked:
+            self._append_log("[Mirrors] No mirror answered, using the registry from registry.conf\n")
+            return
+        try:
+            path = mirrors.write(ranked)
+            self._append_log(f"[Mirrors] Fastest: {ranked[0]}; mirror config written to {path}\n")
+        except OSError as e:
+            self._append_log(f"[Mirrors] Cannot write mirror config: {e}\n")
+
+    def _fetch_manifest(self, image_ref):
+        """Manifest (layer sizes, digest) of the image, or None when unreachable"""
+        try:
+            manifest = ImageManifest(image_ref).fetch()
+        except Exception as e:
+            # the ETA is optional, whatever goes wrong here must not stop the deploy
+            self._append_log(f"[ETA] Image manifest unavailable, no ETA: {e}\n")
+            return None
+
+        self._append_log(
+            f"[ETA] Image: {len(manifest.layers)} layers, {manifest.compressed_bytes / 1024 ** 2:.0f} MiB "
+            f"compressed, ~{manifest.uncompressed_bytes / 1024 ** 2:.0f} MiB unpacked\n"
+        )
+        self.app.report.record(
+            "deploy_eta", layers=len(manifest.layers), compressed_bytes=manifest.compressed_bytes,
+            estimated_uncompressed_bytes=round(manifest.uncompressed_bytes),
+        )
+        return manifest
+
+    def _start_deploy_eta(self, manifest, network=True):
+        """Start refreshing the ETA label once a second"""
+        if manifest is None:
+            return
+        self.deploy_eta = DeployEta(manifest, self.app.plan.block_devices, network=network)
+        GLib.timeout_add_seconds(1, self._update_eta)
+
+    def _update_eta(self):
+        eta = self.deploy_eta
+        if eta is None:
+            self.eta_label.set_text("")
+            return False
+
+        sample = eta.sample()
+        # pobieranie (skompresowane) i zapis (rozpakowane) osobno - to te same dane w innych jednostkach
+        text = f"{sample['remaining_write'] / 1024 ** 2:.0f} MiB left to write"
+        if sample["remaining_download"]:
+            text += f", {sample['remaining_download'] / 1024 ** 2:.0f} MiB left to download"
+        if sample["eta_seconds"] is None:
+            self.eta_label.set_text(f"{text}, estimating time...")
+        else:
+            minutes, seconds = divmod(int(sample["eta_seconds"]), 60)
+            self.eta_label.set_text(f"{text}, about {minutes}:{seconds:02d} left")
+        return True
+
+    def _stop_deploy_eta(self):
+        eta = self.deploy_eta
+        if eta is None:
+            return
+        self.deploy_eta = None
+        sample = eta.sample()
+        self.app.report.record(
+            "deploy_eta", downloaded_bytes=sample["downloaded"], written_bytes=sample["written"],
+            observed_ratio=round(eta.ratio, 2),
+        )
+
+    @staticmethod
+    def _resume_device(swap_part):
+        """resume= target: the mapper for encrypted swap, otherwise UUID=..."""
+        if swap_part.encrypted:
+            return swap_part.fs_device
+        try:
+            process = subprocess.run(
+                ["blkid", "-o", "value", "-s", "UUID", swap_part.device],
+                capture_output=True, text=True, timeout=10,
+            )
+            uuid = process.stdout.strip()
+            if process.returncode == 0 and uuid:
+                return f"UUID={uuid}"
+        except Exception:
+            pass
+        return swap_part.device
+
+    def _find_deployment_root(self):
+        """Return the path of the freshly deployed OSTree checkout"""
+        target_root = "/mnt/pelican_root"
+        stateroot = "pelican"
+        deploy_dir = os.path.join(target_root, "ostree", "deploy", stateroot, "deploy")
+
+        try:
+            candidates = [
+                os.path.join(deploy_dir, d) for d in os.listdir(deploy_dir)
+                if os.path.isdir(os.path.join(deploy_dir, d))
+            ]
+        except OSError:
+            candidates = []
+
+        if not candidates:
+            raise FileNotFoundError(f"No OSTree deployment found in {deploy_dir}")
+
+        # Najnowszy deployment
+        return max(candidates, key=os.path.getmtime)
+
+    def _generate_locales(self):
+        self._append_log("Generating selected locales...\n")
+
+        locales = [self.app.plan.language or "en_US.UTF-8"]
+        locales += self.app.plan.extra_locales
+
+        deploy_root = self._find_deployment_root()
+        failed = LocaleUtils.compile_locales(
+            deploy_root,
+            locales,
+            log=lambda msg: GLib.idle_add(self._append_log, msg),
+        )
+
+        for name, err in failed:
+            self._append_log(f"[ERROR] Failed to generate locale {name}: {err}\n")
+        if failed:
+            raise RuntimeError(f"{len(failed)} locale(s) failed to generate")
+
+        self._append_log(f"Generated {len(locales)} locale(s).\n")
+        return True
+
     def _install_bootloader(self):
         self._append_log("Installing Bootloader...\n")
         target_root = "/mnt/pelican_root"
 
-        # Wczytaj konfigurację partycji
-        config = self.app.managent_part_page._load_partition_config_with_return()
         os.makedirs(target_root, exist_ok=True)
 
-        boot_device = None
+        # Dyski z bootloaderem — z planu (multi-disk) albo dysk nadrzędny /boot/efi lub /boot
+        boot_disks = self.app.plan.boot_disks
 
-        # Znajdź urządzenie z mountpointem /boot lub /boot/efi
-        for device, info in config.items():
-            mp = info.get("mountpoint", "")
-            if mp in ("/boot", "/boot/efi"):
-                boot_device = device
-                break
-
-        if not boot_device:
+        if not boot_disks:
             self._append_log("[ERROR] No /boot or /boot/efi partition found in configuration!\n")
             return False
 
-        # Usuń numer partycji — działa dla /dev/sda2, /dev/vda1, /dev/nvme0n1p3
-        base_device = re.sub(r"p?\d+$", "", boot_device)
-        self._append_log(f"Detected boot device: {boot_device} -> base: {base_device}\n")
+        self._append_log(f"Bootloader devices: {', '.join(boot_disks)}\n")
 
         try:
-            # Zbuduj komendę — uwaga: DEST_ROOT jest argumentem pozycyjnym!
-            cmd = [
-                "bootupctl", "backend", "install",
-                "--auto",
-                "--write-uuid",
-                "--update-firmware",
-                "--device", base_device,
-                target_root
-            ]
-
-            self._append_log(f"Running: {' '.join(cmd)}\n")
-
-            # Uruchom proces i przekieruj logi do GUI
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True
-            )
+            for base_device in boot_disks:
+                # Zbuduj komendę — uwaga: DEST_ROOT jest argumentem pozycyjnym!
+                cmd = [
+                    "bootupctl", "backend", "install",
+                    "--auto",
+                    "--write-uuid",
+                    "--update-firmware",
+                    "--device", base_device,
+                    target_root
+                ]
+
+                self._append_log(f"Running: {' '.join(cmd)}\n")
+
+                # Uruchom proces i przekieruj logi do GUI
+                process = HeavyCommand.popen(
+                    cmd,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    text=True
+                )
 
-            for line in process.stdout:
-                GLib.idle_add(self._append_log, line)
+                for line in process.stdout:
+                    GLib.idle_add(self._append_log, line)
 
-            process.wait()
+                process.wait()
 
-            if process.returncode != 0:
-                raise subprocess.CalledProcessError(process.returncode, cmd)
+                if process.returncode != 0:
+                    raise subprocess.CalledProcessError(process.returncode, cmd)
 
             self._append_log("Bootloader installed successfully.\n")
 
@@ -345,7 +573,72 @@ class InstallationPage(Adw.Bin):
         return True
 
     def _configure_system(self):
-        self._append_log(f"Not implemented yet.")
+        self._append_log("Writing system configuration into deployment...\n")
+
+        target_root = "/mnt/pelican_root"
+        stateroot = "pelican"
+        deploy_root = self._find_deployment_root()
+
+        # /home w OSTree to symlink do /var/home, a /var jest wspólny dla stateroot
+        writer = SystemConfigWriter(
+            deploy_root,
+            home_root=os.path.join(target_root, "ostree", "deploy", stateroot, "var", "home"),
+        )
+        writer.apply(
+            language=self.app.plan.language,
+            timezone=self.app.plan.timezone,
+            layout=self.app.plan.keyboard_layout,
+            fstab_source="/tmp/installer_config/etc/fstab",
+            crypttab_source="/tmp/installer_config/etc/crypttab",
+            mdadm_conf_source="/tmp/installer_config/etc/mdadm.conf",
+            zram_conf_source="/tmp/installer_config/etc/systemd/zram-generator.conf",
+            user=self.app.plan.user,
+            log=lambda msg: GLib.idle_add(self._append_log, msg),
+        )
+        return True
+
+    def _teardown(self):
+        """
+        Flush every target filesystem with one syncfs each, report how long
+        the writeback took, then unmount leaves-first. Reboot is only
+        enabled once this has finished.
+        """
+        if self.mount_tree is None:
+            self._append_log("Nothing mounted, skipping teardown.\n")
+            return True
+
+        self._append_log("Flushing target filesystems...\n")
+        start = time.perf_counter()
+        results = self.mount_tree.sync_all()
+        sync_seconds = time.perf_counter() - start
+
+        total_bytes = 0
+        for result in results:
+            written = result["bytes"]
+            total_bytes += written or 0
+            size = f"{written / (1024 * 1024):.1f} MiB" if written is not None else "unknown size"
+            self._append_log(f"syncfs {result['target']}: {result['seconds']:.2f} s, {size}\n")
+        self._append_log(
+            f"Writeback finished in {sync_seconds:.2f} s ({total_bytes / (1024 * 1024):.1f} MiB)\n"
+        )
+
+        self.app.report.record(
+            "teardown", syncfs=results, sync_seconds=round(sync_seconds, 3), sync_bytes=total_bytes
+        )
+        # ostatni zapis do celu, zanim /var zostanie odmontowany
+        var_root = os.path.join("/mnt/pelican_root", "ostree", "deploy", "pelican", "var")
+        report_path = self.app.report.write_to(var_root)
+        self._append_log(f"Install report written to {report_path}\n")
+
+        start = time.perf_counter()
+        errors = self.mount_tree.unmount_all()
+        self.mount_tree = None
+        if errors:
+            raise RuntimeError(f"{len(errors)} filesystem(s) could not be unmounted")
+        self._append_log(f"Unmounted target in {time.perf_counter() - start:.2f} s\n")
+
+        for part in self.app.plan.encrypted_partitions:
+            LuksManager.close(part.luks_name)
         return True
 
 
@@ -1,9 +1,9 @@
 import gi
-import os
 
 gi.require_version("Gtk", "4.0")
 gi.require_version("Adw", "1")
 from gi.repository import Gtk, Adw
+from ..xkb_layouts import XkbLayoutIndex
 
 
 class KeyboardLayoutPage(Adw.Bin):
@@ -11,6 +11,7 @@ class KeyboardLayoutPage(Adw.Bin):
         super().__init__()
         self.app = app
         self.selected_layout = None
+        self.expander_rows = []
 
         # --- Main layout ---
         main_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
@@ -22,6 +23,11 @@ class KeyboardLayoutPage(Adw.Bin):
         title.set_halign(Gtk.Align.CENTER)
         main_box.append(title)
 
+        self.search_entry = Gtk.SearchEntry()
+        self.search_entry.set_placeholder_text("Search by language, country or layout...")
+        self.search_entry.connect("search-changed", self.on_search_changed)
+        main_box.append(self.search_entry)
+
         # --- Keyboard layouts container ---
         scrolled = Gtk.ScrolledWindow()
         scrolled.set_vexpand(True)
@@ -32,10 +38,9 @@ class KeyboardLayoutPage(Adw.Bin):
         self.listbox.set_selection_mode(Gtk.SelectionMode.NONE)
         scrolled.set_child(self.listbox)
 
-        # --- Load and group keyboard layouts ---
-        layouts = self.get_available_layouts()
-        grouped_layouts = self.group_layouts(layouts)
-        self.populate_layouts(grouped_layouts)
+        # --- Load indexed keyboard layouts (cached) ---
+        self.layout_index = XkbLayoutIndex().load()
+        self.populate_layouts(self.layout_index)
 
         # --- Buttons ---
         btn_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=15)
@@ -52,96 +57,38 @@ class KeyboardLayoutPage(Adw.Bin):
         self.btn_next.connect("clicked", self.on_next)
         btn_box.append(self.btn_next)
 
-    # ----------------------------
-    # Load keymaps from system
-    # ----------------------------
-    def get_available_layouts(self):
-        """Read available keyboard layouts from XKB symbols."""
-        keymaps_dir = "/usr/share/X11/xkb/symbols"
-        keymaps = []
-
-        if os.path.isdir(keymaps_dir):
-            for f in sorted(os.listdir(keymaps_dir)):
-                if f.isalpha():
-                    keymaps.append(f)
-
-        # Add ergonomic / special ones manually
-        keymaps += ["dvorak", "colemak"]
-        return keymaps
-
-    # ----------------------------
-    # Grouping logic (your code)
-    # ----------------------------
-    def group_layouts(self, keymaps):
-        groups = {
-            "English": [], "German": [], "French": [], "Spanish": [], "Russian": [],
-            "Portuguese": [], "Polish": [], "Italian": [], "Swedish": [], "Norwegian": [],
-            "Danish": [], "Finnish": [], "Dutch": [], "Czech": [], "Slovak": [],
-            "Hungarian": [], "Romanian": [], "Bulgarian": [], "Greek": [],
-            "Turkish": [], "Ukrainian": [], "Serbian": [], "Croatian": [], "Slovenian": [],
-            "Ergonomic / Special": [], "Other": []
-        }
-
-        prefix_map = {
-            'us': "English", 'gb': "English", 'uk': "English", 'ie': "English",
-            'de': "German",
-            'fr': "French", 'be': "French", 'ca': "French",
-            'es': "Spanish", 'la-latin1': "Spanish",
-            'ru': "Russian",
-            'pt': "Portuguese", 'br': "Portuguese",
-            'pl': "Polish",
-            'it': "Italian",
-            'sv': "Swedish", 'se': "Swedish",
-            'no': "Norwegian",
-            'dk': "Danish",
-            'fi': "Finnish",
-            'nl': "Dutch",
-            'cz': "Czech",
-            'sk': "Slovak",
-            'hu': "Hungarian",
-            'ro': "Romanian",
-            'bg': "Bulgarian",
-            'gr': "Greek",
-            'tr': "Turkish",
-            'ua': "Ukrainian", 'by': "Ukrainian",
-            'sr': "Serbian", 'rs': "Serbian",
-            'hr': "Croatian", 'croat': "Croatian",
-            'slovene': "Slovenian", 'si': "Slovenian",
-            'dvorak': "Ergonomic / Special", 'colemak': "Ergonomic / Special",
-        }
-
-        for keymap in keymaps:
-            found = False
-            if len(keymap) >= 2:
-                prefix_2 = keymap[:2]
-                if prefix_2 in prefix_map:
-                    groups[prefix_map[prefix_2]].append(keymap)
-                    continue
-
-            for prefix, group_name in prefix_map.items():
-                if keymap.startswith(prefix):
-                    groups[group_name].append(keymap)
-                    found = True
-                    break
-
-            if not found:
-                groups["Other"].append(keymap)
-
-        return {k: sorted(v) for k, v in sorted(groups.items()) if v}
-
     # ----------------------------
     # GUI population
     # ----------------------------
-    def populate_layouts(self, grouped):
-        for group_name, layouts in grouped.items():
+    def populate_layouts(self, index):
+        for group_name, entry_ids in index.groups.items():
             expander = Adw.ExpanderRow(title=group_name)
-            for layout in layouts:
+            expander.child_rows = []
+            for entry_id in entry_ids:
+                entry = index.entries[entry_id]
                 row = Gtk.ListBoxRow()
-                button = Gtk.Button(label=layout)
-                button.connect("clicked", self.on_layout_selected, layout)
+                button = Gtk.Button(label=f"{entry['description']}  [{entry_id}]")
+                button.connect("clicked", self.on_layout_selected, entry_id)
                 row.set_child(button)
+                row.entry_id = entry_id
                 expander.add_row(row)
+                expander.child_rows.append(row)
             self.listbox.append(expander)
+            self.expander_rows.append(expander)
+
+    def on_search_changed(self, entry):
+        text = entry.get_text().strip()
+        matches = set(self.layout_index.search(text))
+        for expander in self.expander_rows:
+            visible = 0
+            for row in expander.child_rows:
+                ok = row.entry_id in matches
+                row.set_visible(ok)
+                if ok:
+                    visible += 1
+            expander.set_visible(visible > 0)
+            if text:
+                expander.set_expanded(visible > 0)
 
     # ----------------------------
     # Event handlers
@@ -157,8 +104,7 @@ class KeyboardLayoutPage(Adw.Bin):
 
     def on_next(self, button):
         if self.selected_layout:
-            if hasattr(self.app, 'selected_layout'):
-                self.app.selected_layout = self.selected_layout
+            self.app.plan.keyboard_layout = self.selected_layout
             print(f"[Pelican Installer] Proceeding with layout: {self.selected_layout}")
             self.app.go_to("disk_managent")
             #self.app.go_to("user")
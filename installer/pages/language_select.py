@@ -2,6 +2,7 @@ import gi
 gi.require_version("Gtk", "4.0")
 gi.require_version("Adw", "1")
 from gi.repository import Gtk, Adw
+from ..locales import LocaleUtils
 
 class LanguageSelectPage(Adw.Bin):
     def __init__(self, app):
@@ -18,8 +19,8 @@ class LanguageSelectPage(Adw.Bin):
         title.set_halign(Gtk.Align.CENTER)
         box.append(title)
 
-        # języki z emoji flag (nie wszystkie mają dokładne flagi, więc symbolicznie)
-        self.languages = {
+        # przyjazne nazwy z emoji flag (nie wszystkie mają dokładne flagi, więc symbolicznie)
+        self.language_names = {
             "af_ZA.UTF-8": "🇿🇦 Afrikaans (Suid-Afrika)",
             "sq_AL.UTF-8": "🇦🇱 Shqip (Shqipëri)",
             "ar_SA.UTF-8": "🇸🇦 العربية (السعودية)",
@@ -67,12 +68,30 @@ class LanguageSelectPage(Adw.Bin):
             "vi_VN.UTF-8": "🇻🇳 Tiếng Việt (Việt Nam)",
         }
 
+        # lista języków z obrazu (SUPPORTED / locale -a), nazwy tylko dla znanych
+        self.languages = {
+            code: self.language_names.get(code, code)
+            for code in LocaleUtils.get_supported_locales()
+        }
+
         self.combo = Gtk.ComboBoxText()
         for code, name in sorted(self.languages.items()):
             self.combo.append(code, name)
         self.combo.set_active_id("en_US.UTF-8")
+        if self.combo.get_active_id() is None:
+            self.combo.set_active(0)
         box.append(self.combo)
 
+        # dodatkowe locale do wygenerowania (opcjonalnie)
+        self.extra_entry = Gtk.Entry()
+        self.extra_entry.set_placeholder_text("Additional locales (optional), e.g. de_DE.UTF-8, fr_FR.UTF-8")
+        self.extra_entry.connect("changed", self.on_extra_changed)
+        box.append(self.extra_entry)
+
+        self.error_label = Gtk.Label()
+        self.error_label.add_css_class("error")
+        box.append(self.error_label)
+
         # przyciski
         btn_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=15)
         btn_box.set_halign(Gtk.Align.CENTER)
@@ -82,16 +101,37 @@ class LanguageSelectPage(Adw.Bin):
         btn_back.connect("clicked", self.on_back)
         btn_box.append(btn_back)
 
-        btn_next = Gtk.Button(label="Next →")
-        btn_next.add_css_class("suggested-action")
-        btn_next.connect("clicked", self.on_next)
-        btn_box.append(btn_next)
+        self.btn_next = Gtk.Button(label="Next →")
+        self.btn_next.add_css_class("suggested-action")
+        self.btn_next.connect("clicked", self.on_next)
+        btn_box.append(self.btn_next)
+
+    def _parse_extra_locales(self):
+        """Return (valid, unknown) lists from the additional locales entry"""
+        valid, unknown = [], []
+        for item in self.extra_entry.get_text().replace(",", " ").split():
+            name = LocaleUtils.normalize(item)
+            if name in self.languages:
+                valid.append(name)
+            else:
+                unknown.append(item)
+        return valid, unknown
+
+    def on_extra_changed(self, entry):
+        _, unknown = self._parse_extra_locales()
+        if unknown:
+            self.error_label.set_text(f"Unsupported locale(s): {', '.join(unknown)}")
+        else:
+            self.error_label.set_text("")
+        self.btn_next.set_sensitive(not unknown)
 
     def on_back(self, button):
         self.app.go_to("welcome")
 
     def on_next(self, button):
         selected = self.combo.get_active_id()
-        self.app.selected_language = selected
-        print(f"[Pelican Installer] Selected language: {selected}")
+        extra, _ = self._parse_extra_locales()
+        self.app.plan.language = selected
+        self.app.plan.extra_locales = [code for code in extra if code != selected]
+        print(f"[Pelican Installer] Selected language: {selected} (extra: {self.app.plan.extra_locales})")
         self.app.go_to("timezone")
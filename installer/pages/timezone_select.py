@@ -172,19 +172,27 @@ class TimezoneSelectPage(Adw.Bin):
     # -------------------------
     # Map HTML generation & load
     # -------------------------
-    def create_map_html(self):
-        markers_js = []
+    def _timezone_geojson(self):
+        """Build a single GeoJSON FeatureCollection with one point per timezone."""
+        features = []
         for timezone, coords in self.timezone_coordinates.items():
             lat, lng = coords
-            city = timezone.split('/')[-1].replace('_', ' ')
-            markers_js.append(f"""
-                L.marker([{lat}, {lng}])
-                    .addTo(map)
-                    .bindPopup('<b>{city}</b><br>{timezone}')
-                    .on('click', function(e) {{
-                        selectTimezone('{timezone}');
-                    }});
-            """)
+            features.append({
+                "type": "Feature",
+                "id": timezone,
+                "properties": {
+                    "tz": timezone,
+                    "city": timezone.split('/')[-1].replace('_', ' '),
+                },
+                # GeoJSON uses [lng, lat] order
+                "geometry": {"type": "Point", "coordinates": [lng, lat]},
+            })
+        return {"type": "FeatureCollection", "features": features}
+
+    def create_map_html(self):
+        # All zones go into one canvas-rendered GeoJSON layer inside a cluster
+        # group; markersById gives O(1) lookup when highlighting a selection.
+        geojson = json.dumps(self._timezone_geojson())
 
         html_content = f"""
 <!DOCTYPE html>
@@ -194,6 +202,8 @@ class TimezoneSelectPage(Adw.Bin):
 <meta name="viewport" content="width=device-width, initial-scale=1">
 <title>Timezone Map</title>
 <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/leaflet/1.9.4/leaflet.min.css" />
+<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/leaflet.markercluster/1.5.3/MarkerCluster.min.css" />
+<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/leaflet.markercluster/1.5.3/MarkerCluster.Default.min.css" />
 <style>
     html,body,#map {{ height:100%; margin:0; padding:0; }}
     #map {{ width:100%; }}
@@ -202,12 +212,20 @@ class TimezoneSelectPage(Adw.Bin):
 <body>
 <div id="map"></div>
 <script src="https://cdnjs.cloudflare.com/ajax/libs/leaflet/1.9.4/leaflet.js"></script>
+<script src="https://cdnjs.cloudflare.com/ajax/libs/leaflet.markercluster/1.5.3/leaflet.markercluster.js"></script>
 <script>
-var map = L.map('map').setView([20, 0], 2);
+var map = L.map('map', {{ preferCanvas: true }}).setView([20, 0], 2);
 L.tileLayer('https://{{s}}.tile.openstreetmap.org/{{z}}/{{x}}/{{y}}.png', {{
     attribution: '© OpenStreetMap contributors'
 }}).addTo(map);
 
+var DEFAULT_STYLE = {{ radius: 6, color: '#3584e4', weight: 1, fillOpacity: 0.7 }};
+var SELECTED_STYLE = {{ radius: 9, color: '#e01b24', weight: 2, fillOpacity: 1.0 }};
+
+var timezoneData = {geojson};
+var markersById = {{}};
+var highlighted = null;
+
 function selectTimezone(tz) {{
     try {{
         window.webkit.messageHandlers.timezoneSelected.postMessage(tz);
@@ -216,17 +234,43 @@ function selectTimezone(tz) {{
     }}
 }}
 
-{''.join(markers_js)}
+function highlightTimezone(tz) {{
+    if (highlighted) {{
+        highlighted.setStyle(DEFAULT_STYLE);
+        highlighted = null;
+    }}
+    var marker = markersById[tz];
+    if (!marker) return;
+    marker.setStyle(SELECTED_STYLE);
+    highlighted = marker;
+    clusters.zoomToShowLayer(marker, function() {{ marker.openPopup(); }});
+}}
+
+var clusters = L.markerClusterGroup({{ chunkedLoading: true, showCoverageOnHover: false }});
+L.geoJSON(timezoneData, {{
+    pointToLayer: function(feature, latlng) {{
+        return L.circleMarker(latlng, DEFAULT_STYLE);
+    }},
+    onEachFeature: function(feature, layer) {{
+        var p = feature.properties;
+        markersById[p.tz] = layer;
+        layer.bindPopup('<b>' + p.city + '</b><br>' + p.tz);
+        layer.on('click', function(e) {{
+            L.DomEvent.stopPropagation(e);
+            selectTimezone(p.tz);
+        }});
+    }}
+}}).eachLayer(function(layer) {{ clusters.addLayer(layer); }});
+map.addLayer(clusters);
 
 // approximate click -> choose nearest marker
-var timezoneCoords = {json.dumps(self.timezone_coordinates)};
 map.on('click', function(e) {{
     var lat = e.latlng.lat, lng = e.latlng.lng;
     var closest = null, minD = Infinity;
-    Object.entries(timezoneCoords).forEach(function(kv) {{
-        var tz = kv[0], c = kv[1];
-        var d = Math.pow(lat - c[0],2) + Math.pow(lng - c[1],2);
-        if (d < minD) {{ minD = d; closest = tz; }}
+    timezoneData.features.forEach(function(f) {{
+        var c = f.geometry.coordinates;
+        var d = Math.pow(lat - c[1],2) + Math.pow(lng - c[0],2);
+        if (d < minD) {{ minD = d; closest = f.id; }}
     }});
     if (closest) selectTimezone(closest);
 }});
@@ -422,14 +466,8 @@ map.on('click', function(e) {{
         return False
 
     def highlight_timezone_on_map(self, timezone):
-        js = f"""
-        map.eachLayer(function(layer) {{
-            if (layer instanceof L.Marker) {{
-                layer.setOpacity(0.7);
-            }}
-        }});
-        console.log('highlight {timezone}');
-        """
+        # markersById lookup on the JS side - no layer walk per selection
+        js = f"highlightTimezone({json.dumps(timezone)});"
         try:
             if hasattr(self.web_view, "run_javascript"):
                 self.web_view.run_javascript(js, None, lambda w, r: None, None)
@@ -467,9 +505,8 @@ map.on('click', function(e) {{
 
     def on_continue_clicked(self, button):
         if self.selected_timezone:
-            # store into app state, but do not write files
-            if hasattr(self.app, "selected_timezone"):
-                self.app.selected_timezone = self.selected_timezone
+            # store into the install plan, but do not write files
+            self.app.plan.timezone = self.selected_timezone
             print(f"[TimezoneSelectPage] Proceeding with timezone: {self.selected_timezone}")
             self.app.go_to("keyboard")
         else:
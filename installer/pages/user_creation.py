@@ -4,13 +4,20 @@ import re
 
 gi.require_version("Gtk", "4.0")
 gi.require_version("Adw", "1")
-from gi.repository import Gtk, Adw, GObject
+from gi.repository import Gtk, Adw, GObject, GLib
+from ..password_hash import PasswordHasher
+from ..password_strength import PasswordStrength
+from ..install_plan import UserPlan, InstallPlanError
 
 
 class UserAccountPage(Adw.Bin):
     def __init__(self, app):
         super().__init__()
         self.app = app
+        self.hasher = PasswordHasher()
+        self.strength = PasswordStrength()
+        self._hash_future = None
+        self._hashed_password = None
         self.set_child(self._build_ui())
 
     # -------------------------
@@ -139,34 +146,18 @@ class UserAccountPage(Adw.Bin):
 
         # Enable button only if all valid
         if fullname and username and password and confirm and strength != "Weak":
+            self._start_hashing(password)
             self.btn_proceed.set_sensitive(True)
         else:
             self._disable_continue()
 
     def _update_strength(self, password):
-        """Simple strength estimator"""
-        if not password:
+        """Dictionary and pattern based strength estimate (cached per password)"""
+        level, _ = self.strength.estimate(password)
+        if level == "None":
             self.strength_label.set_text("Password strength: —")
-            return "None"
-
-        score = 0
-        if len(password) >= 8:
-            score += 1
-        if re.search(r"[A-Z]", password):
-            score += 1
-        if re.search(r"[0-9]", password):
-            score += 1
-        if re.search(r"[^A-Za-z0-9]", password):
-            score += 1
-
-        if score <= 1:
-            level = "Weak"
-        elif score == 2:
-            level = "Medium"
         else:
-            level = "Strong"
-
-        self.strength_label.set_text(f"Password strength: {level}")
+            self.strength_label.set_text(f"Password strength: {level}")
         return level
 
     def _set_error(self, message):
@@ -174,6 +165,24 @@ class UserAccountPage(Adw.Bin):
 
     def _disable_continue(self):
         self.btn_proceed.set_sensitive(False)
+        self._cancel_hashing()
+
+    # -------------------------
+    # Background password hashing
+    # -------------------------
+    def _start_hashing(self, password):
+        """Start the KDF as soon as the password validates, so it overlaps with the user clicking Install"""
+        if self._hash_future is not None and self._hashed_password == password:
+            return
+        self._cancel_hashing()
+        self._hashed_password = password
+        self._hash_future = self.hasher.submit(password)
+
+    def _cancel_hashing(self):
+        if self._hash_future is not None:
+            self._hash_future.cancel()
+        self._hash_future = None
+        self._hashed_password = None
 
     # -------------------------
     # Navigation
@@ -183,14 +192,53 @@ class UserAccountPage(Adw.Bin):
             self.app.go_to("disk_managent")
 
     def _on_proceed(self, button):
-        user_data = {
-            "full_name": self.entry_fullname.get_text().strip(),
-            "username": self.entry_username.get_text().strip(),
-            "password": '*' * len(self.entry_password.get_text()),
-        }
+        future = self._hash_future
+        if future is None:
+            return
+
+        if not future.done():
+            # Hash still running - finish once the worker is done
+            self.btn_proceed.set_sensitive(False)
+            self.btn_proceed.set_label("Preparing…")
+            future.add_done_callback(lambda f: GLib.idle_add(self._finish_proceed, f))
+            return
+
+        self._finish_proceed(future)
+
+    def _finish_proceed(self, future):
+        self.btn_proceed.set_label("Install")
+        if future is not self._hash_future or future.cancelled():
+            # inputs changed while hashing
+            return False
+
+        try:
+            password_hash = future.result()
+        except Exception as e:
+            self._set_error(f"Failed to hash password: {e}")
+            self._disable_continue()
+            return False
+
+        user = UserPlan(
+            username=self.entry_username.get_text().strip(),
+            full_name=self.entry_fullname.get_text().strip(),
+            password_hash=password_hash,
+        )
+
+        # Plaintext is no longer needed anywhere
+        self._hashed_password = None
+        self.entry_password.set_text("")
+        self.entry_confirm.set_text("")
+
+        print(f"[UserAccountPage] User configuration: {user.username} ({self.hasher.method})")
+        self.app.plan.user = user
+        if self.app.plan.installation_mode is None:
+            self.app.plan.installation_mode = "manual"
 
-        print("[UserAccountPage] User configuration:", user_data)
-        setattr(self.app, "user_account_data", user_data)
-        setattr(self.app, "installation_mode", "manual")
+        try:
+            self.app.plan.validate()
+        except InstallPlanError as e:
+            self._set_error(str(e))
+            return False
 
         self.app.on_begin_installation()
+        return False
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+
+import ctypes
+import ctypes.util
+import os
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PasswordHasher:
+    """
+    crypt(3) password hashing for the target's /etc/shadow.
+
+    Uses libxcrypt through ctypes so yescrypt is available. A libcrypt
+    without crypt_gensalt_rn (plain glibc) still provides crypt_r, which is
+    enough for SHA-512-crypt with a salt generated here. Hashing runs on a
+    single worker thread so the KDF can start as soon as the password
+    fields validate.
+    """
+
+    METHODS = {
+        # method -> (crypt prefix, default cost, (min cost, max cost))
+        "yescrypt": ("$y$", 5, (1, 11)),
+        "sha512": ("$6$", 656000, (1000, 999999999)),
+    }
+    SALT_CHARS = "./0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+    DEFAULT_METHOD = "yescrypt"
+
+    # sizeof(struct crypt_data): 32768 in libxcrypt, 131232 in glibc; keep some slack
+    _CRYPT_DATA_SIZE = 262144
+    _SETTING_SIZE = 256
+
+    def __init__(self, method=None, cost=None):
+        """
+        Args:
+            method: 'yescrypt' or 'sha512'; defaults to $PELICAN_PASSWORD_HASH
+                or yescrypt
+            cost: yescrypt cost factor (1-11) or SHA-512 rounds; defaults to
+                $PELICAN_PASSWORD_COST or the method's default
+        """
+        method = method or os.environ.get("PELICAN_PASSWORD_HASH") or self.DEFAULT_METHOD
+        if method not in self.METHODS:
+            raise ValueError(f"Unsupported password hash method: {method}")
+
+        self.method = method
+        self.cost = self._cost(method, cost)
+        self._libcrypt, self._gensalt = self._load_libcrypt()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pelican-hash")
+
+    @classmethod
+    def _cost(cls, method, cost):
+        """``cost`` (or $PELICAN_PASSWORD_COST) clamped to the method's range"""
+        _, default, (low, high) = cls.METHODS[method]
+        if cost is None:
+            env_cost = os.environ.get("PELICAN_PASSWORD_COST")
+            if not env_cost:
+                return default
+            try:
+                cost = int(env_cost)
+            except ValueError:
+                print(f"[PasswordHasher] Invalid PELICAN_PASSWORD_COST {env_cost!r}, using {default}")
+                return default
+        clamped = min(max(cost, low), high)
+        if clamped != cost:
+            print(f"[PasswordHasher] {method} cost {cost} is outside {low}-{high}, using {clamped}")
+        return clamped
+
+    @staticmethod
+    def _load_libcrypt():
+        """(library, has crypt_gensalt_rn) or (None, False)"""
+        name = ctypes.util.find_library("crypt")
+        if not name:
+            return None, False
+        try:
+            lib = ctypes.CDLL(name)
+            lib.crypt_r.restype = ctypes.c_char_p
+            lib.crypt_r.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_void_p]
+        except (OSError, AttributeError):
+            return None, False
+        try:
+            lib.crypt_gensalt_rn.restype = ctypes.c_char_p
+            lib.crypt_gensalt_rn.argtypes = [
+                ctypes.c_char_p, ctypes.c_ulong, ctypes.c_char_p, ctypes.c_int,
+                ctypes.c_char_p, ctypes.c_int,
+            ]
+            return lib, True
+        except AttributeError:
+            # glibc-only libcrypt: crypt_r without crypt_gensalt_rn
+            return lib, False
+
+    def _setting(self):
+        """Hash setting (prefix, cost and a fresh salt) for crypt_r"""
+        prefix, _, _ = self.METHODS[self.method]
+        if self._gensalt:
+            setting_buf = ctypes.create_string_buffer(self._SETTING_SIZE)
+            # rbytes=NULL lets libxcrypt read the salt from the OS RNG
+            setting = self._libcrypt.crypt_gensalt_rn(
+                prefix.encode(), self.cost, None, 0, setting_buf, self._SETTING_SIZE
+            )
+            if not setting:
+                raise ValueError(f"crypt_gensalt failed for {self.method} (cost {self.cost})")
+            return setting
+        if self.method != "sha512":
+            raise RuntimeError(f"libxcrypt is required for {self.method} hashes")
+        salt = "".join(secrets.choice(self.SALT_CHARS) for _ in range(16))
+        return f"$6$rounds={self.cost}${salt}$".encode()
+
+    def hash(self, password):
+        """Hash ``password`` synchronously and return the crypt(3) string."""
+        if self._libcrypt is None:
+            raise RuntimeError("libcrypt (libxcrypt) is required to hash passwords")
+
+        setting = self._setting()
+        data = ctypes.create_string_buffer(self._CRYPT_DATA_SIZE)
+        try:
+            result = self._libcrypt.crypt_r(password.encode(), setting, data)
+            if not result or result.startswith(b"*"):
+                raise ValueError(f"crypt failed for {self.method}")
+            return result.decode()
+        finally:
+            ctypes.memset(data, 0, self._CRYPT_DATA_SIZE)
+
+    def submit(self, password):
+        """Start hashing on the worker thread and return a Future."""
+        return self._executor.submit(self.hash, password)
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+
+import hashlib
+import math
+import os
+import re
+import struct
+import sys
+
+
+class BloomFilter:
+    """
+    Compact read-only set membership test for the common password list.
+
+    File layout: b"PBF1", uint32 bit count, uint8 hash count, then the bit
+    array. One blake2b digest per lookup is split into all k bit positions.
+    """
+
+    MAGIC = b"PBF1"
+    HEADER = struct.Struct("<4sIB")
+
+    def __init__(self, bits, num_bits, num_hashes):
+        self.bits = bits
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, num_bits, num_hashes = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC:
+            raise ValueError(f"Not a password filter: {path}")
+        return cls(data[cls.HEADER.size:], num_bits, num_hashes)
+
+    @classmethod
+    def build(cls, words, fp_rate=0.001):
+        words = {w.strip().lower() for w in words if w.strip()}
+        n = max(len(words), 1)
+        num_bits = max(64, int(math.ceil(-n * math.log(fp_rate) / (math.log(2) ** 2))))
+        num_hashes = max(1, min(16, int(round(num_bits / n * math.log(2)))))
+
+        bits = bytearray((num_bits + 7) // 8)
+        bloom = cls(bits, num_bits, num_hashes)
+        for word in words:
+            for pos in bloom._positions(word):
+                bits[pos >> 3] |= 1 << (pos & 7)
+        bloom.bits = bytes(bits)
+        return bloom
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.num_bits, self.num_hashes))
+            f.write(self.bits)
+
+    def _positions(self, word):
+        digest = hashlib.blake2b(word.encode(), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        # Kirsch-Mitzenmacher double hashing
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, word):
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(word))
+
+
+class PasswordStrength:
+    """
+    zxcvbn-style password strength estimate.
+
+    Looks for common passwords (after undoing l33t substitutions and
+    stripping the usual digit/symbol decorations), keyboard walks, repeats
+    and sequences, then scores what is left by a rough guess count.
+    """
+
+    FILTER_PATH = os.path.join(os.path.dirname(__file__), "data", "common_passwords.bloom")
+
+    KEYBOARD_ROWS = ("1234567890", "qwertyuiop", "asdfghjkl", "zxcvbnm", "qwertzuiop", "azertyuiop", "yxcvbnm")
+    LEET = str.maketrans({"@": "a", "4": "a", "8": "b", "3": "e", "6": "g", "1": "l", "!": "i",
+                          "0": "o", "$": "s", "5": "s", "7": "t", "+": "t", "2": "z"})
+    DECORATION = re.compile(r"^[\d\W_]*(.*?)[\d\W_]*$")
+    REPEAT = re.compile(r"(.+?)\1+")
+    # the whole password is one unit repeated (hunter2hunter2)
+    WHOLE_REPEAT = re.compile(r"^(.+?)\1+$", re.DOTALL)
+
+    MIN_PATTERN = 4
+
+    def __init__(self, filter_path=None):
+        try:
+            self.common = BloomFilter.load(filter_path or self.FILTER_PATH)
+        except (OSError, ValueError, struct.error) as e:
+            print(f"[PasswordStrength] Common password list unavailable: {e}")
+            self.common = None
+
+        # all forward/backward keyboard and alphabet runs of MIN_PATTERN chars
+        runs = list(self.KEYBOARD_ROWS) + ["abcdefghijklmnopqrstuvwxyz", "0123456789"]
+        self._walks = set()
+        for row in runs:
+            for text in (row, row[::-1]):
+                for i in range(len(text) - self.MIN_PATTERN + 1):
+                    self._walks.add(text[i:i + self.MIN_PATTERN])
+
+        self._last = (None, None)
+
+    def _is_common(self, password):
+        if self.common is None:
+            return False
+        lower = password.lower()
+        candidates = {lower, lower.translate(self.LEET)}
+        for word in list(candidates):
+            stripped = self.DECORATION.match(word).group(1)
+            if stripped:
+                candidates.add(stripped)
+                candidates.add(stripped.translate(self.LEET))
+        return any(c in self.common for c in candidates)
+
+    def _pattern_chars(self, password):
+        """Number of characters covered by keyboard walks, sequences or repeats."""
+        lower = password.lower()
+        covered = [False] * len(lower)
+        n = self.MIN_PATTERN
+        for i in range(len(lower) - n + 1):
+            if lower[i:i + n] in self._walks:
+                for j in range(i, i + n):
+                    covered[j] = True
+        for m in self.REPEAT.finditer(lower):
+            if m.end() - m.start() >= 3:
+                for j in range(m.start() + len(m.group(1)), m.end()):
+                    covered[j] = True
+        return sum(covered)
+
+    def estimate(self, password):
+        """
+        Return (level, guesses_log10) for ``password``.
+
+        ``level`` is one of 'None', 'Weak', 'Medium', 'Strong'.
+        """
+        if self._last[0] == password:
+            return self._last[1]
+
+        # a repeated password is scored on the repeated unit
+        unit, count = password, 1
+        match = self.WHOLE_REPEAT.match(password)
+        if match:
+            unit = match.group(1)
+            count = len(password) // len(unit)
+
+        if not password:
+            result = ("None", 0.0)
+        elif self._is_common(password) or self._is_common(unit):
+            result = ("Weak", 3.0)
+        else:
+            charset = 0
+            if re.search(r"[a-z]", unit):
+                charset += 26
+            if re.search(r"[A-Z]", unit):
+                charset += 26
+            if re.search(r"[0-9]", unit):
+                charset += 10
+            if re.search(r"[^A-Za-z0-9]", unit):
+                charset += 33
+
+            # characters inside a pattern add almost nothing
+            effective = len(unit) - self._pattern_chars(unit) * 0.8
+            guesses = max(effective, 1) * math.log10(max(charset, 10)) + math.log10(count)
+
+            if guesses < 8:
+                level = "Weak"
+            elif guesses < 12:
+                level = "Medium"
+            else:
+                level = "Strong"
+            result = (level, guesses)
+
+        self._last = (password, result)
+        return result
+
+
+def main(argv):
+    """Build the bundled filter: python -m installer.password_strength wordlist.txt [out.bloom]"""
+    if len(argv) < 2:
+        print(main.__doc__)
+        return 1
+
+    with open(argv[1], "r", errors="ignore") as f:
+        bloom = BloomFilter.build(f)
+
+    out = argv[2] if len(argv) > 2 else PasswordStrength.FILTER_PATH
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    bloom.save(out)
+    print(f"Wrote {out}: {bloom.num_bits} bits, {bloom.num_hashes} hashes, {os.path.getsize(out)} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
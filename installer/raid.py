@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+
+import os
+import subprocess
+
+from .disk_utils import DiskUtils
+
+
+class RaidLayout:
+    """Multi-disk root: btrfs native RAID profiles or an md array"""
+
+    # profile -> (backend, level, minimum disks)
+    PROFILES = {
+        "btrfs-raid0": ("btrfs", "raid0", 2),
+        "btrfs-raid1": ("btrfs", "raid1", 2),
+        "btrfs-raid10": ("btrfs", "raid10", 4),
+        "md-raid0": ("md", "raid0", 2),
+        "md-raid1": ("md", "raid1", 2),
+        "md-raid10": ("md", "raid10", 4),
+    }
+    LABELS = {
+        "btrfs-raid0": "Btrfs RAID0 (stripe, no redundancy)",
+        "btrfs-raid1": "Btrfs RAID1 (mirror)",
+        "btrfs-raid10": "Btrfs RAID10 (stripe of mirrors)",
+        "md-raid0": "md RAID0 (stripe, no redundancy)",
+        "md-raid1": "md RAID1 (mirror)",
+        "md-raid10": "md RAID10 (stripe of mirrors)",
+    }
+    MD_ARRAY = "/dev/md/pelican_root"
+    # ESP and /boot mirrored across every disk, so any of them can boot
+    ESP_ARRAY = "/dev/md/pelican_esp"
+    BOOT_ARRAY = "/dev/md/pelican_boot"
+    DEFAULT_CHUNK_KIB = 512
+
+    @classmethod
+    def check(cls, profile, disks):
+        """Raise ValueError if ``profile`` cannot be built from ``disks``"""
+        if profile not in cls.PROFILES:
+            raise ValueError(f"Unknown RAID profile: {profile}")
+        _, _, minimum = cls.PROFILES[profile]
+        if len(disks) < minimum:
+            raise ValueError(f"{cls.LABELS[profile]} needs at least {minimum} disks")
+        if len(set(disks)) != len(disks):
+            raise ValueError("The same disk was selected more than once")
+
+    @classmethod
+    def backend(cls, profile):
+        return cls.PROFILES[profile][0]
+
+    @classmethod
+    def level(cls, profile):
+        return cls.PROFILES[profile][1]
+
+    # ----------------------------
+    # btrfs
+    # ----------------------------
+    @classmethod
+    def mkfs_btrfs_cmd(cls, profile, devices):
+        """mkfs.btrfs across all members: data per profile, metadata mirrored"""
+        level = cls.level(profile)
+        metadata = "raid10" if level == "raid10" else "raid1"
+        return ['sudo', 'mkfs.btrfs', '-f', '-d', level, '-m', metadata] + list(devices)
+
+    # ----------------------------
+    # md
+    # ----------------------------
+    @staticmethod
+    def _queue_value(device, name):
+        info = DiskUtils.parse_disk_path(device)
+        if not info:
+            return 0
+        try:
+            with open(os.path.join("/sys/block", info["disk_name"], "queue", name), "r") as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return 0
+
+    @classmethod
+    def chunk_size_kib(cls, devices):
+        """
+        Chunk size for striped md levels.
+
+        512 KiB (mdadm's default) suits large sequential writes on both SSDs
+        and HDDs; members that report a larger optimal I/O size (e.g. drives
+        behind hardware RAID or with large erase blocks) get that instead,
+        rounded up to a power of two.
+        """
+        optimal = max((cls._queue_value(d, "optimal_io_size") for d in devices), default=0) // 1024
+        chunk = max(cls.DEFAULT_CHUNK_KIB, optimal)
+        return 1 << (chunk - 1).bit_length()
+
+    @classmethod
+    def create_md_array(cls, profile, devices, log=print):
+        """Create the md array and return its device path"""
+        level = cls.level(profile)
+        cmd = [
+            'sudo', 'mdadm', '--create', cls.MD_ARRAY,
+            '--run', '--metadata=1.2',
+            f'--level={level}',
+            f'--raid-devices={len(devices)}',
+            '--homehost=any',
+        ]
+        if level in ("raid0", "raid10"):
+            chunk = cls.chunk_size_kib(devices)
+            cmd.append(f'--chunk={chunk}K')
+            log(f"[RAID] md chunk size: {chunk} KiB\n")
+        cmd += list(devices)
+
+        process = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+        if process.returncode != 0:
+            raise Exception(f"Failed to create md array: {process.stderr.strip()}")
+        return cls.MD_ARRAY
+
+    @staticmethod
+    def create_boot_mirror(array, devices):
+        """
+        RAID1 of the ESP or /boot partitions of every disk.
+
+        Metadata 1.0 sits at the end of each member, so firmware and the
+        bootloader see every member as a plain FAT/ext4 filesystem.
+        """
+        cmd = [
+            'sudo', 'mdadm', '--create', array,
+            '--run', '--metadata=1.0',
+            '--level=raid1',
+            f'--raid-devices={len(devices)}',
+            '--homehost=any',
+        ] + list(devices)
+        process = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+        if process.returncode != 0:
+            raise Exception(f"Failed to create md array {array}: {process.stderr.strip()}")
+        return array
+
+    @staticmethod
+    def md_uuid(array):
+        """Array UUID in the form used by rd.md.uuid="""
+        try:
+            process = subprocess.run(
+                ['sudo', 'mdadm', '--detail', '--export', array],
+                capture_output=True, text=True, timeout=30,
+            )
+            for line in process.stdout.splitlines():
+                if line.startswith("MD_UUID="):
+                    return line.split("=", 1)[1].strip()
+        except Exception:
+            pass
+        return None
+
+    @staticmethod
+    def mdadm_conf():
+        """mdadm.conf content describing the currently assembled arrays"""
+        process = subprocess.run(
+            ['sudo', 'mdadm', '--detail', '--scan'], capture_output=True, text=True, timeout=30
+        )
+        if process.returncode != 0:
+            return None
+        return "# Created by Pelican Installer\n" + process.stdout
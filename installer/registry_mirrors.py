@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .deploy_eta import ImageManifest
+
+
+class RegistryMirrors:
+    """
+    Image reference and mirrors from registry.conf, ranked by a live probe.
+
+    registry.conf holds the image reference on its first line; every
+    further non-comment line is a mirror, either a registry host
+    (``mirror.example.com:5000``, same repository path) or a full
+    repository location (``mirror.example.com/pelican/os``).
+
+    All candidates are probed in parallel: manifest round trip for the
+    latency and the first PROBE_BYTES of the largest layer for the
+    throughput. The ranking is written as a containers-registries.conf
+    drop-in: the image fetcher pulls from the first mirror and moves on to
+    the next one in that order when a mirror cannot serve the image.
+    Only locations the probe reached over plain HTTP are marked insecure.
+    """
+
+    CONF = "/etc/pelican-installer/registry.conf"
+    REGISTRIES_CONF = "/etc/containers/registries.conf.d/50-pelican-mirrors.conf"
+    PROBE_BYTES = 2 * 1024 * 1024
+
+    def __init__(self, image_ref, mirrors=None):
+        self.image_ref = image_ref
+        self.mirrors = mirrors or []
+        self.results = []
+        self._started = False
+        self._done = threading.Event()
+
+    @classmethod
+    def load(cls, path=None):
+        """Parse registry.conf; None when it is missing or has no image reference"""
+        try:
+            with open(path or cls.CONF, "r") as f:
+                lines = [line.strip() for line in f]
+        except OSError:
+            return None
+        lines = [line for line in lines if line and not line.startswith("#")]
+        if not lines:
+            return None
+        return cls(lines[0], lines[1:])
+
+    # ----------------------------
+    # References
+    # ----------------------------
+    @property
+    def prefix(self):
+        """Repository the mirrors stand in for, as registries.conf spells it"""
+        host, repository, _ = ImageManifest.parse_ref(self.image_ref)
+        if host == "registry-1.docker.io":
+            host = "docker.io"
+        return f"{host}/{repository}"
+
+    def _suffix(self):
+        _, _, reference = ImageManifest.parse_ref(self.image_ref)
+        return f"@{reference}" if ":" in reference else f":{reference}"
+
+    def location(self, mirror):
+        """Repository location of ``mirror`` (a bare host keeps the image's repository path)"""
+        if "/" in mirror:
+            return mirror.rstrip("/")
+        _, repository, _ = ImageManifest.parse_ref(self.image_ref)
+        return f"{mirror}/{repository}"
+
+    # ----------------------------
+    # Probing
+    # ----------------------------
+    def probe_one(self, location):
+        result = {"location": location}
+        try:
+            manifest = ImageManifest(f"{location}{self._suffix()}")
+            start = time.perf_counter()
+            manifest.fetch()
+            latency = time.perf_counter() - start
+            result["insecure"] = manifest._base.startswith("http://")
+            size, seconds = manifest.sample_blob(self.PROBE_BYTES)
+        except Exception as e:
+            # a mirror serving unexpected JSON must not take the other probes down
+            result["error"] = f"{type(e).__name__}: {e}"
+            return result
+
+        rate = size / max(seconds, 1e-6)
+        result.update(
+            latency_ms=round(latency * 1000, 1),
+            mb_s=round(rate / 1e6, 2),
+            # time to fetch the whole image from this location alone
+            estimate_s=round(latency + manifest.compressed_bytes / rate, 2) if size else None,
+        )
+        return result
+
+    def probe_all(self):
+        """Probe the primary location and every mirror concurrently; rank the reachable ones"""
+        candidates = [self.prefix] + [self.location(m) for m in self.mirrors]
+        try:
+            with ThreadPoolExecutor(max_workers=len(candidates)) as pool:
+                results = list(pool.map(self.probe_one, candidates))
+            self.results = sorted(results, key=lambda r: (r.get("estimate_s") is None, r.get("estimate_s") or 0))
+        finally:
+            self._done.set()
+        return self.results
+
+    def start(self):
+        """Probe in the background (started at application startup)"""
+        self._started = True
+        threading.Thread(target=self.probe_all, name="mirror-probe", daemon=True).start()
+
+    @property
+    def finished(self):
+        return self._done.is_set()
+
+    def ranked(self, timeout=None):
+        """
+        Reachable locations, fastest first; waits up to ``timeout`` for the probe.
+
+        Empty both when nothing answered and when the probe is still
+        running after ``timeout`` (``finished`` tells the two apart).
+        """
+        if not self._started:
+            self._started = True
+            self.probe_all()
+        self._done.wait(timeout)
+        return [r["location"] for r in self.results if r.get("estimate_s") is not None]
+
+    # ----------------------------
+    # containers-registries.conf
+    # ----------------------------
+    def registries_conf(self, ranked):
+        """
+        Drop-in mapping the image repository to ``ranked`` mirrors.
+
+        The primary location may itself be listed as a mirror, which is
+        how it is tried first when it was measured fastest.
+        """
+        insecure = {r["location"] for r in self.results if r.get("insecure")}
+        lines = [
+            "# Created by Pelican Installer",
+            "[[registry]]",
+            f'prefix = "{self.prefix}"',
+            f'location = "{self.prefix}"',
+        ]
+        if self.prefix in insecure:
+            lines.append("insecure = true")
+        for location in ranked:
+            lines += ["", "[[registry.mirror]]", f'location = "{location}"']
+            if location in insecure:
+                lines.append("insecure = true")
+        return "\n".join(lines) + "\n"
+
+    def write(self, ranked, path=None):
+        path = path or self.REGISTRIES_CONF
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.registries_conf(ranked))
+        os.replace(tmp_path, path)
+        return path
+
+    def remove(self, path=None):
+        """Drop the drop-in left by an earlier run; True when one was removed"""
+        try:
+            os.remove(path or self.REGISTRIES_CONF)
+            return True
+        except FileNotFoundError:
+            return False
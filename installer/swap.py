@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+import math
+import os
+import subprocess
+
+from .disk_utils import DiskUtils
+from .heavy_command import HeavyCommand
+
+
+class SwapPlanner:
+    """
+    Choose swap from RAM size, root filesystem and whether hibernation is wanted.
+
+    * hibernation (or an existing swap partition) -> swap partition,
+      sized RAM + sqrt(RAM) so a full image always fits
+    * small RAM, a root that cannot hold a swapfile, or a root disk that
+      is a poor place for swap (an HDD seeks on every page-in, eMMC/SD/USB
+      flash wears out) -> zram via zram-generator
+    * otherwise -> NoCOW swapfile in its own Btrfs subvolume
+    """
+
+    MODES = {
+        "auto": "Automatic",
+        "hibernate": "Automatic with hibernation",
+        "none": "No swap",
+    }
+
+    ZRAM_MAX_RAM_MIB = 8 * 1024
+    ZRAM_MAX_MIB = 8 * 1024
+    SWAPFILE_MIN_MIB = 2 * 1024
+    SWAPFILE_MAX_MIB = 8 * 1024
+    SWAPFILE_PATH = "/var/swap/swapfile"
+
+    @staticmethod
+    def memory_mib():
+        try:
+            with open("/proc/meminfo", "r") as f:
+                for line in f:
+                    if line.startswith("MemTotal:"):
+                        return int(line.split()[1]) // 1024
+        except (OSError, ValueError, IndexError):
+            pass
+        return 4096
+
+    @staticmethod
+    def disk_class(device):
+        """'hdd', 'flash' (eMMC, SD card, USB stick) or 'ssd' for the disk holding ``device``"""
+        info = DiskUtils.parse_disk_path(device) if device else None
+        if not info:
+            return "ssd"
+        sys_path = os.path.join("/sys/block", info["disk_name"])
+        if info["disk_type"] == "mmc" or "/usb" in os.path.realpath(sys_path):
+            return "flash"
+        try:
+            with open(os.path.join(sys_path, "queue", "rotational"), "r") as f:
+                return "hdd" if f.read().strip() == "1" else "ssd"
+        except OSError:
+            return "ssd"
+
+    @staticmethod
+    def hibernation_size_mib(ram_mib):
+        """RAM + sqrt(RAM), rounded up to whole GiB"""
+        ram_gib = ram_mib / 1024
+        return math.ceil(ram_gib + math.sqrt(ram_gib)) * 1024
+
+    @classmethod
+    def decide(cls, mode, ram_mib, root_fstype, disk_class="ssd", swap_partition=None, cpus=None):
+        """
+        Return dict(kind, size_mib, algorithm) for the given situation.
+
+        ``disk_class`` is disk_class() of the root disk; ``kind`` is one of
+        'none', 'zram', 'swapfile', 'partition'.
+        """
+        if mode == "none":
+            return {"kind": "none", "size_mib": 0, "algorithm": ""}
+        if swap_partition is not None or mode == "hibernate":
+            return {"kind": "partition", "size_mib": cls.hibernation_size_mib(ram_mib), "algorithm": ""}
+
+        if ram_mib <= cls.ZRAM_MAX_RAM_MIB or root_fstype != "btrfs" or disk_class != "ssd":
+            # up to 4 GiB the whole RAM size, then half of it
+            size = ram_mib if ram_mib <= 4096 else ram_mib // 2
+            cpus = cpus or os.cpu_count() or 1
+            # lz4 costs far less CPU when there are few cores to spare
+            algorithm = "lz4" if cpus <= 2 else "zstd"
+            return {"kind": "zram", "size_mib": min(size, cls.ZRAM_MAX_MIB), "algorithm": algorithm}
+
+        size = min(max(ram_mib // 4, cls.SWAPFILE_MIN_MIB), cls.SWAPFILE_MAX_MIB)
+        return {"kind": "swapfile", "size_mib": size, "algorithm": ""}
+
+    @staticmethod
+    def zram_config(size_mib, algorithm):
+        return (
+            "# Created by Pelican Installer\n"
+            "[zram0]\n"
+            f"zram-size = min(ram, {size_mib})\n"
+            f"compression-algorithm = {algorithm}\n"
+            "swap-priority = 100\n"
+        )
+
+    @staticmethod
+    def create_swapfile(path, size_mib):
+        """
+        Create a NoCOW, fully allocated swapfile on Btrfs.
+
+        Uses ``btrfs filesystem mkswapfile`` where available and the manual
+        chattr +C / fallocate / mkswap sequence otherwise.
+        """
+        if os.path.exists(path):
+            return False
+
+        process = HeavyCommand.run(
+            ['sudo', 'btrfs', 'filesystem', 'mkswapfile', '--size', f'{size_mib}m', path],
+            capture_output=True, text=True, timeout=300,
+        )
+        if process.returncode == 0:
+            return True
+
+        for cmd in (
+            ['sudo', 'truncate', '-s', '0', path],
+            ['sudo', 'chattr', '+C', path],
+            ['sudo', 'fallocate', '-l', f'{size_mib}M', path],
+            ['sudo', 'chmod', '600', path],
+            ['sudo', 'mkswap', path],
+        ):
+            subprocess.run(cmd, capture_output=True, text=True, timeout=300, check=True)
+        return True
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import time
+
+from .xkb_layouts import XkbLayoutIndex
+
+
+class SystemConfigWriter:
+    """
+    Write the installer choices straight into a target ``/etc``.
+
+    Everything is done with plain file writes (no chroot, systemd-firstboot
+    or useradd), so the whole stage is a handful of small writes and can be
+    pointed at any directory tree.
+    """
+
+    KBD_MODEL_MAP = "usr/share/systemd/kbd-model-map"
+    FIRST_UID = 1000
+    LAST_UID = 60000
+    USER_GROUPS = ("wheel",)
+
+    def __init__(self, root, home_root=None):
+        """
+        Args:
+            root: Root of the target deployment (the directory containing etc/)
+            home_root: Directory where home directories are created; defaults
+                to <root>/home
+        """
+        self.root = root
+        self.etc = os.path.join(root, "etc")
+        self.home_root = home_root or os.path.join(root, "home")
+
+    # ----------------------------
+    # Helpers
+    # ----------------------------
+    def _path(self, *parts):
+        return os.path.join(self.etc, *parts)
+
+    def _write(self, path, content, mode=0o644):
+        """Atomically replace ``path`` with ``content``"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.pelican-tmp"
+        with open(tmp_path, "w") as f:
+            f.write(content)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+
+    def _read_lines(self, name):
+        try:
+            with open(self._path(name), "r") as f:
+                return f.read().splitlines()
+        except FileNotFoundError:
+            return []
+
+    def _read_lib_lines(self, name):
+        """System accounts kept in /usr/lib by nss-altfiles images"""
+        try:
+            with open(os.path.join(self.root, "usr", "lib", name), "r") as f:
+                return f.read().splitlines()
+        except FileNotFoundError:
+            return []
+
+    @staticmethod
+    def _ids(*tables):
+        return {int(f[2]) for table in tables for f in (l.split(":") for l in table) if len(f) > 2 and f[2].isdigit()}
+
+    def console_keymap(self, xkb_layout, xkb_variant=""):
+        """
+        Console keymap for an XKB layout, from systemd's kbd-model-map.
+
+        Same matching as localed: an entry with the same layout and variant,
+        else one for the layout without a variant. None when the layout has
+        no console counterpart.
+        """
+        fallback = None
+        for path in (os.path.join(self.root, self.KBD_MODEL_MAP), os.path.join("/", self.KBD_MODEL_MAP)):
+            try:
+                with open(path, "r") as f:
+                    lines = f.read().splitlines()
+            except OSError:
+                continue
+            for line in lines:
+                fields = line.split()
+                if len(fields) < 4 or fields[0].startswith("#"):
+                    continue
+                keymap, layouts, variants = fields[0], fields[1].split(","), fields[3].split(",")
+                if layouts[0] != xkb_layout:
+                    continue
+                variant = "" if variants[0] == "-" else variants[0]
+                if variant == xkb_variant:
+                    return keymap
+                if not variant and fallback is None:
+                    fallback = keymap
+            break
+        return fallback
+
+    # ----------------------------
+    # Individual files
+    # ----------------------------
+    def write_locale(self, language):
+        self._write(self._path("locale.conf"), f"LANG={language}\n")
+
+    def write_timezone(self, timezone):
+        zoneinfo = os.path.join("/usr/share/zoneinfo", timezone)
+        link = self._path("localtime")
+        tmp_link = f"{link}.pelican-tmp"
+        if os.path.lexists(tmp_link):
+            os.unlink(tmp_link)
+        os.makedirs(self.etc, exist_ok=True)
+        # Relative link so it resolves both in the target and from the live system
+        os.symlink(os.path.join("..", zoneinfo.lstrip("/")), tmp_link)
+        os.replace(tmp_link, link)
+
+    def write_keymap(self, layout):
+        xkb_layout, xkb_variant = XkbLayoutIndex.split_id(layout)
+
+        vconsole = [f"XKBLAYOUT={xkb_layout}"]
+        keymap = self.console_keymap(xkb_layout, xkb_variant)
+        if keymap:
+            vconsole.insert(0, f"KEYMAP={keymap}")
+        if xkb_variant:
+            vconsole.append(f"XKBVARIANT={xkb_variant}")
+        self._write(self._path("vconsole.conf"), "\n".join(vconsole) + "\n")
+
+        x11 = [
+            "# Written by Pelican Installer",
+            'Section "InputClass"',
+            '        Identifier "system-keyboard"',
+            '        MatchIsKeyboard "on"',
+            f'        Option "XkbLayout" "{xkb_layout}"',
+        ]
+        if xkb_variant:
+            x11.append(f'        Option "XkbVariant" "{xkb_variant}"')
+        x11.append("EndSection")
+        self._write(self._path("X11", "xorg.conf.d", "00-keyboard.conf"), "\n".join(x11) + "\n")
+
+    def write_fstab(self, fstab_source):
+        with open(fstab_source, "r") as f:
+            content = f.read()
+        if not content.endswith("\n"):
+            content += "\n"
+        self._write(self._path("fstab"), content)
+
+    def write_crypttab(self, crypttab_source):
+        with open(crypttab_source, "r") as f:
+            content = f.read()
+        self._write(self._path("crypttab"), content, 0o600)
+
+    def write_zram_config(self, zram_conf_source):
+        with open(zram_conf_source, "r") as f:
+            content = f.read()
+        self._write(self._path("systemd", "zram-generator.conf"), content)
+
+    def write_mdadm_conf(self, mdadm_conf_source):
+        with open(mdadm_conf_source, "r") as f:
+            content = f.read()
+        self._write(self._path("mdadm.conf"), content)
+
+    def add_user(self, username, full_name="", password_hash=None, groups=None, log=print):
+        """
+        Add a user with its own primary group to passwd/group/shadow.
+
+        Args:
+            username: Login name (already validated)
+            full_name: GECOS field
+            password_hash: crypt(3) hash; the account is locked when missing
+            groups: Supplementary groups the user is appended to; a group
+                only in usr/lib/group is copied to etc/group first, a missing
+                one is logged
+
+        Returns:
+            (uid, gid) of the created user
+        """
+        passwd = self._read_lines("passwd")
+        group = self._read_lines("group")
+        shadow = self._read_lines("shadow")
+        gshadow = self._read_lines("gshadow")
+        lib_passwd = self._read_lib_lines("passwd")
+        lib_group = self._read_lib_lines("group")
+
+        if any(line.split(":", 1)[0] == username for line in passwd + lib_passwd):
+            raise ValueError(f"User {username} already exists in target passwd")
+
+        used_uids = self._ids(passwd, lib_passwd)
+        used_gids = self._ids(group, lib_group)
+        uid = next(
+            (i for i in range(self.FIRST_UID, self.LAST_UID) if i not in used_uids and i not in used_gids),
+            None,
+        )
+        if uid is None:
+            raise ValueError("No free UID/GID available in target")
+        gid = uid
+
+        gecos = full_name.replace(":", " ").replace("\n", " ")
+        home = f"/home/{username}"
+        passwd.append(f"{username}:x:{uid}:{gid}:{gecos}:{home}:/bin/bash")
+
+        extra = set(self.USER_GROUPS if groups is None else groups)
+        local_names = {line.split(":", 1)[0] for line in group}
+        lib_lines = {line.split(":", 1)[0]: line for line in lib_group}
+        for name in sorted(extra - local_names):
+            if name in lib_lines:
+                # etc/group overrides usr/lib/group, so the member list must live in etc
+                group.append(lib_lines[name])
+                if gshadow and not any(line.split(":", 1)[0] == name for line in gshadow):
+                    gshadow.append(f"{name}:!::")
+            else:
+                log(f"[WARNING] Group {name} not found in the target, {username} is not added to it\n")
+        group = [self._add_member(line, username, extra) for line in group]
+        group.append(f"{username}:x:{gid}:")
+        if gshadow:
+            gshadow = [self._add_member(line, username, extra) for line in gshadow]
+            gshadow.append(f"{username}:!::")
+
+        last_change = int(time.time() // 86400)
+        shadow.append(f"{username}:{password_hash or '!'}:{last_change}:0:99999:7:::")
+
+        self._write(self._path("passwd"), "\n".join(passwd) + "\n", 0o644)
+        self._write(self._path("group"), "\n".join(group) + "\n", 0o644)
+        self._write(self._path("shadow"), "\n".join(shadow) + "\n", 0o000)
+        if gshadow:
+            self._write(self._path("gshadow"), "\n".join(gshadow) + "\n", 0o000)
+
+        self._create_home(username, uid, gid)
+        return uid, gid
+
+    @staticmethod
+    def _add_member(line, username, groups, member_field=3):
+        fields = line.split(":")
+        if len(fields) <= member_field or fields[0] not in groups:
+            return line
+        members = [m for m in fields[member_field].split(",") if m]
+        if username not in members:
+            members.append(username)
+        fields[member_field] = ",".join(members)
+        return ":".join(fields)
+
+    def _create_home(self, username, uid, gid):
+        home = os.path.join(self.home_root, username)
+        skel = self._path("skel")
+        if os.path.isdir(skel) and not os.path.exists(home):
+            shutil.copytree(skel, home, symlinks=True)
+        else:
+            os.makedirs(home, exist_ok=True)
+
+        for dirpath, dirnames, filenames in os.walk(home):
+            for name in [dirpath] + [os.path.join(dirpath, n) for n in dirnames + filenames]:
+                try:
+                    os.lchown(name, uid, gid)
+                except PermissionError:
+                    pass
+        os.chmod(home, 0o700)
+
+    # ----------------------------
+    # Single pass
+    # ----------------------------
+    def apply(self, language=None, timezone=None, layout=None, fstab_source=None, crypttab_source=None,
+              mdadm_conf_source=None, zram_conf_source=None, user=None, log=print):
+        """
+        Apply every available choice in one pass.
+
+        Args:
+            user: UserPlan from the install plan
+        """
+        start = time.monotonic()
+
+        if language:
+            self.write_locale(language)
+            log(f"Wrote locale.conf (LANG={language})\n")
+        if timezone:
+            self.write_timezone(timezone)
+            log(f"Linked localtime -> {timezone}\n")
+        if layout:
+            self.write_keymap(layout)
+            log(f"Wrote keyboard configuration ({layout})\n")
+        if fstab_source and os.path.exists(fstab_source):
+            self.write_fstab(fstab_source)
+            log("Installed generated fstab\n")
+        if crypttab_source and os.path.exists(crypttab_source):
+            self.write_crypttab(crypttab_source)
+            log("Installed generated crypttab\n")
+        if mdadm_conf_source and os.path.exists(mdadm_conf_source):
+            self.write_mdadm_conf(mdadm_conf_source)
+            log("Installed generated mdadm.conf\n")
+        if zram_conf_source and os.path.exists(zram_conf_source):
+            self.write_zram_config(zram_conf_source)
+            log("Installed zram-generator configuration\n")
+        if user is not None and user.username:
+            uid, _ = self.add_user(user.username, user.full_name, user.password_hash, log=log)
+            log(f"Created user {user.username} (uid {uid})\n")
+
+        log(f"System configuration written in {(time.monotonic() - start) * 1000:.1f} ms\n")
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+import functools
+import os
+import statistics
+import sys
+import threading
+import time
+import traceback
+
+from gi.repository import GLib
+
+
+class MainLoopWatchdog:
+    """
+    Opt-in main-loop instrumentation (PELICAN_INSTRUMENT=1).
+
+    A GLib timeout beats every HEARTBEAT_MS on the main loop and records
+    how late each beat fired. A watchdog thread notices when no beat has
+    arrived for STALL_MS and takes a stack sample of the main thread via
+    sys._current_frames(), so a freeze comes with the code that caused it.
+    Instrumented page callbacks are timed on every call. Everything is
+    recorded in the install report when the application exits.
+    """
+
+    ENV = "PELICAN_INSTRUMENT"
+    STALL_ENV = "PELICAN_STALL_MS"
+    HEARTBEAT_MS = 50
+    STALL_MS = 250
+    MAX_STALLS = 50
+
+    def __init__(self, stall_ms=None):
+        self.stall_ms = stall_ms or int(os.environ.get(self.STALL_ENV, self.STALL_MS))
+        self.main_ident = threading.main_thread().ident
+        self.latencies = []
+        self.stalls = []
+        self.callbacks = {}
+        self._lock = threading.Lock()
+        self._last_beat = None
+        self._sampled = False
+        self._running = False
+        self._thread = None
+
+    @classmethod
+    def enabled(cls):
+        return os.environ.get(cls.ENV, "") not in ("", "0")
+
+    # ----------------------------
+    # Heartbeat and watchdog thread
+    # ----------------------------
+    def start(self):
+        self._running = True
+        self._last_beat = time.monotonic()
+        GLib.timeout_add(self.HEARTBEAT_MS, self._beat)
+        self._thread = threading.Thread(target=self._watch, name="ui-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+
+    def _beat(self):
+        now = time.monotonic()
+        with self._lock:
+            late_ms = (now - self._last_beat) * 1000 - self.HEARTBEAT_MS
+            self.latencies.append(max(late_ms, 0.0))
+            if self._sampled and self.stalls:
+                self.stalls[-1]["duration_ms"] = round((now - self._last_beat) * 1000, 1)
+            self._sampled = False
+            self._last_beat = now
+        return self._running
+
+    def _watch(self):
+        while self._running:
+            time.sleep(self.HEARTBEAT_MS / 2000)
+            with self._lock:
+                silent_ms = (time.monotonic() - self._last_beat) * 1000
+                if self._sampled or silent_ms < self.stall_ms or len(self.stalls) >= self.MAX_STALLS:
+                    continue
+                frame = sys._current_frames().get(self.main_ident)
+                self.stalls.append({
+                    "at": time.strftime("%H:%M:%S"),
+                    "duration_ms": round(silent_ms, 1),
+                    "stack": traceback.format_stack(frame) if frame else [],
+                })
+                self._sampled = True
+
+    # ----------------------------
+    # Callback timing
+    # ----------------------------
+    def _timed(self, name, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                with self._lock:
+                    stats = self.callbacks.setdefault(name, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+                    stats["calls"] += 1
+                    stats["total_ms"] += elapsed_ms
+                    stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+        return wrapper
+
+    def instrument(self, cls, *names):
+        """Replace ``cls.<name>`` with a timed wrapper (before instances connect signals)"""
+        for name in names:
+            func = getattr(cls, name, None)
+            if callable(func):
+                setattr(cls, name, self._timed(f"{cls.__name__}.{name}", func))
+
+    # ----------------------------
+    # Report
+    # ----------------------------
+    def summary(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            heartbeat = {"beats": len(latencies), "interval_ms": self.HEARTBEAT_MS}
+            if latencies:
+                heartbeat.update(
+                    mean_late_ms=round(statistics.fmean(latencies), 2),
+                    p99_late_ms=round(latencies[int(0.99 * (len(latencies) - 1))], 2),
+                    max_late_ms=round(latencies[-1], 2),
+                )
+            callbacks = {
+                name: {
+                    "calls": s["calls"],
+                    "total_ms": round(s["total_ms"], 1),
+                    "mean_ms": round(s["total_ms"] / s["calls"], 2),
+                    "max_ms": round(s["max_ms"], 1),
+                }
+                for name, s in self.callbacks.items()
+            }
+            return {
+                "stall_threshold_ms": self.stall_ms,
+                "heartbeat": heartbeat,
+                "stalls": list(self.stalls),
+                "callbacks": callbacks,
+            }
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import xml.etree.ElementTree as ET
+
+
+class XkbLayoutIndex:
+    """Keyboard layout/variant index built from the XKB rules registry.
+
+    ``rules/evdev.xml`` is parsed once and the result is cached as compact
+    JSON keyed by the registry's mtime and size, so later runs skip the XML
+    parse entirely.
+    """
+
+    RULES_PATH = "/usr/share/X11/xkb/rules/evdev.xml"
+    ISO639_PATH = "/usr/share/iso-codes/json/iso_639-3.json"
+    # evdev.xml also uses ISO 639-2/B codes (ger, fre, cze) that 639-3 lacks
+    ISO639_2_PATH = "/usr/share/iso-codes/json/iso_639-2.json"
+    CACHE_VERSION = 2
+    FALLBACK_ENTRY = {
+        "layout": "us",
+        "variant": "",
+        "description": "English (US)",
+        "group": "English",
+        "search": "us english (us) english",
+    }
+
+    def __init__(self, rules_path=None, cache_dir=None):
+        self.rules_path = rules_path or self.RULES_PATH
+        if cache_dir is None:
+            cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+            cache_dir = os.path.join(cache_home, "pelican-installer")
+        self.cache_path = os.path.join(cache_dir, "xkb-layouts.json")
+
+        # id -> {"layout", "variant", "description", "group", "search"}
+        self.entries = {}
+        # group (language) name -> sorted list of entry ids
+        self.groups = {}
+
+    @staticmethod
+    def make_id(layout, variant=None):
+        """Return the ``layout(variant)`` form used across the installer."""
+        return f"{layout}({variant})" if variant else layout
+
+    @staticmethod
+    def split_id(entry_id):
+        """Split ``us(intl)`` into ``('us', 'intl')`` and ``us`` into ``('us', '')``."""
+        if entry_id.endswith(")") and "(" in entry_id:
+            layout, variant = entry_id[:-1].split("(", 1)
+            return layout, variant
+        return entry_id, ""
+
+    def load(self):
+        """Load the index from cache, rebuilding it if the registry changed."""
+        try:
+            st = os.stat(self.rules_path)
+        except OSError:
+            # No XKB registry available - keep a minimal usable choice
+            self._set_entries({"us": dict(self.FALLBACK_ENTRY)})
+            return self
+
+        key = [self.CACHE_VERSION, st.st_mtime_ns, st.st_size]
+        if self._load_cache(key):
+            return self
+
+        self._build(self._parse_registry())
+        self._save_cache(key)
+        return self
+
+    def search(self, text):
+        """Return entry ids whose language, description or code contain ``text``."""
+        text = text.strip().lower()
+        if not text:
+            return list(self.entries)
+        return [eid for eid, e in self.entries.items() if text in e["search"]]
+
+    # ----------------------------
+    # Parsing
+    # ----------------------------
+    def _parse_registry(self):
+        """Parse layouts and variants from the XKB XML registry."""
+        tree = ET.parse(self.rules_path)
+        layouts = []
+
+        for layout in tree.getroot().iterfind("layoutList/layout"):
+            item = layout.find("configItem")
+            if item is None:
+                continue
+            name = item.findtext("name")
+            if not name:
+                continue
+            languages = [l.text for l in item.iterfind("languageList/iso639Id") if l.text]
+            countries = [c.text for c in item.iterfind("countryList/iso3166Id") if c.text]
+
+            variants = []
+            for variant in layout.iterfind("variantList/variant/configItem"):
+                vname = variant.findtext("name")
+                if not vname:
+                    continue
+                variants.append({
+                    "name": vname,
+                    "description": variant.findtext("description") or vname,
+                    # variants without their own list inherit the layout's
+                    "languages": [l.text for l in variant.iterfind("languageList/iso639Id") if l.text] or languages,
+                })
+
+            layouts.append({
+                "name": name,
+                "description": item.findtext("description") or name,
+                "languages": languages,
+                "countries": countries,
+                "variants": variants,
+            })
+
+        return layouts
+
+    def _language_names(self):
+        """Map ISO 639-3 and 639-2 (terminologic and bibliographic) codes to English names."""
+        names = {}
+        for path, key, code_fields in (
+            (self.ISO639_PATH, "639-3", ("alpha_3",)),
+            (self.ISO639_2_PATH, "639-2", ("alpha_3", "bibliographic")),
+        ):
+            try:
+                with open(path, "r") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for entry in data.get(key, []):
+                if not entry.get("name"):
+                    continue
+                for field in code_fields:
+                    code = entry.get(field)
+                    if code:
+                        names.setdefault(code, entry["name"])
+        return names
+
+    def _build(self, layouts):
+        names = self._language_names()
+        entries = {}
+
+        def group_for(languages, description):
+            for code in languages:
+                if code in names:
+                    return names[code]
+            # "English (US)" -> "English"
+            return description.split(" (")[0] or "Other"
+
+        for layout in layouts:
+            items = [(None, layout["description"], layout["languages"])]
+            items += [(v["name"], v["description"], v["languages"]) for v in layout["variants"]]
+
+            for variant, description, languages in items:
+                eid = self.make_id(layout["name"], variant)
+                group = group_for(languages, description)
+                search = " ".join(
+                    [eid, description, group]
+                    + [names.get(code, code) for code in languages]
+                    + layout["countries"]
+                ).lower()
+                entries[eid] = {
+                    "layout": layout["name"],
+                    "variant": variant or "",
+                    "description": description,
+                    "group": group,
+                    "search": search,
+                }
+
+        self._set_entries(entries)
+
+    def _set_entries(self, entries):
+        self.entries = entries
+        groups = {}
+        for eid, entry in entries.items():
+            groups.setdefault(entry["group"], []).append(eid)
+        self.groups = {
+            g: sorted(ids, key=lambda i: entries[i]["description"].lower())
+            for g, ids in sorted(groups.items())
+        }
+
+    # ----------------------------
+    # Cache
+    # ----------------------------
+    def _load_cache(self, key):
+        try:
+            with open(self.cache_path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        if data.get("key") != key:
+            return False
+
+        fields = data.get("fields", [])
+        self._set_entries({row[0]: dict(zip(fields, row[1:])) for row in data.get("rows", [])})
+        return True
+
+    def _save_cache(self, key):
+        fields = ["layout", "variant", "description", "group", "search"]
+        data = {
+            "key": key,
+            "fields": fields,
+            "rows": [[eid] + [e[f] for f in fields] for eid, e in self.entries.items()],
+        }
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f, separators=(",", ":"), ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"[XkbLayoutIndex] Could not write cache: {e}")